@@ -2,6 +2,7 @@
 Make `python -m feeluown` an alias for running `fuo`.
 """
 
+import multiprocessing
 
 from feeluown.entry_points.run import run
 
@@ -10,4 +11,7 @@ main = run
 
 
 if __name__ == '__main__':
+    # Local music is scanned by a process pool with the spawn start method,
+    # the spawned workers must not run the app again in a frozen build.
+    multiprocessing.freeze_support()
     run()
@@ -1,18 +1,23 @@
 import logging
 import json
+import os
 from contextlib import contextmanager
 from typing import Optional, Type
 
-from feeluown.consts import STATE_FILE
+from feeluown.consts import STATE_FILE, CACHE_DIR, PLAY_HISTORY_FILE
 from feeluown.utils.request import Request
 from feeluown.library import Library
+from feeluown.library.standby_cache import StandbyCache
 from feeluown.utils.dispatch import Signal
+from feeluown.utils.scheduler import provider_scheduler
+from feeluown.utils.profiler import start as start_slot_profiler
 from feeluown.library import (
     Resolver,
     reverse,
+    reverse_many,
     resolve,
+    resolve_many,
     ResolverNotFound,
-    ResolveFailed,
 )
 from feeluown.player import (
     PlaybackMode,
@@ -21,6 +26,7 @@ from feeluown.player import (
     FM,
     Player,
     RecentlyPlayed,
+    PlayHistory,
     PlayerPositionDelegate,
 )
 from feeluown.i18n import rfc1766_langcode
@@ -65,7 +71,9 @@ class App:
         self.task_mgr = TaskManager(self)
         # Library.
         self.library = Library(
-            config.PROVIDERS_STANDBY, config.ENABLE_AI_STANDBY_MATCHER
+            config.PROVIDERS_STANDBY,
+            config.ENABLE_AI_STANDBY_MATCHER,
+            standby_cache=StandbyCache(os.path.join(CACHE_DIR, "standby.json")),
         )
         self.coll_mgr = CollectionManager(self)
         self.ai = None
@@ -103,6 +111,7 @@ class App:
             audio_device=bytes(config.MPV_AUDIO_DEVICE, "utf-8"),
             fade=config.PLAYBACK_CROSSFADE,
             fade_time_ms=config.PLAYBACK_CROSSFADE_DURATION,
+            gapless=config.PLAYBACK_GAPLESS,
         )
         # Theoretically, each caller maintain its own position delegate.
         # For simplicity, this delegate is created for common use cases and
@@ -112,17 +121,35 @@ class App:
         # in one second. Considering the use cases and performance, I guess 300ms is
         # a reasonable interval.
         self.player_pos_per300ms = PlayerPositionDelegate(self.player, interval=300)
-        self.playlist = Playlist(self, audio_select_policy=config.AUDIO_SELECT_POLICY)
+        self.playlist = Playlist(
+            self,
+            audio_select_policy=config.AUDIO_SELECT_POLICY,
+            prefetch_count=config.PLAYLIST_PREFETCH_COUNT,
+        )
         self.live_lyric = LiveLyric(self)
         self.fm = FM(self)
-        self.recently_played = RecentlyPlayed(self.playlist)
+        self.recently_played = RecentlyPlayed(
+            self.playlist, history=PlayHistory(PLAY_HISTORY_FILE), player=self.player
+        )
 
         # TODO: initialization should be moved into initialize
         self.player.set_playlist(self.playlist)
 
         self.about_to_shutdown.connect(lambda _: self.dump_and_save_state(), weak=False)
+        self.about_to_shutdown.connect(
+            lambda _: self.library.standby_cache.save(), weak=False
+        )
+        self.about_to_shutdown.connect(
+            lambda _: self.recently_played.close(), weak=False
+        )
+        self.about_to_shutdown.connect(lambda _: self.coll_mgr.compact(), weak=False)
+        self.about_to_shutdown.connect(
+            lambda _: provider_scheduler.shutdown(), weak=False
+        )
 
     def initialize(self):
+        if self.config.ENABLE_SLOT_PROFILER:
+            start_slot_profiler(self.config.SLOT_PROFILER_THRESHOLD / 1000, app=self)
         self.coll_mgr.scan()
         self.alert_mgr.initialize(self)
         self.player_pos_per300ms.initialize()
@@ -167,30 +194,12 @@ class App:
             player.volume = state["volume"]
 
             # Restore recently_played states.
-            recently_played_models = []
-            for model in state.get("recently_played", []):
-                try:
-                    model = resolve(model)
-                except ResolverNotFound:
-                    pass
-                except ResolveFailed as e:
-                    logger.warning(f"resolve failed, {e}")
-                else:
-                    recently_played_models.append(model)
+            recently_played_models = resolve_many(state.get("recently_played", []))
             recently_played.init_from_models(recently_played_models)
 
             # Restore playlist states.
             playlist.playback_mode = PlaybackMode(state["playback_mode"])
-            songs = []
-            for song in state["playlist"]:
-                try:
-                    song = resolve(song)
-                except ResolverNotFound:
-                    pass
-                except ResolveFailed as e:
-                    logger.warning(f"resolve failed, {e}")
-                else:
-                    songs.append(song)
+            songs = resolve_many(state["playlist"])
             playlist.set_models(songs)
             song = state["song"]
 
@@ -248,13 +257,14 @@ class App:
             "song": song,
             # cast position to int to avoid such value 2.7755575615628914e-17
             "position": int(player.position or 0),
-            "playlist": [
-                reverse(song, as_line=True) for song in playlist.list_unshuffled()
-            ],
-            "recently_played": [
-                reverse(song, as_line=True) for song in recently_played.list_songs()
-            ],
+            "playlist": reverse_many(playlist.list_unshuffled(), as_line=True),
         }
+        # Recently played songs are kept in the state file only when there is
+        # no play history.
+        if recently_played.history is None:
+            state["recently_played"] = reverse_many(
+                recently_played.list_songs(), as_line=True
+            )
         return state
 
     def dump_and_save_state(self):
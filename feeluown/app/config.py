@@ -186,6 +186,33 @@ def create_config() -> Config:
         default=500,
         desc=t("playback-crossfade-desc"),
     )
+    # Preload the next song in player, so that there is no gap between songs.
+    # It only works when PLAYLIST_PREFETCH_COUNT is greater than 0. When
+    # PLAYBACK_CROSSFADE is also enabled, songs overlap for the crossfade duration.
+    config.deffield(
+        "PLAYBACK_GAPLESS",
+        type_=bool,
+        default=False,
+    )
+    # How many upcoming songs are prepared in background, 0 means disabled.
+    config.deffield(
+        "PLAYLIST_PREFETCH_COUNT",
+        type_=int,
+        default=1,
+    )
+    # Record the time each signal receiver takes, see feeluown.utils.profiler.
+    # A receiver call slower than the threshold (in ms) is logged as a warning.
+    # The profiler can also be started by the `profile` server command.
+    config.deffield(
+        "ENABLE_SLOT_PROFILER",
+        type_=bool,
+        default=False,
+    )
+    config.deffield(
+        "SLOT_PROFILER_THRESHOLD",
+        type_=int,
+        default=50,
+    )
     config.deffield(
         "OPENAI_API_BASEURL",
         type_=str,
@@ -128,6 +128,36 @@ def add_server_cmds(subparsers: argparse._SubParsersAction, include_pubsub=True)
         choices=["1.0", "2.0"],
     )
 
+    coll_parser = subparsers.add_parser(
+        "coll",
+        help="批量添加或移除收藏集中的资源",
+        parents=[fmt_parser],
+    )
+    coll_parser.add_argument("action", choices=["add", "remove"])
+    coll_parser.add_argument(
+        "identifier",
+        help="收藏集 ID，或者 library/pool",
+    )
+    coll_parser.add_argument("uris", nargs="+")
+
+    profile_parser = subparsers.add_parser(
+        "profile",
+        help="统计信号接收者（槽函数）的调用次数和耗时",
+        parents=[fmt_parser],
+    )
+    profile_parser.add_argument(
+        "action", choices=["start", "stop", "reset", "show", "dump"]
+    )
+    profile_parser.add_argument(
+        "--threshold",
+        type=int,
+        help="慢槽函数的阈值（毫秒），超过时记录警告日志",
+    )
+    profile_parser.add_argument(
+        "--output",
+        help="dump 时把 JSON 写入这个文件",
+    )
+
     if include_pubsub is True:
         sub_parser = subparsers.add_parser(
             "sub",
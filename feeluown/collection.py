@@ -2,16 +2,19 @@ import base64
 import itertools
 import logging
 import os
+import pickle
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 
 import tomlkit
 
-from feeluown.consts import COLLECTIONS_DIR
+from feeluown import __version__ as feeluown_version
+from feeluown.consts import COLLECTIONS_DIR, CACHE_DIR
 from feeluown.utils.dispatch import Signal
 from feeluown.library import resolve, reverse, ResolverNotFound, \
-    ResolveFailed, ModelState, CollectionType, ModelType
+    ResolveFailed, ModelState, CollectionType, ModelType, Resolver
 from feeluown.utils.utils import elfhash
 
 logger = logging.getLogger(__name__)
@@ -26,18 +29,43 @@ DEPRECATED_FUO_FILENAMES = (
 )
 
 TOML_DELIMLF = "+++\n"
+#: Changes are appended to the journal file, which is ``{fpath}{JOURNAL_SUFFIX}``,
+#: and they are merged into the collection file by :meth:`Collection.compact`.
+JOURNAL_SUFFIX = '.journal'
+#: Compact the collection file in background once the journal has
+#: this many records.
+JOURNAL_COMPACT_THRESHOLD = 256
+#: Bump it when the structure of the collection snapshot is changed.
+SNAPSHOT_VERSION = 1
 
 
 class CollectionAlreadyExists(Exception):
     pass
 
 
+def _line_url(line):
+    """Return the uri of a collection line, the comment is stripped."""
+    return line.split('#', 1)[0].strip()
+
+
 class Collection:
     """
     TODO: This collection should be moved into local provider.
+
+    Adding and removing a model only appends a record to the journal file.
+    The records are merged into the collection file when the journal becomes
+    large or when the collection is loaded, so the collection file keeps
+    the same format as before and it is readable by older versions.
     """
 
-    def __init__(self, fpath):
+    def __init__(self, fpath, snapshot_dir=''):
+        """
+        :param snapshot_dir: directory to save the snapshot of parsed models,
+            empty string means no snapshot.
+
+        .. versionchanged:: 5.2
+            Add `snapshot_dir` parameter.
+        """
         # TODO: Consider adding an identifier field in the future; the identifier
         # field should be designed to be usable across different machines
         self.fpath = str(fpath)
@@ -49,19 +77,56 @@ class Collection:
         # these variables should be inited during loading
         self.type = None
         self.name = None  # Collection title.
-        self.models = []
+        # None means models are not parsed yet, see :attr:`models`.
+        self._models: Optional[list] = []
         self.updated_at = None
         self.created_at = None
         self.description = None
         self._has_nonexistent_models = False
+        # Models in a set, so that membership checks are O(1).
+        self._model_set = set()
 
         #: tomkit.toml_document.Document
         self._metadata = None
 
+        self.journal_fpath = self.fpath + JOURNAL_SUFFIX
+        self._journal_size = 0  # number of records in the journal
+        # Journal appends and compaction can not run at the same time, and
+        # models are changed with the lock held, so that the snapshot saved
+        # by compaction matches the file.
+        self._journal_lock = threading.RLock()
+        self._compact_thread = None
+
+        self.snapshot_fpath = os.path.join(snapshot_dir, f'{self.identifier}.pickle') \
+            if snapshot_dir else ''
+
+        #: Emitted when models are added or removed, with the added models
+        #: and the removed models. Added models are always at the top, so
+        #: they are ``models[:len(added)]``.
+        self.models_changed = Signal()  # (added, removed)
+
+    @property
+    def models(self) -> list:
+        """Models in the collection, they are parsed on first access.
+
+        .. versionchanged:: 5.2
+            Models are parsed lazily.
+        """
+        self._load_models_if_needed()
+        return self._models  # type: ignore[return-value]
+
+    @models.setter
+    def models(self, models):
+        self._models = models
+
     def load(self):
-        """Parse the file, initialize itself."""
-        # pylint: disable=too-many-branches
-        self.models = []
+        """Parse the metadata of the file, initialize itself.
+
+        .. versionchanged:: 5.2
+            Models are parsed on first access of :attr:`models`, so loading
+            a collection does not depend on its size. Records in the journal
+            are compacted into the file.
+        """
         filepath = Path(self.fpath)
         name = filepath.stem
         stat_result = filepath.stat()
@@ -74,45 +139,166 @@ class Collection:
         else:
             self.type = CollectionType.mixed
 
-        # parse file content
         with filepath.open(encoding='utf-8') as f:
-            first = f.readline()
-            lines = []
-            if first == TOML_DELIMLF:
-                is_valid = False
-                for line in f:
-                    if line == TOML_DELIMLF:
-                        is_valid = True
-                        break
-                    lines.append(line)
-                if is_valid is True:
-                    toml_str = ''.join(lines)
-                    metadata = tomlkit.parse(toml_str)
-                    self._loads_metadata(metadata)
-                    lines = []
-                else:
-                    logger.warning('the metadata is invalid, will ignore it')
-            else:
-                lines.append(first)
+            toml_str, _ = self._read_metadata(f)
+        if toml_str is not None:
+            metadata = tomlkit.parse(toml_str)
+            self._loads_metadata(metadata)
+        self._models = None
+        self._model_set = set()
+        self._has_nonexistent_models = False
+        # Records left by last run (for example, the app crashed) are merged
+        # now, so that the file is up to date even if models are never read.
+        if os.path.exists(self.journal_fpath):
+            try:
+                self.compact()
+            except OSError:
+                logger.exception(f'compact collection {self.fpath} failed')
+
+    def _read_metadata(self, f):
+        """Read the metadata part of the file
+
+        Return the metadata string (None if it does not exist or is invalid),
+        and lines which are read but belong to the body.
+        """
+        first = f.readline()
+        lines = []
+        if first == TOML_DELIMLF:
+            for line in f:
+                if line == TOML_DELIMLF:
+                    return ''.join(lines), []
+                lines.append(line)
+            logger.warning('the metadata is invalid, will ignore it')
+        else:
+            lines.append(first)
+        return None, lines
 
-            for line in itertools.chain(lines, f):
-                if not line.strip():  # ignore empty lines
-                    continue
-                try:
-                    model = resolve(line)
-                except ResolverNotFound:
-                    logger.warning('resolver not found for line:%s', line)
-                    model = None
-                except ResolveFailed as e:
-                    logger.warning(
-                        'resolve failed, file:%s, line:%s, error:%s', str(filepath),
-                        line, str(e)
-                    )
-                    model = None
-                if model is not None:
-                    if model.state is ModelState.not_exists:
-                        self._has_nonexistent_models = True
-                    self.models.append(model)
+    def _load_models(self):
+        """Parse models in the file, and replay records in the journal
+
+        If the file is not changed since the snapshot is saved, models are
+        restored from the snapshot instead of being parsed line by line.
+        """
+        key = self._snapshot_key()
+        models = self._restore_snapshot(key)
+        parsed = models is None
+        if models is None:
+            models = []
+            with open(self.fpath, encoding='utf-8') as f:
+                _, lines = self._read_metadata(f)
+                for line in itertools.chain(lines, f):
+                    if not line.strip():  # ignore empty lines
+                        continue
+                    model = self._resolve_line(line)
+                    if model is not None:
+                        models.append(model)
+        self._models = models
+        self._model_set = set(models)
+
+        records = self._read_journal()
+        for op, line in records:
+            model = self._resolve_line(line)
+            if model is None:
+                continue
+            if op == '+':
+                if model not in self._model_set:
+                    self._models.insert(0, model)
+                    self._model_set.add(model)
+            elif model in self._model_set:
+                self._remove_from_models(model)
+        if records:
+            # The snapshot is saved after the journal is compacted.
+            try:
+                self.compact()
+            except OSError:
+                logger.exception(f'compact collection {self.fpath} failed')
+        elif parsed:
+            self._save_snapshot(key, self._models)
+
+    def _snapshot_key(self):
+        # Models are resolved to `not_exists` state if their providers are
+        # not available, so the snapshot depends on available providers.
+        # Models are pickled, so the snapshot also depends on the version.
+        st = os.stat(self.fpath)
+        library = Resolver.library
+        providers = tuple(sorted(p.identifier for p in library.list())) \
+            if library is not None else ()
+        return (st.st_mtime_ns, st.st_size, providers, feeluown_version)
+
+    def _restore_snapshot(self, key) -> Optional[list]:
+        if not self.snapshot_fpath:
+            return None
+        try:
+            with open(self.snapshot_fpath, 'rb') as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:  # noqa
+            logger.exception(f'load collection snapshot {self.snapshot_fpath} failed')
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('key') != key:
+            return None
+        models = snapshot['models']
+        self._has_nonexistent_models = any(
+            model.state is ModelState.not_exists for model in models)
+        return models
+
+    def _save_snapshot(self, key, models):
+        if not self.snapshot_fpath:
+            return
+        snapshot = {'version': SNAPSHOT_VERSION, 'key': key, 'models': models}
+        tmp_fpath = self.snapshot_fpath + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_fpath), exist_ok=True)
+            with open(tmp_fpath, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_fpath, self.snapshot_fpath)
+        except (OSError, pickle.PicklingError):
+            logger.exception(f'save collection snapshot {self.snapshot_fpath} failed')
+
+    def _resolve_line(self, line):
+        try:
+            model = resolve(line)
+        except ResolverNotFound:
+            logger.warning('resolver not found for line:%s', line)
+            return None
+        except ResolveFailed as e:
+            logger.warning(
+                'resolve failed, file:%s, line:%s, error:%s', self.fpath,
+                line, str(e)
+            )
+            return None
+        if model.state is ModelState.not_exists:
+            self._has_nonexistent_models = True
+        return model
+
+    def _read_journal(self):
+        """Return records in the journal, a record is a tuple (op, line)."""
+        records = []
+        try:
+            with open(self.journal_fpath, encoding='utf-8') as f:
+                for record in f:
+                    # An incomplete record may be written if the app crashes.
+                    if not record.endswith('\n'):
+                        continue
+                    op, _, line = record[:-1].partition(' ')
+                    if op in ('+', '-') and line:
+                        records.append((op, line))
+        except FileNotFoundError:
+            pass
+        self._journal_size = len(records)
+        return records
+
+    def __contains__(self, model):
+        """
+        .. versionadded:: 5.2
+        """
+        self._load_models_if_needed()
+        return model in self._model_set
+
+    def _load_models_if_needed(self):
+        if self._models is None:
+            self._load_models()
 
     def list_latest_n(self, n, model_type=None):
         latest_n = []
@@ -150,45 +336,138 @@ class Collection:
 
         :param model: :class:`feeluown.library.BaseModel`
         :return: True means succeed, False means failed
+
+        .. versionchanged:: 5.2
+            The model is appended to the journal instead of rewriting the file.
         """
-        if model not in self.models:
-            line = reverse(model, as_line=True)
-            with open(self.fpath, 'r+', encoding='utf-8') as f:
-                content = f.read()
-                parts = content.split(TOML_DELIMLF, maxsplit=2)
-                body = parts[-1]
-                f.seek(0, 0)
-                self._write_metadata_if_needed(f)
-                f.write(f'{line}\n{body}')
-                f.truncate()
-            self.models.insert(0, model)
+        self.add_many([model])
         return True
 
     def remove(self, model):
-        if model in self.models:
-            url = reverse(model)
-            with open(self.fpath, 'r+', encoding='utf-8') as f:
-                content = f.read()
-                parts = content.split(TOML_DELIMLF, maxsplit=2)
-                body = parts[-1]
-                lines = []
-                for line in body.split('\n'):
-                    if line.startswith(url):
-                        continue
-                    if line:
-                        lines.append(line)
+        """remove model from collection
 
-                f.seek(0)
-                self._write_metadata_if_needed(f)
-                f.write('\n'.join(lines))
-                f.truncate()
-                # Ensure a trailing newline is written at the end
-                # to make the file more aesthetically pleasing
-                if lines and not lines[-1].endswith('\n'):
-                    f.write('\n')
-            self.models.remove(model)
+        .. versionchanged:: 5.2
+            The removal is appended to the journal instead of rewriting the file.
+        """
+        self.remove_many([model])
         return True
 
+    def add_many(self, models: Iterable) -> list:
+        """add models to collection, return the added models
+
+        It is the same as calling :meth:`add` for each model, so the last
+        model is on the top. Models which are already in the collection are
+        ignored. Changes are written to the journal at once, and
+        :attr:`models_changed` is emitted once.
+
+        .. versionadded:: 5.2
+        """
+        self._load_models_if_needed()
+        added = []
+        for model in models:
+            if model not in self._model_set:
+                self._model_set.add(model)
+                added.append(model)
+        if added:
+            with self._journal_lock:
+                self._append_journal([('+', reverse(model, as_line=True))
+                                      for model in added])
+                added.reverse()
+                self.models[0:0] = added
+            self.models_changed.emit(added, [])
+        return added
+
+    def remove_many(self, models: Iterable) -> list:
+        """remove models from collection, return the removed models
+
+        .. versionadded:: 5.2
+        """
+        self._load_models_if_needed()
+        removed = []
+        for model in models:
+            if model in self._model_set:
+                self._model_set.discard(model)
+                removed.append(model)
+        if removed:
+            removed_set = set(removed)
+            with self._journal_lock:
+                self._append_journal([('-', reverse(model)) for model in removed])
+                self.models = [m for m in self.models if m not in removed_set]
+            self.models_changed.emit([], removed)
+        return removed
+
+    def _remove_from_models(self, model):
+        self.models = [m for m in self.models if m != model]
+        self._model_set.discard(model)
+
+    def _append_journal(self, records):
+        with self._journal_lock:
+            with open(self.journal_fpath, 'a', encoding='utf-8') as f:
+                f.write(''.join(f'{op} {line}\n' for op, line in records))
+            self._journal_size += len(records)
+            if self._metadata:
+                self.updated_at = datetime.now()
+            if self._journal_size >= JOURNAL_COMPACT_THRESHOLD and \
+                    self._compact_thread is None:
+                self._compact_thread = threading.Thread(
+                    target=self._compact_in_background, name='CollectionCompact',
+                    daemon=True)
+                self._compact_thread.start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except OSError:
+            logger.exception(f'compact collection {self.fpath} failed')
+        finally:
+            self._compact_thread = None
+
+    def compact(self):
+        """Merge records in the journal into the collection file
+
+        The collection file is rewritten in the same format as before, and
+        lines which can not be resolved (for example, the provider is not
+        installed) are kept. If models are parsed, the snapshot is saved
+        so that it matches the new file.
+
+        .. versionadded:: 5.2
+        """
+        with self._journal_lock:
+            records = self._read_journal()
+            if not records:
+                return
+            # The last record of an uri decides whether the uri is in the file,
+            # and an added line is moved to the top.
+            last_records = {}  # {url: (op, line)}
+            for op, line in records:
+                url = _line_url(line)
+                last_records.pop(url, None)
+                last_records[url] = (op, line)
+            added_lines = [line for op, line in reversed(last_records.values())
+                           if op == '+']
+
+            with open(self.fpath, encoding='utf-8') as f:
+                content = f.read()
+            if content.startswith(TOML_DELIMLF):
+                body = content.split(TOML_DELIMLF, maxsplit=2)[-1]
+            else:
+                body = content
+            lines = added_lines + [
+                line for line in body.split('\n')
+                if line.strip() and _line_url(line) not in last_records
+            ]
+
+            tmp_fpath = self.fpath + '.tmp'
+            with open(tmp_fpath, 'w', encoding='utf-8') as f:
+                self._write_metadata_if_needed(f)
+                for line in lines:
+                    f.write(f'{line}\n')
+            os.replace(tmp_fpath, self.fpath)
+            os.remove(self.journal_fpath)
+            self._journal_size = 0
+            if self._models is not None:
+                self._save_snapshot(self._snapshot_key(), self._models)
+
     def on_provider_added(self, provider):
         if not self._has_nonexistent_models:
             return
@@ -201,6 +480,9 @@ class Collection:
         # TODO: set _has_nonexistent_models to proper value
 
     def on_provider_removed(self, provider):
+        if self._models is None:
+            # Models are resolved with available providers when they are parsed.
+            return
         for model in self.models:
             if model.source == provider.identifier:
                 model.state = ModelState.not_exists
@@ -229,6 +511,7 @@ class Collection:
 
         .. versionadded:: 4.1.11
         """
+        self.compact()
         with open(self.fpath, encoding='utf-8') as f:
             return f.read()
 
@@ -237,8 +520,12 @@ class Collection:
 
         .. versionadded:: 4.1.11
         """
-        with open(self.fpath, 'w', encoding='utf-8') as f:
-            f.write(raw_data)
+        with self._journal_lock:
+            with open(self.fpath, 'w', encoding='utf-8') as f:
+                f.write(raw_data)
+            # Records in the journal are outdated.
+            if os.path.exists(self.journal_fpath):
+                os.remove(self.journal_fpath)
         self.load()
 
 
@@ -249,6 +536,8 @@ class CollectionManager:
         self.scan_finished = Signal()
         self._library = app.library
         self.default_dir = COLLECTIONS_DIR
+        #: Snapshots of parsed collections are saved in this directory.
+        self.snapshot_dir = os.path.join(CACHE_DIR, 'collections')
 
         self._id_coll_mapping: Dict[int, Collection] = {}
         self._sys_colls = {}
@@ -264,6 +553,28 @@ class CollectionManager:
                 return coll
         assert False, "collection 'library' must exists."
 
+    def add_many(self, identifier, models) -> list:
+        """Add models to the collection, return the added models
+
+        This is exposed to JSON-RPC as ``app.coll_mgr.add_many``.
+
+        :param models: models or fuo uris.
+
+        .. versionadded:: 5.2
+        """
+        return self.get(identifier).add_many(self._resolve_models(models))
+
+    def remove_many(self, identifier, models) -> list:
+        """Remove models from the collection, return the removed models
+
+        .. versionadded:: 5.2
+        """
+        return self.get(identifier).remove_many(self._resolve_models(models))
+
+    def _resolve_models(self, models):
+        return [resolve(model) if isinstance(model, str) else model
+                for model in models]
+
     def create(self, fname, title) -> Collection:
         first_valid_dir = ''
         for d, exists in self._get_dirs():
@@ -283,6 +594,9 @@ class CollectionManager:
         if coll_id in self._id_coll_mapping:
             self._id_coll_mapping.pop(coll_id)
             os.remove(collection.fpath)
+            for fpath in (collection.journal_fpath, collection.snapshot_fpath):
+                if fpath and os.path.exists(fpath):
+                    os.remove(fpath)
 
     def _get_dirs(self, ):
         directorys = [self.default_dir]
@@ -327,6 +641,19 @@ class CollectionManager:
     def listall(self):
         return self._id_coll_mapping.values()
 
+    def compact(self):
+        """Compact journals of all collections into their files
+
+        It is called when the app is about to shutdown.
+
+        .. versionadded:: 5.2
+        """
+        for coll in self.listall():
+            try:
+                coll.compact()
+            except OSError:
+                logger.exception(f'compact collection {coll.fpath} failed')
+
     def clear(self):
         self._id_coll_mapping.clear()
 
@@ -347,7 +674,7 @@ class CollectionManager:
                 if filename in DEPRECATED_FUO_FILENAMES:
                     default_fpaths.append(filepath)
                     continue
-                coll = Collection(filepath)
+                coll = Collection(filepath, self.snapshot_dir)
                 coll.load()
                 self._app.library.provider_added.connect(coll.on_provider_added)
                 self._app.library.provider_removed.connect(coll.on_provider_removed)
@@ -356,7 +683,7 @@ class CollectionManager:
         fpath, generated = self.generate_library_coll_if_needed(default_fpaths)
         # Avoid to yield a duplicated collection.
         if generated is True:
-            coll = Collection(fpath)
+            coll = Collection(fpath, self.snapshot_dir)
             coll.load()
             self._app.library.provider_added.connect(coll.on_provider_added)
             self._app.library.provider_removed.connect(coll.on_provider_removed)
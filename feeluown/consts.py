@@ -29,6 +29,7 @@ if sys.platform == 'linux' and not os.path.exists(_old_home_dir):
 
     LOG_FILE = os.path.join(STATE_DIR, 'stdout.log')
     STATE_FILE = os.path.join(STATE_DIR, 'state.json')
+    PLAY_HISTORY_FILE = os.path.join(DATA_DIR, 'play_history.sqlite3')
     DEFAULT_RCFILE_PATH = os.path.join(HOME_DIR, 'fuorc')
 else:
     HOME_DIR = _old_home_dir
@@ -41,4 +42,5 @@ else:
 
     LOG_FILE = os.path.join(HOME_DIR, 'stdout.log')
     STATE_FILE = os.path.join(DATA_DIR, 'state.json')
+    PLAY_HISTORY_FILE = os.path.join(DATA_DIR, 'play_history.sqlite3')
     DEFAULT_RCFILE_PATH = os.path.join(USER_HOME, '.fuorc')
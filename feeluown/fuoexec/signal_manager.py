@@ -2,6 +2,7 @@ import logging
 from typing import Callable, Optional, List, Tuple, Dict
 
 from feeluown.utils.dispatch import Signal
+from feeluown.utils.profiler import register_symbol, unregister_symbol
 
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,8 @@ class SignalConnector:
 
     def bind_signal(self, signal: Signal):
         self._signal = signal
+        if not signal.name:
+            signal.name = self.symbol
 
     def connect(self):
         """Connect all slots.
@@ -64,18 +67,28 @@ class SignalConnector:
 
         Signal.emit => self.slot_symbols_delegate => slots
         """
+        profiler = Signal.profiler
         for slot_symbol, kwargs in self._slot_symbol_list:
             func = fuoexec_F(slot_symbol)
+            label = f'fuoexec:{slot_symbol}'
             # FIXME: Duplicate code. The logic has been implemented in Signal.emit.
             if kwargs.get('aioqueue'):
                 if Signal.has_aio_support:
-                    Signal.aioqueue.sync_q.put_nowait((func, args))  # type: ignore
+                    if profiler is None:
+                        item = (func, args)
+                    else:
+                        item = (profiler.call, (self._signal, func, args, label))
+                    Signal.aioqueue.sync_q.put_nowait(item)  # type: ignore
                 else:
                     logger.warning(
                         'No aio support is available, a slot is ignored.')
             else:
                 try:
-                    func(*args)
+                    if profiler is None:
+                        func(*args)
+                    else:
+                        # The time is included in this delegate.
+                        profiler.call(self._signal, func, args, label, nested=True)
                 except Exception as e:
                     logger.exception('error during calling slot:%s', e)
                 except:  # noqa: E722, pylint: disable=bare-except
@@ -111,6 +124,9 @@ class SignalManager:
         if use_symbol is True:
             sc.connect_slot_symbol(fuoexec_S(slot), **kwargs)
         else:
+            # So that the profiler attributes the slot by its symbol.
+            if hasattr(slot, '__name__'):
+                register_symbol(slot, fuoexec_S(slot))
             sc.connect_slot(slot, **kwargs)
 
     def remove(self, signal_symbol: str, slot: Callable, use_symbol: bool):
@@ -122,6 +138,7 @@ class SignalManager:
         if use_symbol is True:
             signal_connector.disconnect_slot_symbol(fuoexec_S(slot))
         else:
+            unregister_symbol(slot)
             signal_connector.disconnect_slot(slot)
 
     def _get_or_create_sc(self, signal_symbol) -> SignalConnector:
@@ -201,6 +201,7 @@ class Browser:
         from feeluown.gui.pages.my_dislike import render as render_my_dislike
         from feeluown.gui.pages.homepage import render as render_homepage
         from feeluown.gui.pages.toplist import render as render_toplist
+        from feeluown.gui.pages.debug import render as render_slot_profiler
 
         model_prefix = f"{MODEL_PAGE_PREFIX}<provider>"
 
@@ -223,6 +224,7 @@ class Browser:
             ("/my_fav", render_my_fav),
             ("/my_dislike", render_my_dislike),
             ("/toplist", render_toplist),
+            ("/debug/slots", render_slot_profiler),
         ]
         for url, renderer in urlpatterns:
             self.route(url)(renderer)
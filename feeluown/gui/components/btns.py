@@ -119,7 +119,7 @@ class FavButton(QPushButton):
 
     def already_in_library(self, model):
         coll_library = self._app.coll_mgr.get_coll_library()
-        return model in coll_library.models
+        return model in coll_library
 
 
 class LikeButton(FavButton):
@@ -215,7 +215,7 @@ class MediaButtonsV2(QWidget):
             self._on_player_state_changed, aioqueue=True
         )
         self._app.player.video_format_changed.connect(
-            self.on_video_format_changed, aioqueue=True
+            self.on_video_format_changed, aioqueue=True, coalesce=True
         )
 
     def _on_player_state_changed(self, state):
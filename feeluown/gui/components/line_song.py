@@ -35,7 +35,7 @@ class LineSongLabel(QLabel):
         self._timer.timeout.connect(self.change_text_position)
 
         self._app.player.metadata_changed.connect(
-            self.on_metadata_changed, aioqueue=True
+            self.on_metadata_changed, aioqueue=True, coalesce=True
         )
         self._app.playlist.play_model_stage_changed.connect(
             self.on_play_model_stage_changed, aioqueue=True
@@ -151,7 +151,7 @@ class TwoLineSongLabel(QWidget):
         self._layout.addWidget(self._title_label)
         self._layout.addWidget(self._subtitle_label)
         self._app.player.metadata_changed.connect(
-            self.on_metadata_changed, aioqueue=True
+            self.on_metadata_changed, aioqueue=True, coalesce=True
         )
 
         font = self.font()
@@ -154,7 +154,7 @@ class NowplayingArtwork(QWidget):
         self.mv_btn = self._mv_wrapper.mv_btn
 
         self._app.player.metadata_changed.connect(
-            self.on_metadata_changed, aioqueue=True
+            self.on_metadata_changed, aioqueue=True, coalesce=True
         )
         self._app.playlist.song_mv_changed.connect(
             self.on_current_song_mv_changed, aioqueue=True
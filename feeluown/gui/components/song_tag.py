@@ -25,10 +25,10 @@ class SongSourceTag(QLabel):
         self._bitrate = 0
 
         self._app.player.metadata_changed.connect(
-            self.on_metadata_changed, aioqueue=True
+            self.on_metadata_changed, aioqueue=True, coalesce=True
         )
         self._app.player.audio_bitrate_changed.connect(
-            self.on_audio_bitrate_changed, aioqueue=True
+            self.on_audio_bitrate_changed, aioqueue=True, coalesce=True
         )
 
     def contextMenuEvent(self, e):
@@ -46,6 +46,7 @@ from PyQt6.QtGui import (
 from PyQt6.QtWidgets import QApplication, QScrollArea, QWidget, QAbstractScrollArea
 
 from feeluown.utils.aio import run_afn, run_fn
+from feeluown.utils.scheduler import ExecutorBusy, Priority
 from feeluown.utils.reader import AsyncReader, Reader
 from feeluown.utils.typing_ import Protocol
 from feeluown.excs import ProviderIOError, ResourceNotFound
@@ -68,6 +69,9 @@ logger = logging.getLogger(__name__)
 T = TypeVar("T")
 
 IS_MACOS = sys.platform == "darwin"
+#: Edge length (in pixels) requested for covers shown in lists and cards.
+#: Covers are displayed smaller than it, even on a HiDPI screen.
+COVER_THUMBNAIL_SIZE = 256
 
 
 def darker_or_lighter(color: QColor, factor):
@@ -547,9 +551,12 @@ class ReaderFetchMoreMixin(Generic[T]):
             self._fetch_more_cb(items)
 
 
-def fetch_cover_wrapper(app: GuiApp):
+def fetch_cover_wrapper(app: GuiApp, size: Optional[int] = COVER_THUMBNAIL_SIZE):
     """
     Your should only use this helper within ImgListModel and SongMiniCardListModel.
+
+    .. versionchanged:: 5.2
+        Add `size` parameter, covers in lists are shown as thumbnails.
     """
     img_mgr, library = app.img_mgr, app.library
 
@@ -558,7 +565,7 @@ def fetch_cover_wrapper(app: GuiApp):
         if img_media:
             # FIXME: sleep random second to avoid send too many request to provider
             await asyncio.sleep(random.randrange(100) / 100)
-            content = await img_mgr.get(img_media, img_uid)
+            content = await img_mgr.get(img_media, img_uid, size=size)
             cb(content)
         else:
             cb(None)
@@ -598,8 +605,11 @@ def fetch_cover_wrapper(app: GuiApp):
 
         # Image is not in cache.
         try:
-            upgraded_song = await run_fn(library.song_upgrade, model)
-        except ResourceNotFound:
+            upgraded_song = await run_fn(
+                library.song_upgrade, model, source=model.source, priority=Priority.low
+            )
+        # The provider is busy, for example, the user scrolls a long song list.
+        except (ResourceNotFound, ExecutorBusy):
             cb(None)
         else:
             # Try to fetch with pic_url first.
@@ -629,7 +639,15 @@ def fetch_cover_wrapper(app: GuiApp):
             cb(content)
             return
 
-        img_media = await run_fn(library.model_get_cover_media, model)
+        try:
+            img_media = await run_fn(
+                library.model_get_cover_media,
+                model,
+                source=model.source,
+                priority=Priority.low,
+            )
+        except ExecutorBusy:
+            img_media = None
         return await fetch_image_with_cb(img_uid, img_media, cb)
 
     async def fetch_model_cover(model, cb):
@@ -45,7 +45,14 @@ class ImgManager(object):
             "https": http_proxy,
         }
 
-    async def get(self, img, img_name):
+    async def get(self, img, img_name, size=None):
+        """
+        :param size: the edge length (in pixels) the image is shown at. Local
+            covers are served from a scaled copy which is not smaller than it.
+
+        .. versionchanged:: 5.2
+            Add `size` parameter.
+        """
         if isinstance(img, Media):
             img_url = img.url
             http_headers = img.http_headers
@@ -64,7 +71,7 @@ class ImgManager(object):
             provider = self._app.library.get("local")
             if provider is None:
                 return None
-            return provider.handle_with_path(img_url[11:])
+            return provider.handle_with_path(img_url[11:], size=size)
         fpath = self.cache.get(img_name)
         if fpath is not None:
             with open(fpath, "rb") as f:
@@ -54,6 +54,8 @@ class LibraryRenderer(Renderer, TabBarRendererMixin):
         self._coll = coll
         self.tab_index = tab_index
         self.tabs = self.default_tabs()
+        # Whether a model is being removed by the table itself.
+        self._removing = False
 
     async def render(self):
         coll = self._coll
@@ -79,15 +81,23 @@ class LibraryRenderer(Renderer, TabBarRendererMixin):
             # ideally, only part of the UI is refreshed. For example, a user scroll
             # to the bottom of the list view, when the last model is removed,
             # the UI is refreshed and the the user needs to scroll to the bottom again.
+            #
+            # The UI is refreshed by `on_models_changed`.
             self._coll.remove(model)
-            self.render_models()
             self._app.show_msg(t("remove-item-succeed", item=model))
 
         def remove_model(model, cb):
-            self._coll.remove(model)
+            # The table removes the row by itself.
+            self._removing = True
+            try:
+                self._coll.remove(model)
+            finally:
+                self._removing = False
             cb(model, True)
             self._app.show_msg(t("remove-item-succeed", item=model))
 
+        coll.models_changed.connect(self.on_models_changed)
+
         if self.tabs[self.tab_index][1] is ModelType.song:
             self.songs_table.remove_song_func = remove_song
         self.artists_table.enable_remove_action = True
@@ -99,6 +109,17 @@ class LibraryRenderer(Renderer, TabBarRendererMixin):
         self.playlists_table.remove_item_needed.connect(remove_model)
         self.videos_table.remove_item_needed.connect(remove_model)
 
+    async def tearDown(self):
+        self._coll.models_changed.disconnect(self.on_models_changed)
+
+    def on_models_changed(self, added, removed):
+        """Render models once for a batch of changes."""
+        if self._removing:
+            return
+        _, mtype, _ = self.tabs[self.tab_index]
+        if any(model.meta.model_type == mtype for model in added + removed):
+            self.render_models()
+
     def render_by_tab_index(self, tab_index):
         self._app.browser.goto(
             page=f"/colls/{self._coll.identifier}", query={"tab_index": tab_index}
@@ -0,0 +1,81 @@
+from typing import TYPE_CHECKING
+
+from PyQt6.QtGui import QFontDatabase
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit
+
+from feeluown.i18n import t
+from feeluown.utils import profiler
+from feeluown.gui.widgets.header import LargeHeader
+from feeluown.gui.widgets.textbtn import TextButton
+
+if TYPE_CHECKING:
+    from feeluown.app.gui_app import GuiApp
+
+
+async def render(req, **kwargs):
+    app: "GuiApp" = req.ctx["app"]
+    view = SlotProfilerView(app)
+    app.ui.right_panel.set_body(view)
+    view.refresh()
+
+
+class SlotProfilerView(QWidget):
+    """Show stats of the slot profiler, see :mod:`feeluown.utils.profiler`.
+
+    .. versionadded:: 5.2
+    """
+
+    def __init__(self, app: "GuiApp"):
+        super().__init__(parent=None)
+        self._app = app
+
+        self.header = LargeHeader(t("slot-profiler"))
+        self.start_btn = TextButton(t("slot-profiler-start"), self)
+        self.stop_btn = TextButton(t("slot-profiler-stop"), self)
+        self.reset_btn = TextButton(t("slot-profiler-reset"), self)
+        self.refresh_btn = TextButton(t("slot-profiler-refresh"), self)
+        self.stats_view = QPlainTextEdit(self)
+        self.stats_view.setReadOnly(True)
+        self.stats_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.stats_view.setFont(
+            QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        )
+
+        self.start_btn.clicked.connect(self._start)
+        self.stop_btn.clicked.connect(self._stop)
+        self.reset_btn.clicked.connect(self._reset)
+        self.refresh_btn.clicked.connect(self.refresh)
+
+        self._btn_layout = QHBoxLayout()
+        for btn in (self.start_btn, self.stop_btn, self.reset_btn, self.refresh_btn):
+            self._btn_layout.addWidget(btn)
+        self._btn_layout.addStretch(0)
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(20, 10, 20, 10)
+        self._layout.addWidget(self.header)
+        self._layout.addLayout(self._btn_layout)
+        self._layout.addWidget(self.stats_view)
+
+    def _start(self):
+        profiler.start(app=self._app)
+        self.refresh()
+
+    def _stop(self):
+        profiler.stop()
+        self.refresh()
+
+    def _reset(self):
+        slot_profiler = profiler.get_profiler()
+        if slot_profiler is not None:
+            slot_profiler.reset()
+        self.refresh()
+
+    def refresh(self):
+        running = profiler.is_running()
+        self.start_btn.setEnabled(not running)
+        self.stop_btn.setEnabled(running)
+        slot_profiler = profiler.get_profiler()
+        if slot_profiler is None:
+            self.stats_view.setPlainText(t("slot-profiler-not-started"))
+        else:
+            self.stats_view.setPlainText(slot_profiler.format_table())
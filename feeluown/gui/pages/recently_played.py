@@ -1,6 +1,5 @@
 from feeluown.i18n import t
-from feeluown.utils.aio import run_afn
-from feeluown.utils.reader import create_reader
+from feeluown.utils.aio import run_afn, run_fn
 from feeluown.gui.page_containers.table import Renderer
 
 
@@ -15,7 +14,6 @@ class PlayerPlaylistRenderer(Renderer):
     async def render(self):
         self.meta_widget.title = t("recently-played")
         self.meta_widget.show()
-        songs = self._app.recently_played.list_songs()
-        reader = create_reader(songs)
+        reader = await run_fn(self._app.recently_played.create_songs_reader)
         self.show_songs(reader)
         self.toolbar.hide()
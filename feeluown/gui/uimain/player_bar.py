@@ -84,10 +84,12 @@ class PlayerControlPanel(QFrame):
             lambda volume: setattr(self._app.player, "volume", volume)
         )
         self._app.player.video_format_changed.connect(
-            self.on_video_format_changed, aioqueue=True
+            self.on_video_format_changed, aioqueue=True, coalesce=True
         )
         player = self._app.player
-        player.metadata_changed.connect(self.on_metadata_changed, aioqueue=True)
+        player.metadata_changed.connect(
+            self.on_metadata_changed, aioqueue=True, coalesce=True
+        )
         player.volume_changed.connect(self.volume_btn.on_volume_changed, aioqueue=True)
         self.cover_label.clicked.connect(self.show_nowplaying_overlay)
 
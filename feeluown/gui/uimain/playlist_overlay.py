@@ -27,7 +27,7 @@ from feeluown.gui.widgets.song_minicard_list import (
     SongMiniCardListModel,
     SongMiniCardListDelegate,
 )
-from feeluown.utils.reader import create_reader
+from feeluown.utils.aio import run_afn, run_fn
 
 
 PlaybackModeName = {
@@ -173,12 +173,9 @@ class PlaylistOverlay(QWidget):
             )
         else:
             self._hide_btns()
-            model = SongMiniCardListModel(
-                create_reader(self._app.recently_played.list_songs()),
-                fetch_cover_wrapper(self._app),
-            )
             view = SongMiniCardListView(**self._view_options)
-            view.setModel(model)
+            # Songs are read from the play history, which is a database.
+            run_afn(self._show_recently_played_songs, view)
             view.play_song_needed.connect(self._app.playlist.play_model)
             delegate = SongMiniCardListDelegate(
                 view,
@@ -191,6 +188,11 @@ class PlaylistOverlay(QWidget):
         self._stacked_layout.addWidget(view)
         self._stacked_layout.setCurrentWidget(view)
 
+    async def _show_recently_played_songs(self, view):
+        reader = await run_fn(self._app.recently_played.create_songs_reader)
+        model = SongMiniCardListModel(reader, fetch_cover_wrapper(self._app))
+        view.setModel(model)
+
     def _hide_btns(self):
         for btn in self._btns:
             btn.hide()
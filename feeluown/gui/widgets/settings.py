@@ -142,6 +142,23 @@ class AISettings(QWidget):
         self._app.config.AI_RADIO_PROMPT = self._prompt_editor.toPlainText()
 
 
+class DebugSettings(QWidget):
+    def __init__(self, app, dialog, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._app = app
+        self._dialog = dialog
+
+        self._layout = QHBoxLayout(self)
+        self.slot_profiler_btn = QPushButton(t("slot-profiler"), self)
+        self.slot_profiler_btn.clicked.connect(self._show_slot_profiler)
+        self._layout.addWidget(self.slot_profiler_btn)
+        self._layout.addStretch(0)
+
+    def _show_slot_profiler(self):
+        self._dialog.close()
+        self._app.browser.goto(page="/debug/slots")
+
+
 class SettingsDialog(QDialog):
     def __init__(self, app, parent=None):
         super().__init__(parent=parent)
@@ -171,6 +188,8 @@ class SettingsDialog(QDialog):
         self._layout.addWidget(network_settings)
         self._layout.addWidget(MidHeader(t("player")))
         self._layout.addWidget(PlayerSettings(self._app))
+        self._layout.addWidget(MidHeader(t("debug")))
+        self._layout.addWidget(DebugSettings(self._app, self))
         self._layout.addStretch(0)
 
     def update_source_in(self, source_in):
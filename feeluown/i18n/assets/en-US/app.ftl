@@ -328,6 +328,13 @@ search-providers = Search { -provider(capitalization: "uppercase") }s
 ai-radio-prompt = AI Radio (Prompt)
 network = Network
 player = Player
+debug = Debug
+slot-profiler = Slot Profiler
+slot-profiler-start = Start
+slot-profiler-stop = Stop
+slot-profiler-reset = Reset
+slot-profiler-refresh = Refresh
+slot-profiler-not-started = The profiler is not started yet
 # feeluown.gui.widgets.login
 # ----------------------------------------
 cookies-dialog-login-button = Login
@@ -302,6 +302,13 @@ search-providers = 検索ソース
 ai-radio-prompt = AI ラジオ（プロンプト）
 network = ネットワーク
 player = プレイヤー
+debug = デバッグ
+slot-profiler = スロットプロファイラ
+slot-profiler-start = 開始
+slot-profiler-stop = 停止
+slot-profiler-reset = リセット
+slot-profiler-refresh = 更新
+slot-profiler-not-started = プロファイラはまだ開始されていません
 
 # feeluown.gui.widgets.login
 # ----------------------------------------
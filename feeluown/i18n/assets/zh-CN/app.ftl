@@ -302,6 +302,13 @@ search-providers = 搜索来源
 ai-radio-prompt = AI 电台 (提示词)
 network = 网络
 player = 播放器
+debug = 调试
+slot-profiler = 槽函数性能统计
+slot-profiler-start = 开始
+slot-profiler-stop = 停止
+slot-profiler-reset = 重置
+slot-profiler-refresh = 刷新
+slot-profiler-not-started = 尚未开始统计
 
 # feeluown.gui.widgets.login
 # ----------------------------------------
@@ -26,7 +26,7 @@ from .excs import NoUserLoggedIn, ModelNotFound, \
 from .provider_protocol import *
 from .uri import (
     Resolver, reverse, resolve, ResolverNotFound, ResolveFailed,
-    parse_line, NS_TYPE_MAP,
+    parse_line, NS_TYPE_MAP, resolve_many, reverse_many,
 )
 from .collection import Collection, CollectionType
 from .standby import get_standby_score, STANDBY_DEFAULT_MIN_SCORE, STANDBY_FULL_SCORE
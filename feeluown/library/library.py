@@ -1,12 +1,16 @@
 # mypy: disable-error-code=type-abstract
+import asyncio
+import itertools
 import logging
+import time
 import warnings
 from collections import Counter
 from dataclasses import dataclass
-from typing import Callable, Optional, TypeVar, List, TYPE_CHECKING
+from typing import Callable, Dict, Optional, TypeVar, List, TYPE_CHECKING
 
 from feeluown.media import Media, MediaType
-from feeluown.utils.aio import run_fn, as_completed
+from feeluown.utils.aio import run_fn, as_completed, create_task, wait_for
+from feeluown.utils.scheduler import Priority
 from feeluown.utils.dispatch import Signal
 from feeluown.library.base import SearchType, ModelType
 from feeluown.library.provider import Provider
@@ -31,6 +35,8 @@ from feeluown.library.models import (
     AlbumModel,
 )
 from feeluown.library.model_state import ModelState
+from feeluown.library.model_cache import ModelCache
+from feeluown.library.standby_cache import StandbyCache
 from feeluown.library.provider_protocol import (
     check_flag as check_flag_impl,
     SupportsSongLyric,
@@ -57,6 +63,16 @@ logger = logging.getLogger(__name__)
 
 T_p = TypeVar("T_p")
 
+#: How many standby candidates prepare their media at the same time.
+STANDBY_RACE_SIZE = 3
+#: Delay (in seconds) before starting the next provider in staggered search.
+SEARCH_STAGGER_DELAY = 0.3
+#: Smoothing factor of the search latency EWMA.
+SEARCH_LATENCY_EWMA_ALPHA = 0.3
+#: Upgraded models of these types are kept in the model cache. Playlists are
+#: excluded since users edit them frequently.
+MODEL_CACHE_TYPES = (ModelType.song, ModelType.album, ModelType.artist, ModelType.video)
+
 
 @dataclass
 class SongStandbyOptions:
@@ -73,6 +89,8 @@ class SongStandbyOptions:
         candidate with ``STANDBY_FULL_SCORE``, only that candidate is returned
         for the provider. Earlier lower-score candidates from the same provider
         are discarded, and later candidates from that provider are ignored.
+    :param search_stagger_delay: Search providers one after another with this
+        delay. See :meth:`Library.a_search` for details.
     """
 
     source_in: Optional[List[str]] = None
@@ -80,6 +98,7 @@ class SongStandbyOptions:
     min_score: float = STANDBY_DEFAULT_MIN_SCORE
     limit_per_source: int = 1
     single_full_score_per_source: bool = False
+    search_stagger_delay: Optional[float] = None
 
 
 def raise_(e):
@@ -89,10 +108,18 @@ def raise_(e):
 class Library:
     """Resource entrypoints."""
 
-    def __init__(self, providers_standby=None, enable_ai_standby_matcher=True):
+    def __init__(
+        self,
+        providers_standby=None,
+        enable_ai_standby_matcher=True,
+        standby_cache: Optional[StandbyCache] = None,
+    ):
         """
 
-        :type app: feeluown.app.App
+        :param standby_cache: an in-memory cache is used if it is None.
+
+        .. versionchanged:: 5.2
+            Add `standby_cache` parameter.
         """
         self._providers_standby = providers_standby
         self._providers = set()
@@ -101,6 +128,12 @@ class Library:
 
         self.provider_added = Signal()  # emit(AbstractProvider)
         self.provider_removed = Signal()  # emit(AbstractProvider)
+        # {provider_id: latency_ewma}, used by the staggered search.
+        self._search_latency = {}
+        #: Cache for upgraded models, see :meth:`_model_upgrade`.
+        self.model_cache = ModelCache()
+        #: Cache for standby matches, see :meth:`a_list_song_standby_v3`.
+        self.standby_cache = standby_cache or StandbyCache()
         # TODO: implement this feature
         self.enable_ai_standby_matcher = enable_ai_standby_matcher
 
@@ -132,6 +165,15 @@ class Library:
             if _provider.identifier == provider.identifier:
                 raise ProviderAlreadyExists
         self._providers.add(provider)
+        # Provider can customize the model cache ttl by `meta.model_cache_ttl`.
+        ttl = getattr(provider.meta, "model_cache_ttl", None)
+        if ttl is not None:
+            self.model_cache.set_ttl(provider.identifier, ttl)
+        # A provider whose models are changed, such as the local provider, emits
+        # `library_changed(added, removed)`, and these models are uncached.
+        library_changed = getattr(provider, "library_changed", None)
+        if isinstance(library_changed, Signal):
+            library_changed.connect(self._on_provider_library_changed)
         self.provider_added.emit(provider)
 
         if isinstance(provider, SupportsUserAutoLogin):
@@ -146,10 +188,27 @@ class Library:
         """
         if provider in self._providers:
             self._providers.remove(provider)
+            self.model_cache.invalidate(provider.identifier)
+            library_changed = getattr(provider, "library_changed", None)
+            if isinstance(library_changed, Signal):
+                library_changed.disconnect(self._on_provider_library_changed)
             self.provider_removed.emit(provider)
             return True
         return False
 
+    def _on_provider_library_changed(self, added, removed):
+        ids_by_source: Dict[str, set] = {}
+        for song in itertools.chain(added, removed):
+            ids = ids_by_source.setdefault(song.source, set())
+            ids.add(song.identifier)
+            # The album and artists may be removed along with the song.
+            album = getattr(song, "album", None)
+            if album is not None:
+                ids.add(album.identifier)
+            ids.update(artist.identifier for artist in getattr(song, "artists", []))
+        for source, ids in ids_by_source.items():
+            self.model_cache.invalidate(source, ids)
+
     def get(self, identifier) -> Optional[Provider]:
         """Obtain the provider instance by the resource provider’s unique identifier."""
         for provider in self._providers:
@@ -188,24 +247,62 @@ class Library:
                     if result is not None:
                         yield result
 
+    def get_search_latency(self, source) -> Optional[float]:
+        """Get the smoothed search latency (in seconds) of a provider.
+
+        Return None if the provider has never been searched.
+
+        .. versionadded:: 5.2
+        """
+        return self._search_latency.get(source)
+
+    def _update_search_latency(self, source, elapsed):
+        latency = self._search_latency.get(source)
+        if latency is None:
+            latency = elapsed
+        else:
+            alpha = SEARCH_LATENCY_EWMA_ALPHA
+            latency = alpha * elapsed + (1 - alpha) * latency
+        self._search_latency[source] = latency
+
     async def a_search(
-        self, keyword, source_in=None, timeout=None, type_in=None, return_err=False, **_
+        self,
+        keyword,
+        source_in=None,
+        timeout=None,
+        type_in=None,
+        return_err=False,
+        stagger_delay=None,
+        **_,
     ):
         """async version of search
 
+        :param stagger_delay: When it is None, all providers are searched at
+            the same time. Otherwise, providers are searched in the order of
+            their historical latency (the fastest first), and the next
+            provider is started when one search finishes or when `stagger_delay`
+            seconds elapsed. The caller can stop iterating as soon as it gets
+            enough results, and the providers that are not started yet are
+            never searched (Happy Eyeballs requesting strategy).
+
         .. versionchanged:: 4.1.9
             Add `return_err` parameter.
 
-        TODO: add Happy Eyeballs requesting strategy if needed
+        .. versionchanged:: 5.2
+            Add `stagger_delay` parameter.
         """
         type_in = SearchType.batch_parse(type_in) if type_in else [SearchType.so]
 
         # Wrap the search function to associate the result with source.
         def wrap_search(pvd, kw, t):
             def search():
+                start = time.monotonic()
                 try:
                     res = pvd.search(kw, type_=t)
                 except Exception as e:  # noqa
+                    self._update_search_latency(
+                        pvd.identifier, time.monotonic() - start
+                    )
                     if return_err:
                         logger.exception("One provider search failed")
                         return SimpleSearchResult(
@@ -214,6 +311,7 @@ class Library:
                             err_msg=f"{type(e)}",
                         )
                     raise e
+                self._update_search_latency(pvd.identifier, time.monotonic() - start)
                 # When a provider does not implement search method, it returns None.
                 if res is not None and (
                     res.songs
@@ -229,10 +327,26 @@ class Library:
 
             return search
 
+        if stagger_delay is not None:
+            providers = sorted(
+                self._filter(identifier_in=source_in),
+                key=lambda pvd: self._search_latency.get(pvd.identifier, 0),
+            )
+            fns = [
+                (provider.identifier, wrap_search(provider, keyword, type_))
+                for provider in providers
+                for type_ in type_in
+            ]
+            async for result in self._a_run_staggered(fns, stagger_delay, timeout):
+                yield result
+            return
+
         fs = []  # future list
         for provider in self._filter(identifier_in=source_in):
             for type_ in type_in:
-                future = run_fn(wrap_search(provider, keyword, type_))
+                future = run_fn(
+                    wrap_search(provider, keyword, type_), source=provider.identifier
+                )
                 fs.append(future)
         for task_ in as_completed(fs, timeout=timeout):
             try:
@@ -242,10 +356,56 @@ class Library:
             else:
                 yield result
 
+    async def _a_run_staggered(self, fns, delay, timeout=None):
+        """Run blocking functions in order and yield their results.
+
+        :param fns: [(source, fn), ...]
+
+        The next function is started when a running one finishes or when
+        `delay` seconds elapsed since the last start. Functions which are
+        not started when the caller stops iterating are never run.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        pending = list(fns)
+        running = set()
+        try:
+            while pending or running:
+                if pending:
+                    source, fn = pending.pop(0)
+                    running.add(run_fn(fn, source=source))
+                wait_timeout = delay if pending else None
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        logger.warning("Search timeout, %d tasks left", len(running))
+                        return
+                    if wait_timeout is None or remaining < wait_timeout:
+                        wait_timeout = remaining
+                done, running = await asyncio.wait(
+                    running, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task_ in done:
+                    try:
+                        result = task_.result()
+                    except Exception:  # noqa
+                        logger.exception("One search task failed")
+                    else:
+                        yield result
+        finally:
+            for task_ in running:
+                task_.cancel()
+
     async def a_song_prepare_media_no_exc(self, standby, policy):
         media = None
         try:
-            media = await run_fn(self.song_prepare_media, standby, policy)
+            media = await run_fn(
+                self.song_prepare_media,
+                standby,
+                policy,
+                source=standby.source,
+                priority=Priority.high,
+            )
         except MediaNotFound as e:
             logger.debug(f"standby media not found: {e}")
         except:  # noqa
@@ -257,7 +417,16 @@ class Library:
         song,
         options=None,
     ) -> List[BriefSongModel]:
-        """List song standbys without preparing media."""
+        """List song standbys without preparing media.
+
+        The best standby (or the fact that no standby is found) is kept in
+        :attr:`standby_cache`. When the song hits the cache, only the cached
+        standby is returned and providers are not searched. The cache is not
+        used when a custom `score_fn` is given.
+
+        .. versionchanged:: 5.2
+            Check the standby cache before searching.
+        """
         if options is None:
             options = SongStandbyOptions()
 
@@ -265,16 +434,52 @@ class Library:
         if not q.strip():
             return []
 
+        use_cache = options.score_fn is None
+        if use_cache:
+            entry = self.standby_cache.get(song)
+            if entry is not None:
+                if entry.standby is None:
+                    # Negative entries are only valid for the default sources.
+                    if options.source_in is None:
+                        logger.debug(f"no standby for {song} (cached)")
+                        return []
+                elif (
+                    entry.score >= options.min_score
+                    and self.get(entry.standby.source) is not None
+                    and (
+                        options.source_in is None
+                        or entry.standby.source in options.source_in
+                    )
+                ):
+                    logger.debug(f"standby for {song} is found in cache")
+                    return [entry.standby]
+
+        failed_sources: set = set()
+        standbys = await self._a_list_song_standby_v3_no_cache(
+            song, q, options, failed_sources
+        )
+        if use_cache and options.source_in is None:
+            if standbys:
+                score = get_standby_score(song, standbys[0])
+                self.standby_cache.set(song, standbys[0], score)
+            # The standby may exist in providers which failed to search.
+            elif not failed_sources:
+                self.standby_cache.set_not_found(song)
+        return standbys
+
+    async def _a_list_song_standby_v3_no_cache(
+        self, song, q, options, failed_sources
+    ):
         if options.source_in is not None:
             pvd_ids = self._get_registered_provider_ids(options.source_in)
             return await self._a_list_song_standby_v3_from_sources(
-                song, q, pvd_ids, options
+                song, q, pvd_ids, options, failed_sources
             )
 
         standby_pvd_ids = self._get_registered_provider_ids(self._providers_standby)
         if standby_pvd_ids:
             standbys = await self._a_list_song_standby_v3_from_sources(
-                song, q, standby_pvd_ids, options
+                song, q, standby_pvd_ids, options, failed_sources
             )
             if standbys:
                 return standbys
@@ -286,7 +491,7 @@ class Library:
             if pvd.identifier not in standby_pvd_id_set
         ]
         return await self._a_list_song_standby_v3_from_sources(
-            song, q, other_pvd_ids, options
+            song, q, other_pvd_ids, options, failed_sources
         )
 
     def _get_registered_provider_ids(self, source_in):
@@ -305,7 +510,11 @@ class Library:
         query,
         source_in,
         options,
+        failed_sources: set,
     ) -> List[BriefSongModel]:
+        """
+        :param failed_sources: sources which failed to search are added to it.
+        """
         if not source_in:
             return []
 
@@ -315,9 +524,16 @@ class Library:
         scored_standbys = []
         standby_counter = Counter()
         full_score_sources = set()
-        async for result in self.a_search(query, source_in=source_in):
+        async for result in self.a_search(
+            query,
+            source_in=source_in,
+            return_err=True,
+            stagger_delay=options.search_stagger_delay,
+        ):
             if result is None:
                 continue
+            if result.err_msg:
+                failed_sources.add(result.source)
             for standby in result.songs:
                 source = standby.source
                 if source in full_score_sources:
@@ -358,10 +574,27 @@ class Library:
         score_fn=None,
         min_score=STANDBY_DEFAULT_MIN_SCORE,
         limit=1,
+        race_size=STANDBY_RACE_SIZE,
+        prepare_timeout=None,
+        search_stagger_delay=SEARCH_STAGGER_DELAY,
+        failed_sources: Optional[set] = None,
     ):
         """list song standbys and their media
 
+        :param race_size: how many candidates prepare media at the same time.
+            1 means candidates are tried one by one.
+        :param prepare_timeout: deadline (in seconds) for each candidate to
+            prepare its media. None means no deadline.
+        :param search_stagger_delay: see :meth:`a_search`. Since this method
+            returns once enough full score standbys are found, slow providers
+            may never be searched.
+        :param failed_sources: sources which failed to search are added to it.
+
         .. versionadded:: 3.7.8
+
+        .. versionchanged:: 5.2
+            Add `race_size`, `prepare_timeout`, `search_stagger_delay`
+            and `failed_sources` parameters.
         """
         if source_in is None:
             if self._providers_standby is None:
@@ -378,9 +611,16 @@ class Library:
         standby_score_list = []  # [(standby, score), (standby, score)]
         song_media_list = []  # [(standby, media), (standby, media)]
         top2_standby = []
-        async for result in self.a_search(q, source_in=pvd_ids):
+        async for result in self.a_search(
+            q,
+            source_in=pvd_ids,
+            return_err=failed_sources is not None,
+            stagger_delay=search_stagger_delay,
+        ):
             if result is None:
                 continue
+            if result.err_msg:
+                failed_sources.add(result.source)  # type: ignore[union-attr]
             # Only check the first 3 songs
             for i, standby in enumerate(result.songs):
                 # HACK(cosven): I think the local provider should not be included,
@@ -422,17 +662,63 @@ class Library:
                 key=lambda song_score: song_score[1],
                 reverse=True,
             )
-            for standby, _ in sorted_standby_score_list:
-                # TODO: send multiple requests at a time.
-                media = await self.a_song_prepare_media_no_exc(
-                    standby, audio_select_policy
+            song_media_list.extend(
+                await self._a_race_song_prepare_media(
+                    [standby for standby, _ in sorted_standby_score_list],
+                    audio_select_policy,
+                    limit=limit - len(song_media_list),
+                    race_size=race_size,
+                    timeout=prepare_timeout,
                 )
+            )
+        return song_media_list
+
+    async def _a_race_song_prepare_media(
+        self, standbys, policy, limit=1, race_size=STANDBY_RACE_SIZE, timeout=None
+    ):
+        """Prepare media for standbys concurrently.
+
+        At most `race_size` candidates are prepared at the same time. Results
+        are picked in the order of `standbys` (so a better candidate wins even
+        if it is slower), and the remaining requests are cancelled as soon as
+        `limit` media are found.
+
+        :return: [(standby, media), ...]
+        """
+        race_size = max(race_size, 1)
+        pending = list(standbys)
+        running = []  # [(standby, task), ...]
+        song_media_list = []  # [(standby, media), ...]
+
+        def fill_running():
+            while pending and len(running) < race_size:
+                standby = pending.pop(0)
+                coro = self.a_song_prepare_media_no_exc(standby, policy)
+                if timeout is not None:
+                    coro = wait_for(coro, timeout)
+                running.append((standby, create_task(coro)))
+
+        start = time.monotonic()
+        try:
+            fill_running()
+            while running and len(song_media_list) < limit:
+                standby, task = running.pop(0)
+                try:
+                    media = await task
+                except asyncio.TimeoutError:
+                    logger.info(f"prepare standby:{standby} media timeout")
+                    media = None
                 if media is not None:
                     song_media_list.append((standby, media))
-                    if len(song_media_list) >= limit:
-                        return song_media_list
-            if song_media_list:
-                return song_media_list
+                fill_running()
+        finally:
+            for _, task in running:
+                task.cancel()
+            logger.info(
+                f"standby media race finished in {time.monotonic() - start:.3f}s, "
+                f"{len(song_media_list)} media found, "
+                f"{len(running) + len(pending)} candidates cancelled"
+            )
         return song_media_list
 
     def check_flags(self, source: str, model_type: ModelType, flags: PF) -> bool:
@@ -591,7 +877,15 @@ class Library:
         provider = self.get(pid)
         if provider is None:
             raise ModelNotFound(f"provider:{pid} not found")
-        return provider.model_get(mtype, mid)
+        return self._model_get_cached(provider, ModelType(mtype), mid)
+
+    def _model_get_cached(self, provider, model_type, model_id):
+        if model_type not in MODEL_CACHE_TYPES:
+            return provider.model_get(model_type, model_id)
+        return self.model_cache.get_or_fetch(
+            (provider.identifier, model_type, model_id),
+            lambda: provider.model_get(model_type, model_id),
+        )
 
     def model_get_cover(self, model):
         """Get the cover url of model
@@ -637,6 +931,10 @@ class Library:
         .. versionchanged:: 3.8.11
             Raise ModelNotFound if the model does not exist.
             Before ModelCannotUpgrade was raised.
+
+        .. versionchanged:: 5.2
+            Upgraded models are cached in :attr:`model_cache`, and concurrent
+            upgrades of the same model share one provider request.
         """
         # Return model directly if it is already a normal(upgraded) model.
         if MF.normal in model.meta.flags:
@@ -647,7 +945,9 @@ class Library:
         if provider is None:
             raise ModelNotFound(f"provider:{model.source} not found")
         try:
-            upgraded_model = provider.model_get(model_type, model.identifier)
+            upgraded_model = self._model_get_cached(
+                provider, model_type, model.identifier
+            )
         except ModelNotFound as e:
             if e.reason is ModelNotFound.Reason.not_found:
                 model.state = ModelState.not_exists
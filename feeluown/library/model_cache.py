@@ -0,0 +1,172 @@
+"""
+feeluown.library.model_cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+An identity cache for upgraded(normal) models.
+
+Brief models are upgraded again and again, by the metadata assembler,
+the cover fetcher and the GUI. The cache keeps the upgraded model for
+a while, so that the provider is requested only once.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from feeluown.excs import ModelNotFound
+
+#: Maximum number of models (and negative entries) kept in the cache.
+MODEL_CACHE_DEFAULT_MAXSIZE = 2048
+#: Seconds that an upgraded model lives in the cache.
+MODEL_CACHE_DEFAULT_TTL = 600
+#: Seconds that a ModelNotFound result lives in the cache.
+MODEL_CACHE_NEGATIVE_TTL = 60
+
+
+class _Flight:
+    """An upgrade request that is running."""
+
+    def __init__(self):
+        self.event = Event()
+        self.value: Any = None
+        self.exc: Optional[Exception] = None
+
+
+class ModelCache:
+    """LRU cache with TTL, negative caching and single-flight fetching
+
+    The cache is thread safe, since models are usually upgraded in
+    executor threads.
+
+    >>> cache = ModelCache(maxsize=2)
+    >>> cache.get_or_fetch(('fake', 1, '1'), lambda: 'model')
+    'model'
+    >>> cache.get_or_fetch(('fake', 1, '1'), lambda: 'another model')
+    'model'
+    >>> cache.stats()['hits'], cache.stats()['misses']
+    (1, 1)
+    """
+
+    def __init__(
+        self,
+        maxsize=MODEL_CACHE_DEFAULT_MAXSIZE,
+        ttl=MODEL_CACHE_DEFAULT_TTL,
+        negative_ttl=MODEL_CACHE_NEGATIVE_TTL,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._lock = Lock()
+        # key -> (expired_at, value, exc)
+        self._data: OrderedDict = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        # {source: ttl}, the ttl for models of a specific provider.
+        self._ttls: Dict[str, Optional[float]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0  # Requests that wait for a running flight.
+
+    def set_ttl(self, source: str, ttl: Optional[float]):
+        """Set ttl for models of a provider. 0 disables the cache for it."""
+        self._ttls[source] = ttl
+
+    def get_ttl(self, source: str) -> Optional[float]:
+        return self._ttls.get(source, self.ttl)
+
+    def get_or_fetch(self, key, fetch: Callable[[], Any]):
+        """Get the value from the cache, call `fetch` if it does not exist
+
+        `key` is a tuple and its first item must be the provider identifier.
+        Concurrent calls with the same key share one `fetch` call.
+
+        :raises ModelNotFound: fetch raises ModelNotFound
+        """
+        ttl = self.get_ttl(key[0])
+        if ttl == 0:
+            return fetch()
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expired_at, value, exc = entry
+                if expired_at is None or expired_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if exc is not None:
+                        raise ModelNotFound(*exc.args, reason=exc.reason)
+                    return value
+                del self._data[key]
+            self.misses += 1
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                is_leader = True
+            else:
+                self.merged += 1
+                is_leader = False
+
+        if not is_leader:
+            flight.event.wait()
+            if isinstance(flight.exc, ModelNotFound):
+                raise ModelNotFound(*flight.exc.args, reason=flight.exc.reason)
+            if flight.exc is not None:
+                raise flight.exc
+            return flight.value
+
+        try:
+            value = fetch()
+        except ModelNotFound as e:
+            flight.exc = e
+            self._set(key, None, e, self.negative_ttl)
+            raise
+        except Exception as e:
+            flight.exc = e
+            raise
+        else:
+            flight.value = value
+            # Some providers return None instead of raising ModelNotFound.
+            if value is not None:
+                self._set(key, value, None, ttl)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+        return value
+
+    def _set(self, key, value, exc, ttl):
+        expired_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expired_at, value, exc)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, source: Optional[str] = None, ids=None):
+        """Remove models of a provider, or all models if source is None.
+
+        :param ids: only remove models of the provider with these identifiers.
+
+        .. versionchanged:: 5.2
+            Add `ids` parameter.
+        """
+        with self._lock:
+            if source is None:
+                self._data.clear()
+            else:
+                ids = None if ids is None else set(ids)
+                for key in [key for key in self._data if key[0] == source
+                            and (ids is None or key[2] in ids)]:
+                    del self._data[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "merged": self.merged,
+            }
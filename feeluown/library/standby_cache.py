@@ -0,0 +1,165 @@
+"""
+feeluown.library.standby_cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A persistent cache for standby matches.
+
+Finding a standby searches every provider and scores the results, which is
+slow. Imported songs (such as dummy songs) are usually bad songs, so the same
+song is matched again and again. The cache remembers the chosen standby for a
+song, as well as the fact that no standby is found.
+"""
+
+import json
+import logging
+import os
+import time
+import unicodedata
+from threading import Lock
+from typing import Dict, NamedTuple, Optional
+
+from .uri import parse_line, reverse, ResolveFailed
+
+logger = logging.getLogger(__name__)
+
+#: Seconds that a standby match lives in the cache.
+STANDBY_CACHE_TTL = 7 * 24 * 3600
+#: Seconds that a "no standby found" entry lives in the cache. Providers
+#: may add the song later, so the entry expires sooner.
+STANDBY_CACHE_NEGATIVE_TTL = 24 * 3600
+#: Maximum number of entries kept in the cache file.
+STANDBY_CACHE_MAXSIZE = 10000
+
+
+class StandbyCacheEntry(NamedTuple):
+    #: The standby song, None means no standby is found.
+    standby: Optional[object]
+    score: float
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(unicodedata.normalize('NFKC', text or '').casefold().split())
+
+
+def standby_key(song) -> str:
+    """Return the normalized key of the song which looks for a standby
+
+    >>> from feeluown.library import BriefSongModel
+    >>> song = BriefSongModel(source='dummy', identifier='1', title=' Hello  ',
+    ...                       artists_name='ADELE', duration_ms='04:55')
+    >>> standby_key(song)
+    'hello\\tadele\\t\\t04:55'
+    """
+    return '\t'.join([
+        _normalize(song.title),
+        _normalize(song.artists_name),
+        _normalize(song.album_name),
+        song.duration_ms or '',
+    ])
+
+
+class StandbyCache:
+    """Map songs to their standbys, with TTL and negative entries
+
+    The cache is loaded from the file on first access, and it is saved
+    explicitly by :meth:`save`. If `fpath` is None, the cache is in memory.
+    """
+
+    def __init__(
+        self,
+        fpath: Optional[str] = None,
+        ttl=STANDBY_CACHE_TTL,
+        negative_ttl=STANDBY_CACHE_NEGATIVE_TTL,
+        maxsize=STANDBY_CACHE_MAXSIZE,
+    ):
+        self._fpath = fpath
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+
+        self._lock = Lock()
+        self._loaded = False
+        self._dirty = False
+        # {key: (standby line or None, score, expired_at)}.
+        # Wall clock time is used since entries are persisted.
+        self._entries: Dict[str, tuple] = {}
+
+    def get(self, song) -> Optional[StandbyCacheEntry]:
+        """Return the cached entry for the song, None if it is not cached."""
+        key = standby_key(song)
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            line, score, expired_at = entry
+            if expired_at < time.time():
+                del self._entries[key]
+                self._dirty = True
+                return None
+        if line is None:
+            return StandbyCacheEntry(None, score)
+        try:
+            standby, _ = parse_line(line)
+        except ResolveFailed:
+            logger.warning(f"invalid standby cache entry: {line}")
+            self.invalidate(song)
+            return None
+        return StandbyCacheEntry(standby, score)
+
+    def set(self, song, standby, score: float):
+        """Remember the standby of the song."""
+        self._set(song, reverse(standby, as_line=True), score, self.ttl)
+
+    def set_not_found(self, song):
+        """Remember that there is no standby for the song."""
+        self._set(song, None, 0, self.negative_ttl)
+
+    def _set(self, song, line, score, ttl):
+        key = standby_key(song)
+        with self._lock:
+            self._ensure_loaded()
+            # Python dict keeps insertion order, the oldest entry goes first.
+            self._entries.pop(key, None)
+            self._entries[key] = (line, score, time.time() + ttl)
+            while len(self._entries) > self.maxsize:
+                del self._entries[next(iter(self._entries))]
+            self._dirty = True
+
+    def invalidate(self, song):
+        with self._lock:
+            self._ensure_loaded()
+            if self._entries.pop(standby_key(song), None) is not None:
+                self._dirty = True
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self._fpath is None:
+            return
+        try:
+            with open(self._fpath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (json.decoder.JSONDecodeError, UnicodeDecodeError):
+            logger.exception('invalid standby cache file')
+            return
+        now = time.time()
+        for key, entry in data.get('entries', {}).items():
+            if entry[2] > now:
+                self._entries[key] = tuple(entry)
+        logger.info(f'{len(self._entries)} standby cache entries are loaded')
+
+    def save(self):
+        """Save the cache into the file if it is changed."""
+        with self._lock:
+            if self._fpath is None or not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        tmp_fpath = self._fpath + '.tmp'
+        with open(tmp_fpath, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': entries}, f, ensure_ascii=False)
+        os.replace(tmp_fpath, self._fpath)
@@ -17,6 +17,7 @@ Currently, there is not way to achieve this.
 """
 
 import asyncio
+import functools
 import logging
 import json
 import re
@@ -24,7 +25,7 @@ import warnings
 
 from .base import ModelType
 from .model_state import ModelState
-from .models import get_modelcls_by_type
+from .models import get_modelcls_by_type, V2SupportedModelTypes
 
 
 logger = logging.getLogger(__name__)
@@ -69,6 +70,8 @@ class Resolver:
 
 
 DELIMETER = ' - '
+#: Number of lines cached by :func:`reverse`.
+REVERSE_CACHE_SIZE = 4096
 
 
 def quote_field(field: str) -> str:
@@ -94,17 +97,15 @@ def unquote_field(field):
     return json.loads(field)
 
 
-quoted_delim_re = re.compile(rf'"([^"\\]*(?:\\.[^"\\]*)*)"?{DELIMETER}', re.S)
-normal_delim_re = re.compile(rf'.*?{DELIMETER}')
-quoted_eof_re = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"$', re.S)
-normal_eof_re = re.compile(r'.+$')
-
-
-class TokenType:
-    quoted_delim = 0
-    quoted_eof = 1
-    normal_delim = 2
-    normal_eof = 3
+# A field is one of the four tokens: a quoted field followed by a delimiter,
+# a quoted field at the end, a normal field followed by a delimiter and
+# a normal field at the end. Alternatives are tried in this order.
+_field_re = re.compile(
+    rf'(?s:(?P<quoted_delim>"[^"\\]*(?:\\.[^"\\]*)*"?){DELIMETER})'
+    rf'|(?s:(?P<quoted_eof>"[^"\\]*(?:\\.[^"\\]*)*")$)'
+    rf'|(?P<normal_delim>.*?){DELIMETER}'
+    r'|(?P<normal_eof>.+$)'
+)
 
 
 def _split(s: str, num: int) -> list:
@@ -124,45 +125,33 @@ def _split(s: str, num: int) -> list:
     ['Flower Dance', 'DJ OKAWARI', '', '']
     >>> _split('Flower Dance - DJ OKAWARI - ""', 4)
     ['Flower Dance', 'DJ OKAWARI', '', '']
+    >>> _split('"决 - 定" - 李宗盛', 2)
+    ['决 - 定', '李宗盛']
     """
     # when the trailing whitespace is deleted by accident,
     # we just delete the DELIMTER part
     if s.endswith(' -'):
         s = s[:-2]
 
-    rules = [(TokenType.quoted_delim, quoted_delim_re),
-             (TokenType.quoted_eof, quoted_eof_re),
-             (TokenType.normal_delim, normal_delim_re),
-             (TokenType.normal_eof, normal_eof_re)]
-
-    fields = []
-    pos = 0
-    while True:
-        for rule in rules:
-            token_type, regex = rule
-            m = regex.match(s, pos)
+    if '"' not in s and '\n' not in s:
+        # Fast path: no field is quoted, the rules are same as str.split,
+        # except that the empty field after the last delimiter is dropped.
+        fields = s.split(DELIMETER)
+        if not fields[-1]:
+            fields.pop()
+    else:
+        fields = []
+        pos = 0
+        while pos != len(s):
+            m = _field_re.match(s, pos)
             if m is None:
-                continue
-
-            # handle value by token type
-            value = m.group()
-            if token_type is TokenType.quoted_delim:
-                fields.append(unquote_field(value[:-3]))
-            elif token_type is TokenType.quoted_eof:
-                fields.append(unquote_field(value))
-
-            elif token_type is TokenType.normal_delim:
-                fields.append(value[:-3])
-            else:  # TokenType.delim_eof
-                fields.append(value)
-
-            pos = m.end()
-            break
-        else:
-            if pos != len(s):
                 raise ValueError('invalid fields string')
-            else:
-                break
+            token_type = m.lastgroup
+            value = m.group(token_type)
+            if token_type in ('quoted_delim', 'quoted_eof'):
+                value = unquote_field(value)
+            fields.append(value)
+            pos = m.end()
 
     if len(fields) != num:
         current = len(fields)
@@ -208,6 +197,16 @@ def parse_unknown(_):
     return {}
 
 
+_line_re = re.compile(
+    r'^fuo://(\w+)/({})/([\w-]+)'.format('|'.join(TYPE_NS_MAP.values())))
+_parse_funcs = {
+    'songs': parse_song_str,
+    'albums': parse_album_str,
+    'artists': parse_artist_str,
+    'videos': parse_video_str,
+}
+
+
 def parse_line(line):
     """parse text line and return a model instance
 
@@ -226,25 +225,14 @@ def parse_line(line):
         uri, model_str = parts
     else:
         uri, model_str = parts[0], ''
-    ns_list = list(TYPE_NS_MAP.values())
-    p = re.compile(r'^fuo://(\w+)/({})/([\w-]+)'.format('|'.join(ns_list)))
     uri = uri.strip()
-    m = p.match(uri)
+    m = _line_re.match(uri)
     if not m:
         raise ResolveFailed('invalid line: {}'.format(line))
     source, ns, identifier = m.groups()
     path = uri[m.end():]
     Model = get_modelcls_by_type(NS_TYPE_MAP[ns], brief=True)
-    if ns == 'songs':
-        parse_func = parse_song_str
-    elif ns == 'albums':
-        parse_func = parse_album_str
-    elif ns == 'artists':
-        parse_func = parse_artist_str
-    elif ns == 'videos':
-        parse_func = parse_video_str
-    else:
-        parse_func = parse_unknown
+    parse_func = _parse_funcs.get(ns, parse_unknown)
     data = parse_func(model_str.strip())
     data['source'] = source
     model = Model(identifier=identifier, **data)
@@ -256,18 +244,9 @@ def resolve(line, model=None):
 
     for example, line can be 'fuo://local/songs/1/cover/data'
     """
-    from feeluown.library import get_modelcls_by_type, V2SupportedModelTypes
-
     if model is None:
         model, path = parse_line(line)
-        library = Resolver.library
-        provider = library.get(model.source)
-        if provider is None:
-            model.state = ModelState.not_exists
-        else:
-            model_type = ModelType(model.meta.model_type)
-            modelcls = get_modelcls_by_type(model_type, brief=True)
-            assert modelcls is not None and model_type in V2SupportedModelTypes
+        _check_provider(model, Resolver.library.get(model.source))
     else:
         path = line
     # NOTE: the path resolve logic is deprecated
@@ -284,7 +263,89 @@ def resolve(line, model=None):
     return model
 
 
+def _check_provider(model, provider):
+    if provider is None:
+        model.state = ModelState.not_exists
+    else:
+        model_type = ModelType(model.meta.model_type)
+        modelcls = get_modelcls_by_type(model_type, brief=True)
+        assert modelcls is not None and model_type in V2SupportedModelTypes
+
+
+def resolve_many(lines) -> list:
+    """Resolve lines, lines which can not be resolved are skipped
+
+    It is faster than calling :func:`resolve` for each line, since providers
+    are looked up once per source.
+
+    .. versionadded:: 5.2
+    """
+    library = Resolver.library
+    providers = {}
+    models = []
+    for line in lines:
+        try:
+            model, path = parse_line(line)
+            source = model.source
+            if source not in providers:
+                providers[source] = library.get(source)
+            _check_provider(model, providers[source])
+            if path:
+                model = resolve(path, model=model)
+        except ResolverNotFound:
+            logger.warning('resolver not found for line:%s', line)
+        except ResolveFailed as e:
+            logger.warning('resolve failed, line:%s, error:%s', line, e)
+        else:
+            models.append(model)
+    return models
+
+
+#: Field names of the line of a model type, see :func:`reverse`.
+_LINE_FIELDS = {
+    ModelType.song: ('title', 'artists_name', 'album_name', 'duration_ms'),
+    ModelType.album: ('name', 'artists_name'),
+    ModelType.artist: ('name', ),
+    ModelType.video: ('title', ),
+}
+_line_field_names = {}  # {model class: field names}
+
+
+def _get_line_fields(model) -> tuple:
+    cls = type(model)
+    names = _line_field_names.get(cls)
+    if names is None:
+        # The `xxx_display` attribute is resolved by `BaseModel.__getattr__`,
+        # which is slow, so the field is read directly unless the class
+        # defines a `xxx_display` attribute.
+        names = _line_field_names[cls] = tuple(
+            f'{name}_display' if hasattr(cls, f'{name}_display') else name
+            for name in _LINE_FIELDS.get(model.meta.model_type, ())
+        )
+    return tuple([getattr(model, name) for name in names])
+
+
+@functools.lru_cache(maxsize=REVERSE_CACHE_SIZE)
+def _reverse_line(uri, fields):
+    # strip emtpy suffix
+    fields = list(fields)
+    for field in reversed(fields):
+        if not field:
+            fields.pop(-1)
+        else:
+            break
+
+    if fields and any((bool(f) for f in fields)):
+        model_str = DELIMETER.join([quote_field(f) for f in fields])
+        return uri + '\t# ' + model_str
+    return uri
+
+
 def reverse(model, path='', as_line=False):
+    """
+    .. versionchanged:: 5.2
+        Lines are cached by the uri and the fields of the model.
+    """
     if path:
         warnings.warn('model path resolver will be removed')
         paths = getattr(model.meta, 'paths', [])
@@ -292,40 +353,19 @@ def reverse(model, path='', as_line=False):
             raise NoReverseMatch(f'no-reverse-match for model:{model} path:{path}')
 
     source = model.source
-    ns = TYPE_NS_MAP[model.meta.model_type]
+    model_type = model.meta.model_type
+    ns = TYPE_NS_MAP[model_type]
     identifier = model.identifier
-    uri = 'fuo://{}/{}/{}'.format(source, ns, identifier)
-    text = uri + (path if path else '')
+    text = f'fuo://{source}/{ns}/{identifier}{path}'
     if as_line:
-        if model.meta.model_type == ModelType.song:
-            song = model
-            fields = [song.title_display,
-                      song.artists_name_display,
-                      song.album_name_display,
-                      song.duration_ms_display]
-        elif model.meta.model_type == ModelType.album:
-            album = model
-            fields = [album.name_display,
-                      album.artists_name_display]
-        elif model.meta.model_type == ModelType.artist:
-            artist = model
-            fields = [artist.name_display]
-        elif model.meta.model_type == ModelType.video:
-            video = model
-            fields = [video.title_display]
-        else:
+        if model_type not in _LINE_FIELDS:
             logger.warning('The display fields are dropped during reverse')
-            fields = []
-
-        # strip emtpy suffix
-        for field in reversed(fields):
-            if not field:
-                fields.pop(-1)
-            else:
-                break
-
-        if fields and any((bool(f) for f in fields)):
-            model_str = DELIMETER.join([quote_field(f) for f in fields])
-            text += '\t# '
-            text += model_str
+        return _reverse_line(text, _get_line_fields(model))
     return text
+
+
+def reverse_many(models, as_line=False) -> list:
+    """
+    .. versionadded:: 5.2
+    """
+    return [reverse(model, as_line=as_line) for model in models]
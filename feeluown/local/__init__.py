@@ -57,6 +57,19 @@ def init_config(config):
         default=None,
         desc="Strings to be protected when using delimiters on artist info",
     )
+    config.deffield(
+        "SCAN_WORKERS",
+        type_=int,
+        default=0,
+        desc="Number of processes reading metadata when scanning, "
+        "0 means cpu count (at most 4)",
+    )
+    config.deffield(
+        "WATCH_MUSIC_FOLDERS",
+        type_=bool,
+        default=True,
+        desc="Watch music folders and update the library when files are changed",
+    )
     config.deffield(
         "SPLIT_ALBUM_ARTIST_NAME",
         type_=bool,
@@ -69,6 +82,12 @@ async def autoload(app):
     await aio.run_fn(provider.scan, app.config.local, app.config.local.MUSIC_FOLDERS)
 
     app.show_msg(t("local-tracks-scan-finished"))
+    await aio.run_fn(provider.extract_covers)
+    if app.config.local.WATCH_MUSIC_FOLDERS:
+        provider.start_watching(app.config.local, app.config.local.MUSIC_FOLDERS)
+        app.about_to_shutdown.connect(
+            lambda _: provider.stop_watching(), weak=False, aioqueue=False
+        )
 
 
 def enable(app):
@@ -0,0 +1,108 @@
+"""
+feeluown.local.cover_store
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A disk store for covers embedded in local music files.
+
+Covers are deduplicated by content hash, so a cover shared by many songs
+is stored once. If Pillow is installed, a few scaled copies are stored as
+well, so that small widgets do not need to decode big images.
+"""
+
+import hashlib
+import io
+import logging
+import os
+from typing import Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+#: Edge lengths (in pixels) of the scaled copies of a cover.
+COVER_SIZES = (128, 512)
+
+
+class CoverStore:
+    """Store covers in a directory, a cover is identified by its key
+
+    The original cover is saved as ``{key[:2]}/{key}``, and a scaled copy
+    is saved as ``{key[:2]}/{key}_{size}`` in JPEG format.
+    """
+
+    def __init__(self, directory: str, sizes: Sequence[int] = COVER_SIZES):
+        self.directory = directory
+        self.sizes = sorted(sizes)
+
+    def _path(self, key, size=None):
+        name = key if size is None else f'{key}_{size}'
+        return os.path.join(self.directory, key[:2], name)
+
+    def put(self, data: bytes) -> str:
+        """Save the cover if it is not saved yet, return its key."""
+        key = hashlib.sha1(data).hexdigest()
+        fpath = self._path(key)
+        if os.path.exists(fpath):
+            return key
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        for size, content in self._scale(data):
+            self._write(self._path(key, size), content)
+        # Write the original at last, so that a key is complete once
+        # the original exists.
+        self._write(fpath, data)
+        return key
+
+    def get(self, key: str, size: Optional[int] = None) -> Optional[bytes]:
+        """Return the smallest copy not smaller than `size`, or the original.
+
+        Return None if the cover is not found.
+        """
+        paths = []
+        if size is not None:
+            paths.extend(self._path(key, s) for s in self.sizes if s >= size)
+        paths.append(self._path(key))
+        for fpath in paths:
+            try:
+                with open(fpath, 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def prune(self, keys: Iterable[str]):
+        """Remove covers whose keys are not in `keys`."""
+        keys = set(keys)
+        if not os.path.isdir(self.directory):
+            return
+        for sub_dir in os.scandir(self.directory):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.split('_', 1)[0] not in keys:
+                    os.remove(entry.path)
+
+    def _write(self, fpath, data):
+        tmp_fpath = fpath + '.tmp'
+        with open(tmp_fpath, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_fpath, fpath)
+
+    def _scale(self, data):
+        try:
+            from PIL import Image
+        except ImportError:
+            return
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except Exception:  # noqa, Pillow raises various errors.
+            logger.warning('cover can not be decoded, it is stored as it is')
+            return
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        for size in self.sizes:
+            if max(image.size) <= size:
+                break
+            scaled = image.copy()
+            scaled.thumbnail((size, size))
+            buf = io.BytesIO()
+            scaled.save(buf, format='JPEG', quality=90)
+            yield size, buf.getvalue()
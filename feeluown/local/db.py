@@ -1,18 +1,28 @@
 import base64
-import json
+import itertools
 import logging
+import multiprocessing
 import os
+import pickle
 import re
-from typing import Optional
-
-from pydantic import ValidationError
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import wraps
+from typing import Iterable, Iterator, Optional, Tuple
+
+from pydantic import ValidationError, VERSION as PYDANTIC_VERSION
 from mutagen import MutagenError
 from mutagen.mp3 import EasyMP3
 from mutagen.easymp4 import EasyMP4
 from mutagen.flac import FLAC
 from mutagen.apev2 import APEv2File
 
-from feeluown.serializers import serialize
+from feeluown import __version__ as feeluown_version
+from feeluown.utils.dispatch import Signal
 from feeluown.utils.utils import elfhash, log_exectime
 from feeluown.utils.lang import can_convert_chinese, convert_chinese
 from feeluown.library import SongModel, AlbumModel, ArtistModel, AlbumType
@@ -21,11 +31,25 @@ from feeluown.library import reverse
 
 from .schemas import EasyMP3Model, APEModel, FLACModel
 from .schemas import DEFAULT_ALBUM_NAME
+from .search_index import SearchIndex
 
 
 logger = logging.getLogger(__name__)
 SOURCE = 'local'
 
+#: Paths are sent to metadata workers in chunks to reduce IPC overhead.
+SCAN_CHUNK_SIZE = 64
+#: Starting worker processes takes time, so worker processes are used only
+#: when there are at least this many files.
+SCAN_PARALLEL_THRESHOLD = 256
+#: Each worker process imports the app, so the default number of workers
+#: is capped, even if the machine has many cores.
+SCAN_DEFAULT_MAX_WORKERS = 4
+#: Bump it when the structure of models or the snapshot is changed.
+SNAPSHOT_VERSION = 5
+#: Seconds between two publishes of partial results while scanning.
+SCAN_PUBLISH_INTERVAL = 1
+
 
 def to_brief_song(song):
     return BriefSongModel(
@@ -63,6 +87,18 @@ def gen_cover_url(song):
     return reverse(song) + '/cover/data'
 
 
+def parse_cover_url(url) -> Optional[str]:
+    """Return the song identifier of a cover url generated by :func:`gen_cover_url`
+
+    >>> parse_cover_url('fuo://local/songs/123/cover/data')
+    '123'
+    >>> parse_cover_url('') is None
+    True
+    """
+    m = re.match(r'fuo://local/songs/(\S+)/cover/data$', url or '')
+    return m.group(1) if m is not None else None
+
+
 def create_artist(identifier, name):
     return ArtistModel(identifier=identifier,
                        source=SOURCE,
@@ -164,6 +200,93 @@ def read_audio_metadata(fpath, can_convert_chinese=False, lang='auto') -> Option
     return data
 
 
+def read_audio_metadata_chunk(fpaths, can_convert_chinese=False, lang='auto'):
+    """Read metadata of files in a worker process
+
+    Return the metadata list and how long (in seconds) the worker is busy.
+    """
+    start = time.perf_counter()
+    results = [read_audio_metadata(fpath, can_convert_chinese, lang)
+               for fpath in fpaths]
+    return results, time.perf_counter() - start
+
+
+@dataclass
+class ScanStats:
+    files: int = 0
+    workers: int = 1
+    busy_time: float = 0  # Total seconds that workers are busy.
+
+
+def _chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_audio_metadata(
+    fpaths: Iterable[str],
+    workers: int,
+    can_convert_chinese=False,
+    lang='auto',
+    stats: Optional[ScanStats] = None,
+    threshold=SCAN_PARALLEL_THRESHOLD,
+) -> Iterator[Tuple[str, Optional[dict]]]:
+    """Read metadata of files with a process pool, yield (fpath, metadata)
+
+    Paths are consumed lazily, and results are yielded in the order of
+    `fpaths`, so that the caller can merge them deterministically.
+    """
+    stats = stats or ScanStats()
+    fpaths = iter(fpaths)
+    head = list(itertools.islice(fpaths, threshold))
+    if workers <= 1 or len(head) < threshold:
+        for chunk in _chunked(itertools.chain(head, fpaths), SCAN_CHUNK_SIZE):
+            results, busy_time = read_audio_metadata_chunk(
+                chunk, can_convert_chinese, lang)
+            stats.files += len(chunk)
+            stats.busy_time += busy_time
+            yield from zip(chunk, results)
+        return
+
+    stats.workers = workers
+    # Fork is not safe since the app has many threads.
+    mp_context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=mp_context) as executor:
+        pending: deque = deque()  # [(chunk, future)]
+
+        def pop_chunk():
+            chunk, future = pending.popleft()
+            try:
+                results, busy_time = future.result()
+            except BrokenProcessPool:
+                logger.exception('metadata worker died, read files in-process')
+                results, busy_time = read_audio_metadata_chunk(
+                    chunk, can_convert_chinese, lang)
+            stats.files += len(chunk)
+            stats.busy_time += busy_time
+            return zip(chunk, results)
+
+        for chunk in _chunked(itertools.chain(head, fpaths), SCAN_CHUNK_SIZE):
+            # Keep a few chunks queued for each worker so that workers are
+            # never idle, while the memory usage is still bounded.
+            if len(pending) >= workers * 2:
+                yield from pop_chunk()
+            try:
+                future = executor.submit(
+                    read_audio_metadata_chunk, chunk, can_convert_chinese, lang)
+            except BrokenProcessPool as e:
+                # Let pop_chunk read the chunk in-process.
+                future = Future()
+                future.set_exception(e)
+            pending.append((chunk, future))
+        while pending:
+            yield from pop_chunk()
+
+
 def gen_artist_name_list(artists_name, splitter, splitter_ignorance):
     # For example::
     # artists_name: 'Years & Years & Jess Glynne'
@@ -201,13 +324,18 @@ def add_song(
     expand_artist_songs=False,
     artist_splitter=[',', '&'],
     artist_splitter_ignorance=None,
-    split_album_artist_name=False
+    split_album_artist_name=False,
+    data=None,
 ):
     """
     parse music file metadata with Easymp3 and return a song
-    model.
+    model. Return None if the file is invalid or the song is duplicate.
+
+    :param data: metadata returned by :func:`read_audio_metadata`.
+        The metadata is read from the file if it is None.
     """
-    data = read_audio_metadata(fpath, can_convert_chinese, lang)
+    if data is None:
+        data = read_audio_metadata(fpath, can_convert_chinese, lang)
     if data is None:
         return
 
@@ -243,7 +371,9 @@ def add_song(
         g_file_song[fpath] = song_id
         g_songs[song_id] = song
     else:
-        song = g_songs[song_id]
+        # The file is recorded, so that the song is kept when the file
+        # which backs the song is removed.
+        g_file_song[fpath] = song_id
         logger.warning('Duplicate song: %s', fpath)
         return
 
@@ -286,23 +416,22 @@ def add_song(
         else:
             album.artists.append(to_brief_artist(album_artist))
 
-    if song not in album.songs:
-        album.songs.append(song)
+    # The song is new, so it is not in any song list yet. Checking the
+    # membership in lists makes adding songs quadratic.
+    album.songs.append(song)
 
     # Process the song’s artist and album information,
     # as well as the artist’s song list and contributions.
     song.album = to_brief_album(album)
-    for artist_name in artist_name_list:
+    for artist_name in dict.fromkeys(artist_name_list):
         artist_id = gen_id(artist_name)
         if artist_id in g_artists:
             artist = g_artists[artist_id]
         else:
             artist = create_artist(identifier=artist_id, name=artist_name)
             g_artists[artist_id] = artist
-        if artist not in song.artists:
-            song.artists.append(to_brief_artist(artist))
-        if song not in artist.hot_songs:
-            artist.hot_songs.append(song)
+        song.artists.append(to_brief_artist(artist))
+        artist.hot_songs.append(song)
 
         # Process the participating works information of
         # the song’s artist (not duplicating the above).
@@ -313,27 +442,39 @@ def add_song(
     # Process the album artist’s song information:
     # Some lyricists who appear on compilations
     # rarely appear in the song artists (optional)
+    song_artist_ids = {artist.identifier for artist in song.artists}
     for album_artist_ in album_artist_list:
-        if expand_artist_songs and song not in album_artist_.hot_songs:
+        if expand_artist_songs and album_artist_.identifier not in song_artist_ids:
             album_artist_.hot_songs.append(song)
+            song_artist_ids.add(album_artist_.identifier)
+    return song
 
 
-def scan_directory(directory, exts, depth=2):
+def iter_directory(directory, exts, depth=2):
+    """Yield media files in the directory, see :func:`scan_directory`."""
     if depth < 0:
-        return []
-
-    media_files = []
+        return
     if not os.path.exists(directory):
-        return []
+        return
     for path in os.listdir(directory):
         path = os.path.join(directory, path)
         if os.path.isdir(path):
-            files = scan_directory(path, exts, depth - 1)
-            media_files.extend(files)
+            yield from iter_directory(path, exts, depth - 1)
         elif os.path.isfile(path):
             if path.split('.')[-1] in exts:
-                media_files.append(path)
-    return media_files
+                yield path
+
+
+def scan_directory(directory, exts, depth=2):
+    return list(iter_directory(directory, exts, depth))
+
+
+def _locked(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 def sort_album_func(album):
@@ -346,69 +487,344 @@ class DB:
     """
     DB manages a fileset and their corresponding models
 
-    the data structure in db file::
+    The models and the file index are saved as a snapshot by :meth:`flush`.
+    When the snapshot is loaded by :meth:`load`, :meth:`scan` only reads
+    new and changed files, and removes songs of deleted files.
 
-        {
-          "files": [],
-          "songs": []
-        }
+    Models are readable while scanning. Each time the scanned models are
+    published by :meth:`publish`, the generation is bumped, so a reader
+    which misses a model can wait for the next generation with
+    :meth:`wait_for_generation`.
+
+    Files are scanned and synced by one thread, and models are read by
+    other threads. Changes and reads which iterate the models are guarded
+    by a lock, and lists returned by readers are copies.
     """
     def __init__(self, fpath):
         """
-        :param filepath: database file path
+        :param fpath: snapshot file path, empty string means no snapshot.
         """
 
+        self._lock = threading.RLock()
         self._dirty = False  # whether changes are flushed
-        self._fileset = set()  # media files
         self._fpath = fpath
+        self._config = None
 
+        self._file_stat = {}           # {fpath: (size, mtime_ns)}
         self._file_song = {}           # {fpath: song_id}
         self._song_file = {}           # {song_id: fpath}
+        # Files of songs which are backed by other files (`_song_file`).
+        self._duplicate_files = {}     # {song_id: {fpath: None}}
         self._songs = {}               # {song_id: song}
         self._albums = {}              # {album_id: album)
         self._artists = {}             # {artist_id: artist)
         self._album_contributors = {}  # {album_id: [artist_id]}
+        # Albums of an artist, and albums an artist contributes to. Dicts are
+        # used as ordered sets, and albums are sorted by `sort_album_func`
+        # (the newest first) in `after_scan`.
+        self._artist_albums = {}       # {artist_id: {album_id: None}}
+        self._contributed_albums = {}  # {artist_id: {album_id: None}}
+        # Keys in the cover store, an empty key means the song has no cover.
+        self._song_covers = {}         # {song_id: cover_key}
+
+        # Models which should be processed by `after_scan`.
+        self._dirty_albums = set()     # {album_id}
+        self._dirty_artists = set()    # {artist_id}
+
+        # Search indexes which are updated along with models.
+        self._song_index = SearchIndex()
+        self._album_index = SearchIndex()
+        self._artist_index = SearchIndex()
+
+        self._generation = 0
+        self._generation_cond = threading.Condition()
+        #: Emitted when models are published, with the generation and
+        #: the number of songs.
+        self.scan_progress = Signal()  # (generation, songs_count)
+
+    def _fingerprint(self, config):
+        # Models depend on these options, the snapshot is invalid
+        # once any of them is changed. Models are pickled, so the snapshot
+        # is also invalid once the model classes may be changed.
+        return (
+            SNAPSHOT_VERSION,
+            feeluown_version,
+            PYDANTIC_VERSION,
+            tuple(SongModel.model_fields),
+            tuple(AlbumModel.model_fields),
+            tuple(ArtistModel.model_fields),
+            can_convert_chinese(),
+            config.CORE_LANGUAGE,
+            config.IDENTIFIER_DELIMITER,
+            config.EXPAND_ARTIST_SONGS,
+            tuple(config.ARTIST_SPLITTER),
+            tuple(config.ARTIST_SPLITTER_IGNORANCE or ()),
+            config.SPLIT_ALBUM_ARTIST_NAME,
+        )
+
+    def load(self, config) -> bool:
+        """load the snapshot, return False if it does not exist or is invalid"""
+        if not self._fpath:
+            return False
+        try:
+            with open(self._fpath, 'rb') as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception:  # noqa
+            logger.exception('load local db snapshot failed')
+            return False
+        if snapshot.get('fingerprint') != self._fingerprint(config):
+            logger.info('local db snapshot is outdated, ignore it')
+            return False
+        with self._lock:
+            self._file_stat = snapshot['file_stat']
+            self._file_song = snapshot['file_song']
+            self._songs = snapshot['songs']
+            self._albums = snapshot['albums']
+            self._artists = snapshot['artists']
+            self._album_contributors = snapshot['album_contributors']
+            self._artist_albums = snapshot['artist_albums']
+            self._contributed_albums = snapshot['contributed_albums']
+            self._song_file = snapshot['song_file']
+            self._duplicate_files = {}
+            for fpath, song_id in self._file_song.items():
+                if self._song_file.get(song_id) != fpath:
+                    self._duplicate_files.setdefault(song_id, {})[fpath] = None
+            self._song_index = snapshot['song_index']
+            self._album_index = snapshot['album_index']
+            self._artist_index = snapshot['artist_index']
+            self._song_covers = snapshot['song_covers']
+        logger.info(f'local db snapshot loaded, {len(self._songs)} songs')
+        self.publish()
+        return True
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def publish(self):
+        """Bump the generation, and wake up readers waiting for it
+
+        .. versionadded:: 5.2
+        """
+        with self._generation_cond:
+            self._generation += 1
+            self._generation_cond.notify_all()
+        self.scan_progress.emit(self._generation, len(self._songs))
+
+    def wait_for_generation(self, generation, timeout=None) -> bool:
+        """Wait until the generation is not `generation`, return False on timeout
+
+        .. versionadded:: 5.2
+        """
+        with self._generation_cond:
+            return self._generation_cond.wait_for(
+                lambda: self._generation != generation, timeout)
+
+    def _index_song(self, song):
+        self._song_index.add(song.identifier, song.title,
+                             song.artists_name, song.album_name)
+
+    def _index_album(self, album):
+        self._album_index.add(album.identifier, album.name, album.artists_name)
+
+    def _index_artist(self, artist):
+        self._artist_index.add(artist.identifier, artist.name)
 
+    @_locked
     def flush(self):
         """flush the changes into db file"""
-        with open(self._fpath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'version': '1.0',
-                'files': list(self._fileset),
-                'songs': serialize('json', self._songs),
-                'artists': serialize('json', self._artists),
-                'albums': serialize('json', self._albums),
-            }, f)
+        if not self._fpath or not self._dirty or self._config is None:
+            return
+        snapshot = {
+            'fingerprint': self._fingerprint(self._config),
+            'file_stat': self._file_stat,
+            'file_song': self._file_song,
+            'song_file': self._song_file,
+            'songs': self._songs,
+            'albums': self._albums,
+            'artists': self._artists,
+            'album_contributors': self._album_contributors,
+            'artist_albums': self._artist_albums,
+            'contributed_albums': self._contributed_albums,
+            'song_index': self._song_index,
+            'album_index': self._album_index,
+            'artist_index': self._artist_index,
+            'song_covers': self._song_covers,
+        }
+        tmp_fpath = self._fpath + '.tmp'
+        with open(tmp_fpath, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fpath, self._fpath)
+        self._dirty = False
 
     def list_models(self):
         """list all models in database"""
         pass
 
-    def add(self, fpath):
-        """add media file to database"""
+    @_locked
+    def add(self, fpath, data=None):
+        """add media file to database, return the song if it is added
 
+        :param data: metadata of the file, see :func:`add_song`.
+        """
+        config = self._config
+        assert config is not None, 'db must be scanned before adding files'
+        song = add_song(fpath, self._songs, self._artists,
+                        self._albums, self._file_song, self._album_contributors,
+                        can_convert_chinese(), config.CORE_LANGUAGE,
+                        delimiter=config.IDENTIFIER_DELIMITER,
+                        expand_artist_songs=config.EXPAND_ARTIST_SONGS,
+                        artist_splitter=config.ARTIST_SPLITTER,
+                        artist_splitter_ignorance=config.ARTIST_SPLITTER_IGNORANCE,
+                        split_album_artist_name=config.SPLIT_ALBUM_ARTIST_NAME,
+                        data=data)
+        if song is None:
+            song_id = self._file_song.get(fpath)
+            if song_id is not None:
+                self._dirty = True
+                self._duplicate_files.setdefault(song_id, {})[fpath] = None
+            return None
+        self._dirty = True
+        self._song_file[song.identifier] = fpath
+        album_id = song.album.identifier
+        album = self._albums[album_id]
+        self._dirty_albums.add(album_id)
+        self._dirty_artists.update(a.identifier for a in album.artists)
+        self._dirty_artists.update(a.identifier for a in song.artists)
+        for artist in album.artists:
+            self._artist_albums.setdefault(artist.identifier, {})[album_id] = None
+        for artist_id in self._album_contributors[album_id]:
+            self._contributed_albums.setdefault(artist_id, {})[album_id] = None
+        self._index_song(song)
+        self._index_album(album)
+        for artist in itertools.chain(album.artists, song.artists):
+            if artist.identifier not in self._artist_index:
+                self._index_artist(artist)
+        return song
+
+    @_locked
     def remove(self, fpath):
-        """add media file to database"""
+        """remove media file from database, return the removed song"""
+        if self._file_stat.pop(fpath, None) is not None:
+            self._dirty = True
+        song_id = self._file_song.pop(fpath, None)
+        if song_id is None:
+            return None
+        self._dirty = True
+        duplicates = self._duplicate_files.get(song_id)
+        if duplicates:
+            if self._song_file.get(song_id) == fpath:
+                # Another file has the same song, it backs the song from now on.
+                self._song_file[song_id] = next(iter(duplicates))
+                # The cover is extracted from the new file later.
+                self._song_covers.pop(song_id, None)
+            duplicates.pop(self._song_file[song_id], None)
+            duplicates.pop(fpath, None)
+            if not duplicates:
+                del self._duplicate_files[song_id]
+            return None
+        self._song_file.pop(song_id, None)
+        song = self._songs.pop(song_id, None)
+        if song is None:
+            return None
+        self._song_index.remove(song_id)
+        self._song_covers.pop(song_id, None)
+
+        artist_ids = [artist.identifier for artist in song.artists]
+        album_id = song.album.identifier
+        album = self._albums.get(album_id)
+        if album is not None:
+            # Album artists may have the song when EXPAND_ARTIST_SONGS is on.
+            artist_ids.extend(artist.identifier for artist in album.artists)
+            album.songs = [s for s in album.songs if s.identifier != song_id]
+            contributors = self._album_contributors.get(album_id, [])
+            if album.songs:
+                self._dirty_albums.add(album_id)
+                if album.cover == gen_cover_url(song):
+                    album.cover = gen_cover_url(album.songs[0])
+                self._album_contributors[album_id] = self._list_contributors(album)
+                contributors = set(contributors) - \
+                    set(self._album_contributors[album_id])
+            else:
+                self._albums.pop(album_id)
+                self._album_contributors.pop(album_id, None)
+                self._album_index.remove(album_id)
+                for artist in album.artists:
+                    self._discard_album(self._artist_albums, artist.identifier,
+                                        album_id)
+            for artist_id in contributors:
+                self._discard_album(self._contributed_albums, artist_id, album_id)
+                self._dirty_artists.add(artist_id)
+        for artist_id in artist_ids:
+            artist = self._artists.get(artist_id)
+            if artist is not None:
+                artist.hot_songs = [s for s in artist.hot_songs
+                                    if s.identifier != song_id]
+                self._dirty_artists.add(artist_id)
+        return song
+
+    def _discard_album(self, artist_albums, artist_id, album_id):
+        album_ids = artist_albums.get(artist_id)
+        if album_ids is not None:
+            album_ids.pop(album_id, None)
+            if not album_ids:
+                del artist_albums[artist_id]
+
+    def _list_contributors(self, album):
+        album_artist_ids = {artist.identifier for artist in album.artists}
+        contributors = {}  # Use dict as an ordered set.
+        for song in album.songs:
+            for artist in song.artists:
+                if artist.identifier not in album_artist_ids:
+                    contributors[artist.identifier] = None
+        return list(contributors)
 
     ############################
 
+    @_locked
     def list_songs(self):
         return list(self._songs.values())
 
+    @_locked
     def list_albums(self):
         return list(self._albums.values())
 
+    @_locked
+    def list_albums_by_artist(self, artist_id):
+        """list albums of the artist, the newest first"""
+        return [self._albums[album_id]
+                for album_id in self._artist_albums.get(artist_id, ())]
+
+    @_locked
     def list_albums_by_contributor(self, artist_id):
-        albums = []
-        for album_id, artists in self._album_contributors.items():
-            if artist_id in artists:
-                album = self.get_album(album_id)
-                albums.append(album)
-        return albums
+        """list albums which the artist contributes to, the newest first"""
+        return [self._albums[album_id]
+                for album_id in self._contributed_albums.get(artist_id, ())]
 
+    @_locked
     def list_artists(self):
         return list(self._artists.values())
 
+    def search_songs(self, keyword, limit=10):
+        return self._search(self._song_index, self._songs, keyword, limit)
+
+    def search_albums(self, keyword, limit=10):
+        return self._search(self._album_index, self._albums, keyword, limit)
+
+    def search_artists(self, keyword, limit=10):
+        return self._search(self._artist_index, self._artists, keyword, limit)
+
+    @_locked
+    def _search(self, index, models, keyword, limit):
+        result = []
+        for identifier in index.search(keyword, limit):
+            model = models.get(identifier)
+            if model is not None:
+                result.append(model)
+        return result
+
     def get_song(self, identifier):
         return self._songs.get(identifier)
 
@@ -418,58 +834,197 @@ class DB:
     def get_artist(self, identifier):
         return self._artists.get(identifier)
 
+    def get_song_cover(self, song_id) -> Optional[str]:
+        """Return the cover key of the song, None if it is not extracted."""
+        return self._song_covers.get(song_id)
+
+    @_locked
+    def set_song_cover(self, song_id, key: str):
+        if song_id in self._songs:
+            self._song_covers[song_id] = key
+            self._dirty = True
+
+    @_locked
+    def list_cover_songs(self):
+        """list identifiers of songs whose covers are used by albums and artists"""
+        song_ids = {}  # Use dict as an ordered set.
+        for album in self._albums.values():
+            song_ids[parse_cover_url(album.cover)] = None
+        for artist in self._artists.values():
+            song_ids[parse_cover_url(artist.pic_url)] = None
+        song_ids.pop(None, None)
+        return list(song_ids)
+
+    @_locked
+    def list_cover_keys(self):
+        return {key for key in self._song_covers.values() if key}
+
     def get_song_fpath(self, song_id) -> Optional[str]:
         return self._song_file.get(song_id)
 
     @log_exectime
     def scan(self, config, paths, depth, exts):
         """scan media files in all paths
+
+        Metadata is read by worker processes while directories are walked,
+        and results are merged one by one in the walk order, so identifiers
+        are the same as a sequential scan. Files whose size and mtime are
+        not changed since last scan are skipped.
+
+        .. versionchanged:: 5.2
+            Read metadata with a process pool, see `SCAN_WORKERS` config.
+            Only read new and changed files. Scanned models are published
+            every :data:`SCAN_PUBLISH_INTERVAL` seconds.
         """
-        media_files = []
+        self._config = config
+        seen = set()
+
+        def iter_files():
+            for directory in paths:
+                logger.debug('Scanning for directory (%s)...', directory)
+                for fpath in iter_directory(directory, exts, depth):
+                    seen.add(fpath)
+                    yield fpath
+
         logger.info('start scanning...')
-        for directory in paths:
-            logger.debug('Scanning for directory (%s)...', directory)
-            media_files.extend(scan_directory(directory, exts, depth))
-        logger.info(f'scanning finished, {len(media_files)} files in total')
-
-        is_cn_convert_enabled = can_convert_chinese()
-        for fpath in media_files:
-            add_song(fpath, self._songs, self._artists,
-                     self._albums, self._file_song, self._album_contributors,
-                     is_cn_convert_enabled, config.CORE_LANGUAGE,
-                     config.IDENTIFIER_DELIMITER, config.EXPAND_ARTIST_SONGS,
-                     config.ARTIST_SPLITTER, config.ARTIST_SPLITTER_IGNORANCE,
-                     config.SPLIT_ALBUM_ARTIST_NAME)
-        logger.info('Local music scan finished.')
+        stats = ScanStats()
+        start = time.perf_counter()
+        self._read_files(iter_files(), [], stats, publish=True)
+        for fpath in set(self._file_stat) - seen:
+            self.remove(fpath)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            'Local music scan finished: %d files in total, %d files read in %.2fs, '
+            '%.1f files/s, %d workers, utilisation %.0f%%',
+            len(seen), stats.files, elapsed, stats.files / max(elapsed, 1e-6),
+            stats.workers,
+            stats.busy_time / max(elapsed * stats.workers, 1e-6) * 100,
+        )
+
+    def sync(self, fpaths, dirs=()):
+        """sync files with the disk, return added songs and removed songs
+
+        Songs of missing files are removed, and new and changed files are read.
+        :meth:`after_scan` should be called after syncing.
 
+        :param dirs: known files under these directories are synced too, so
+            that songs in a removed directory are removed.
+
+        .. versionadded:: 5.2
+        """
+        assert self._config is not None, 'db must be scanned before syncing files'
+        fpaths = set(fpaths)
+        if dirs:
+            prefixes = tuple(os.path.join(directory, '') for directory in dirs)
+            fpaths.update(fpath for fpath in self._file_stat
+                          if fpath.startswith(prefixes))
+        existing, removed = [], []
+        for fpath in sorted(fpaths):
+            if os.path.isfile(fpath):
+                existing.append(fpath)
+            else:
+                song = self.remove(fpath)
+                if song is not None:
+                    removed.append(song)
+        added = self._read_files(existing, removed)
+        return added, removed
+
+    def _read_files(self, fpaths, removed, stats=None, publish=False):
+        """Read and add new and changed files, return the added songs
+
+        Songs of changed files are removed and appended to `removed`.
+
+        :param publish: publish added songs periodically.
+        """
+        config = self._config
+        changed = {}  # {fpath: (size, mtime_ns)}
+
+        def iter_changed_files():
+            for fpath in fpaths:
+                try:
+                    st = os.stat(fpath)
+                except OSError:
+                    continue
+                stat = (st.st_size, st.st_mtime_ns)
+                if self._file_stat.get(fpath) == stat:
+                    continue
+                song = self.remove(fpath)
+                if song is not None:
+                    removed.append(song)
+                changed[fpath] = stat
+                yield fpath
+
+        added = []
+        publish_at = time.monotonic() + SCAN_PUBLISH_INTERVAL
+        workers = config.SCAN_WORKERS or \
+            min(SCAN_DEFAULT_MAX_WORKERS, os.cpu_count() or 1)
+        for fpath, data in iter_audio_metadata(
+            iter_changed_files(), workers, can_convert_chinese(),
+            config.CORE_LANGUAGE, stats=stats,
+        ):
+            # Invalid files are also recorded, so they are not read again.
+            self._file_stat[fpath] = changed.pop(fpath)
+            self._dirty = True
+            if data is not None:
+                song = self.add(fpath, data)
+                if song is not None:
+                    added.append(song)
+            if publish and time.monotonic() >= publish_at:
+                self.after_scan()
+                self.publish()
+                publish_at = time.monotonic() + SCAN_PUBLISH_INTERVAL
+        return added
+
+    @_locked
     def after_scan(self):
-        # Sort the songs in a album.
-        for album in self._albums.values():
+        """Process albums and artists which are changed since last call."""
+        albums = [self._albums[album_id] for album_id in self._dirty_albums
+                  if album_id in self._albums]
+        artist_ids = self._dirty_artists
+        self._dirty_albums, self._dirty_artists = set(), set()
+
+        # Sort the songs in a album. Sorted lists are assigned instead of
+        # sorting in place, since the list is empty during an in-place sort,
+        # and models may be read by other threads while scanning.
+        for album in albums:
             try:
-                album.songs.sort(key=lambda x: (int(x.disc.split('/')[0]),
-                                                int(x.track.split('/')[0])))
+                album.songs = sorted(album.songs,
+                                     key=lambda x: (int(x.disc.split('/')[0]),
+                                                    int(x.track.split('/')[0])))
                 if album.name != DEFAULT_ALBUM_NAME:
                     cover = gen_cover_url(album.songs[0])
                     album.cover = cover
             except:  # noqa
                 logger.exception('Sort album songs failed.')
+            # The order of albums may be changed since songs are changed.
+            artist_ids.update(artist.identifier for artist in album.artists)
+            artist_ids.update(self._album_contributors.get(album.identifier, []))
 
         # Select a pic_url for the artist
-        for artist in self._artists.values():
-            albums = []
-            for album in self._albums.values():
-                for artist_ in album.artists:
-                    if artist_.identifier == artist.identifier:
-                        albums.append(album)
-                        continue
+        for artist_id in artist_ids:
+            artist = self._artists.get(artist_id)
+            if artist is None:
+                continue
+            # Songs of the artist are all removed.
+            if not artist.hot_songs and artist_id not in self._artist_albums:
+                self._artists.pop(artist_id)
+                self._artist_index.remove(artist_id)
+                continue
+            for artist_albums in (self._artist_albums, self._contributed_albums):
+                if artist_id in artist_albums:
+                    artist_albums[artist_id] = dict.fromkeys(sorted(
+                        artist_albums[artist_id],
+                        key=lambda album_id: sort_album_func(self._albums[album_id]),
+                        reverse=True,
+                    ))
+            artist.pic_url = ''
+            albums = self.list_albums_by_artist(artist_id)
             if albums:
-                albums.sort(key=sort_album_func, reverse=True)
-                if albums:
-                    artist.pic_url = albums[0].cover
+                artist.pic_url = albums[0].cover
 
             if not artist.pic_url and artist.hot_songs:
                 # sort the artist hot_songs.
-                artist.hot_songs.sort(key=lambda x: x.title)
+                artist.hot_songs = sorted(artist.hot_songs, key=lambda x: x.title)
                 # Use a song's cover as artist cover.
                 # https://github.com/feeluown/feeluown-local/pull/3/files#r362126996
                 songs_with_unknown_album = [song for song in artist.hot_songs
@@ -479,6 +1034,3 @@ class DB:
                                    reverse=True):
                     artist.pic_url = gen_cover_url(song)
                     break
-
-        # Cache the {song_id:fpath} mapping.
-        self._song_file = {v: k for k, v in self._file_song.items()}
@@ -6,37 +6,55 @@ including small parts such as music directory scanning and music library constru
 in theory, all these small parts can be extracted from it.
 """
 
-import difflib
 import logging
+import os
 import re
 import threading
+import time
 from functools import wraps
+from typing import Optional
 
+from feeluown.consts import CACHE_DIR
 from feeluown.excs import ProviderIOError
 
 from feeluown.i18n import t
 from feeluown.media import Media, Quality
-from feeluown.library import AbstractProvider, ProviderV2, ModelType, SimpleSearchResult
+from feeluown.library import (
+    AbstractProvider, ProviderV2, ModelType, SimpleSearchResult, SearchType,
+)
+from feeluown.utils.dispatch import Signal
 from feeluown.utils.reader import create_reader
 from feeluown.utils.utils import log_exectime
 from feeluown.utils.audio import read_audio_cover
-from .db import sort_album_func
 
 
 logger = logging.getLogger(__name__)
 SOURCE = 'local'
+#: Seconds to wait for a model which is not scanned yet.
+SCAN_WAIT_TIMEOUT = 1
 
 
 def wait_for_scan(func):
     """
     Some API of local provider can only return correct data after scan is finished.
     This decorator is designed to be used to decorate those API.
+
+    .. versionchanged:: 5.2
+        The API is called at once, since models are published while scanning.
+        Only when it returns None (the model is not scanned yet), it waits
+        for more models, and it is called again.
     """
     @wraps(func)
     def wrapper(this, *args, **kwargs):
-        if not this._scan_finished.wait(timeout=1):
-            raise ProviderIOError('scan is not still finished')
-        return func(this, *args, **kwargs)
+        deadline = time.monotonic() + SCAN_WAIT_TIMEOUT
+        while True:
+            generation = this.db.generation
+            result = func(this, *args, **kwargs)
+            if result is not None or this._scan_finished.is_set():
+                return result
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or not this.db.wait_for_generation(generation, timeout):
+                raise ProviderIOError('scan is not still finished')
     return wrapper
 
 
@@ -50,17 +68,33 @@ class LocalProvider(AbstractProvider, ProviderV2):
 
         self._app = None
         self._scan_finished = threading.Event()
+        # Scanning and syncing changed files can not run at the same time.
+        self._db_lock = threading.Lock()
+        self._watcher = None
+
+        #: Emitted when the watcher finds changed files, with the
+        #: added songs and the removed songs. Note that an updated
+        #: song is both removed and added.
+        self.library_changed = Signal()  # (added, removed)
 
         from .db import DB
+        from .cover_store import CoverStore
 
-        self.db = DB('')
+        self.db = DB(os.path.join(CACHE_DIR, 'local_db.pickle'))
+        #: Emitted when scanned models are published, see :class:`.db.DB`.
+        self.scan_progress = self.db.scan_progress  # (generation, songs_count)
+        self.cover_store = CoverStore(os.path.join(CACHE_DIR, 'local_covers'))
 
     def initialize(self, app):
         self._app = app
 
-    def handle_with_path(self, path, **_):
+    def handle_with_path(self, path, size=None, **_):
         """
         handle ('/songs/{identifier}/cover/data')
+
+        .. versionchanged:: 5.2
+            Covers are served from the cover store. Add `size` parameter,
+            the smallest scaled cover not smaller than the size is returned.
         """
         p = re.compile(r'/songs/(\S+)/cover/data')
         m = p.match(path)
@@ -70,11 +104,67 @@ class LocalProvider(AbstractProvider, ProviderV2):
             except IndexError:
                 return None
             else:
-                fpath = self.db.get_song_fpath(identifier)
-                if fpath:
-                    return read_audio_cover(fpath)[0]
+                key = self.db.get_song_cover(identifier)
+                if key is None:
+                    # The cover is not extracted by the scan yet.
+                    key = self._extract_cover(identifier)
+                if not key:
+                    return None
+                data = self.cover_store.get(key, size)
+                if data is None:
+                    # The cover is removed from the disk.
+                    key = self._extract_cover(identifier)
+                    data = self.cover_store.get(key, size) if key else None
+                return data
         return None
 
+    def extract_covers(self):
+        """Extract covers used by albums and artists into the cover store
+
+        It is the last stage of scanning, and it runs in background, since
+        songs are available without covers.
+
+        .. versionadded:: 5.2
+        """
+        song_ids = [song_id for song_id in self.db.list_cover_songs()
+                    if self.db.get_song_cover(song_id) is None]
+        start = time.perf_counter()
+        for song_id in song_ids:
+            self._extract_cover(song_id)
+        logger.info('extract %d covers in %.2fs', len(song_ids),
+                    time.perf_counter() - start)
+        with self._db_lock:
+            try:
+                self.cover_store.prune(self.db.list_cover_keys())
+            except OSError:
+                logger.exception('prune cover store failed')
+            self._flush_db()
+
+    def _extract_cover(self, song_id) -> Optional[str]:
+        """Extract the cover of the song, return its key in the cover store
+
+        Return an empty string if the song has no cover, and None if
+        the song is not found or the cover can not be saved.
+        """
+        fpath = self.db.get_song_fpath(song_id)
+        if not fpath:
+            return None
+        try:
+            data, _ = read_audio_cover(fpath)
+        except Exception:  # noqa, mutagen raises various errors.
+            logger.exception(f'read cover from {fpath} failed')
+            data = None
+        if data:
+            try:
+                key = self.cover_store.put(bytes(data))
+            except OSError:
+                logger.exception('save cover failed')
+                return None
+        else:
+            key = ''
+        self.db.set_song_cover(song_id, key)
+        return key
+
     @property
     def identifier(self):
         return SOURCE
@@ -84,10 +174,58 @@ class LocalProvider(AbstractProvider, ProviderV2):
         return LocalProvider.meta.name
 
     def scan(self, config, paths, depth=3):
+        """Scan music files, only new and changed files are read if the
+        snapshot of last scan exists.
+
+        Songs in the snapshot are available once it is loaded, and scanned
+        songs are available before the scan is finished.
+        """
         exts = config.MUSIC_FORMATS
-        self.db.scan(config, paths, depth, exts)
-        self.db.after_scan()
-        self._scan_finished.set()
+        with self._db_lock:
+            if not self._scan_finished.is_set():
+                self.db.load(config)
+            self.db.scan(config, paths, depth, exts)
+            self.db.after_scan()
+            self._scan_finished.set()
+            # Wake up lookups which wait for missing models.
+            self.db.publish()
+            self._flush_db()
+
+    def start_watching(self, config, paths, depth=3):
+        """Watch music folders and sync changed files into the library
+
+        .. versionadded:: 5.2
+        """
+        from .watcher import MusicFolderWatcher
+
+        if self._watcher is not None:
+            return
+        self._watcher = MusicFolderWatcher(paths, depth, config.MUSIC_FORMATS,
+                                           self._on_files_changed)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _on_files_changed(self, fpaths, dirs):
+        with self._db_lock:
+            added, removed = self.db.sync(fpaths, dirs)
+            self.db.after_scan()
+            self.db.publish()
+            self._flush_db()
+        self.extract_covers()
+        if added or removed:
+            logger.info(f'local library changed: {len(added)} songs added, '
+                        f'{len(removed)} songs removed')
+            self.library_changed.emit(added, removed)
+
+    def _flush_db(self):
+        try:
+            self.db.flush()
+        except OSError:
+            logger.exception('save local db snapshot failed')
 
     def use_model_v2(self, model_type):
         return model_type in (ModelType.song, ModelType.album, ModelType.artist)
@@ -127,19 +265,11 @@ class LocalProvider(AbstractProvider, ProviderV2):
     @wait_for_scan
     def artist_create_albums_rd(self, artist):
         """Implement SupportsArtistAlbumsReader protocol."""
-        albums = []
-        for album in self.db.list_albums():
-            for artist_ in album.artists:
-                if artist_.identifier == artist.identifier:
-                    albums.append(album)
-                    continue
-        albums.sort(key=sort_album_func, reverse=True)
-        return create_reader(albums)
+        return create_reader(self.db.list_albums_by_artist(artist.identifier))
 
     @wait_for_scan
     def artist_create_contributed_albums_rd(self, artist):
         albums = self.db.list_albums_by_contributor(artist.identifier)
-        albums.sort(key=sort_album_func, reverse=True)
         return create_reader(albums)
 
     @property
@@ -156,26 +286,36 @@ class LocalProvider(AbstractProvider, ProviderV2):
 
     @log_exectime
     @wait_for_scan
-    def search(self, keyword, **kwargs):
-        from .db import to_brief_song
+    def search(self, keyword, type_=SearchType.so, **kwargs):
+        """Search songs, albums or artists with the search index
 
-        limit = kwargs.get('limit', 10)
-        repr_song_map = dict()
-        for song in self.songs:
-            key = song.title + ' ' + song.artists_name
-            repr_song_map[key] = song
-        choices = repr_song_map.keys()
-        if choices:
-            # TODO: maybe use a more reasonable algorithm.
-            result = difflib.get_close_matches(keyword, choices, n=limit, cutoff=0)
-        else:
-            result = []
-        result_songs = [repr_song_map[each] for each in result]
+        .. versionchanged:: 5.2
+            Use a token and trigram index instead of difflib.
+            Support album and artist search types.
+        """
+        from .db import to_brief_song, to_brief_album, to_brief_artist
 
-        return SimpleSearchResult(
-            q=keyword,
-            songs=[to_brief_song(song) for song in result_songs]
-        )
+        limit = kwargs.get('limit', 10)
+        type_ = SearchType.parse(type_)
+        if type_ == SearchType.so:
+            songs = self.db.search_songs(keyword, limit)
+            return SimpleSearchResult(
+                q=keyword,
+                songs=[to_brief_song(song) for song in songs]
+            )
+        if type_ == SearchType.al:
+            albums = self.db.search_albums(keyword, limit)
+            return SimpleSearchResult(
+                q=keyword,
+                albums=[to_brief_album(album) for album in albums]
+            )
+        if type_ == SearchType.ar:
+            artists = self.db.search_artists(keyword, limit)
+            return SimpleSearchResult(
+                q=keyword,
+                artists=[to_brief_artist(artist) for artist in artists]
+            )
+        return None
 
 
 provider = LocalProvider()
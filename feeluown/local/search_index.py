@@ -0,0 +1,283 @@
+"""
+feeluown.local.search_index
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+An in-memory index for searching local songs, albums and artists.
+
+Texts are normalized and split into tokens. A word token is indexed by the
+character trigrams of itself padded with ``$``, and a CJK token, which is a
+run of CJK characters since there are no spaces between words, is indexed by
+character bigrams. A query looks up the tokens which contain all grams of
+each query token (as a prefix) at first, and it falls back to the tokens
+which share most grams with the query tokens.
+"""
+
+import heapq
+import re
+import unicodedata
+from collections import Counter
+from threading import Lock
+from typing import Dict, List, Set, Tuple
+
+#: Tokens and documents less similar than this are not fuzzy matched.
+FUZZY_CUTOFF = 0.4
+
+# Hiragana, katakana, CJK ideographs and hangul syllables.
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_TOKEN_RE = re.compile(rf'[{_CJK}]+|[^\W{_CJK}]+')
+_CJK_RE = re.compile(rf'[{_CJK}]')
+
+# Match levels, the larger the better.
+_MATCH_FUZZY = 1
+_MATCH_TOKEN = 2
+_MATCH_PREFIX = 3
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize('NFKC', text or '').casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Split the text into tokens, a CJK run is one token
+
+    >>> tokenize('Hello, World!')
+    ['hello', 'world']
+    >>> tokenize('周杰伦Jay 七里香')
+    ['周杰伦', 'jay', '七里香']
+    """
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _is_cjk(token: str) -> bool:
+    return _CJK_RE.match(token) is not None
+
+
+def _ngrams(s: str, n: int):
+    return [s[i:i + n] for i in range(len(s) - n + 1)]
+
+
+def _token_grams(token: str, prefix=False) -> List[str]:
+    """
+    >>> _token_grams('abc')
+    ['$ab', 'abc', 'bc$']
+    >>> _token_grams('abc', prefix=True)
+    ['$ab', 'abc']
+    >>> _token_grams('七里香')
+    ['七里', '里香']
+    """
+    if _is_cjk(token):
+        return _ngrams(token, 2) if len(token) > 1 else [token]
+    if prefix:
+        return _ngrams('$' + token, 3) if len(token) > 1 else ['$' + token]
+    return _ngrams('$' + token + '$', 3)
+
+
+def _vocab_grams(token: str) -> Set[str]:
+    grams = set(_token_grams(token))
+    # Make one-character queries work.
+    if _is_cjk(token):
+        grams.update(token)
+    else:
+        grams.add('$' + token[0])
+    return grams
+
+
+def _token_matched(qtoken: str, token: str) -> bool:
+    if _is_cjk(qtoken):
+        return qtoken in token
+    return token.startswith(qtoken)
+
+
+def _similarity(grams_a, grams_b) -> float:
+    """Dice coefficient of two gram sets."""
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def _first_tokens(fields) -> Set[str]:
+    return {field.split(' ', 1)[0] for field in fields if field}
+
+
+def _length(fields) -> int:
+    # Documents with a shorter first field (such as the title) are better.
+    return len(fields[0]) if fields else 0
+
+
+class SearchIndex:
+    """Index texts of documents and rank them for a query
+
+    Documents are indexed by tokens, and tokens are indexed by grams, so
+    that a query only touches the vocabulary and the matched documents.
+
+    Documents are ranked by how they match the query: a field starts with
+    the query, every query token is a prefix of some token (a CJK token is
+    a substring), or their tokens are similar to the query tokens.
+
+    >>> index = SearchIndex()
+    >>> index.add('1', 'Hey Jude', 'The Beatles')
+    >>> index.add('2', 'Yesterday', 'The Beatles')
+    >>> index.add('3', '晴天', '周杰伦')
+    >>> index.search('yes')
+    ['2']
+    >>> index.search('beatls')
+    ['1', '2']
+    >>> index.search('杰伦')
+    ['3']
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # {doc_id: normalized texts}, tokens are separated by a space.
+        self._docs: Dict[str, Tuple[str, ...]] = {}
+        self._token_docs: Dict[str, Set[str]] = {}   # {token: {doc_id}}
+        self._gram_tokens: Dict[str, Set[str]] = {}  # {gram: {token}}
+        self._first_docs: Dict[str, Set[str]] = {}   # {first token: {doc_id}}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def add(self, doc_id: str, *texts: str):
+        """Index texts of the document, the old texts are replaced."""
+        fields = tuple(' '.join(tokenize(text)) for text in texts)
+        tokens = {token for field in fields for token in field.split()}
+        with self._lock:
+            self._remove(doc_id)
+            self._docs[doc_id] = fields
+            for token in _first_tokens(fields):
+                self._first_docs.setdefault(token, set()).add(doc_id)
+            for token in tokens:
+                doc_ids = self._token_docs.get(token)
+                if doc_ids is None:
+                    doc_ids = self._token_docs[token] = set()
+                    for gram in _vocab_grams(token):
+                        self._gram_tokens.setdefault(gram, set()).add(token)
+                doc_ids.add(doc_id)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        fields = self._docs.pop(doc_id, None)
+        if fields is None:
+            return
+        for token in _first_tokens(fields):
+            doc_ids = self._first_docs[token]
+            doc_ids.discard(doc_id)
+            if not doc_ids:
+                del self._first_docs[token]
+        for token in {token for field in fields for token in field.split()}:
+            doc_ids = self._token_docs[token]
+            doc_ids.discard(doc_id)
+            if doc_ids:
+                continue
+            del self._token_docs[token]
+            for gram in _vocab_grams(token):
+                tokens = self._gram_tokens[gram]
+                tokens.discard(token)
+                if not tokens:
+                    del self._gram_tokens[gram]
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._token_docs.clear()
+            self._gram_tokens.clear()
+            self._first_docs.clear()
+
+    def search(self, query: str, limit=10) -> List[str]:
+        """Return ids of the best matched documents, the best goes first."""
+        qtokens = tokenize(query)
+        if not qtokens or limit <= 0:
+            return []
+        qtext = ' '.join(qtokens)
+        with self._lock:
+            vocab = [self._match_vocab(qtoken) for qtoken in qtokens]
+            # A field starting with the query must start with a token
+            # matching the first query token, so only check those fields.
+            prefixed = set()
+            for token in vocab[0]:
+                prefixed.update(self._first_docs.get(token, ()))
+            # A field starting with a matched word token starts with the query
+            # when there is only one query token.
+            if len(qtokens) > 1 or _is_cjk(qtext):
+                prefixed = {doc_id for doc_id in prefixed
+                            if any(field.startswith(qtext)
+                                   for field in self._docs[doc_id])}
+            # Documents having more tokens equal to the query tokens are better.
+            exact_sets = [self._token_docs.get(qtoken, ()) for qtoken in qtokens]
+
+            def rank_key(doc_id, level, score):
+                return (-level, -score, _length(self._docs[doc_id]), doc_id)
+
+            def count_exact(doc_id):
+                return sum(1 for doc_ids in exact_sets if doc_id in doc_ids)
+
+            # Better levels go first, so worse levels are only ranked when
+            # there are not enough documents.
+            ranked = [rank_key(doc_id, _MATCH_PREFIX, count_exact(doc_id))
+                      for doc_id in prefixed]
+            candidates = prefixed
+            if len(ranked) < limit:
+                candidates = self._match_docs(vocab)
+                ranked.extend(rank_key(doc_id, _MATCH_TOKEN, count_exact(doc_id))
+                              for doc_id in candidates - prefixed)
+            if len(ranked) < limit:
+                ranked.extend(rank_key(doc_id, _MATCH_FUZZY, score)
+                              for doc_id, score in self._match_fuzzy(qtokens).items()
+                              if doc_id not in candidates)
+        return [key[-1] for key in heapq.nsmallest(limit, ranked)]
+
+    def _match_vocab(self, qtoken) -> List[str]:
+        """Return tokens which match the query token."""
+        grams = _token_grams(qtoken, prefix=True)
+        postings = sorted((self._gram_tokens.get(g, set()) for g in grams), key=len)
+        return [token for token in set(postings[0]).intersection(*postings[1:])
+                if _token_matched(qtoken, token)]
+
+    def _match_docs(self, vocab) -> Set[str]:
+        """Return documents in which every query token matches some token."""
+        result: Set[str] = set()
+        for i, tokens in enumerate(vocab):
+            doc_ids = set()
+            for token in tokens:
+                doc_ids.update(self._token_docs[token])
+            result = doc_ids if i == 0 else result & doc_ids
+            if not result:
+                break
+        return result
+
+    def _match_fuzzy(self, qtokens) -> Dict[str, float]:
+        """Return documents with tokens similar to the query tokens."""
+        scores: Dict[str, float] = {}
+        for qtoken in qtokens:
+            qgrams = set(_token_grams(qtoken))
+            counter = Counter()
+            for gram in qgrams:
+                counter.update(self._gram_tokens.get(gram, ()))
+            best: Dict[str, float] = {}  # {doc_id: similarity}
+            for token, count in counter.items():
+                # Skip the tokens which cannot be similar enough, quickly.
+                if 2 * count / (len(qgrams) + count) < FUZZY_CUTOFF:
+                    continue
+                similarity = _similarity(qgrams, set(_token_grams(token)))
+                if similarity < FUZZY_CUTOFF:
+                    continue
+                for doc_id in self._token_docs[token]:
+                    if best.get(doc_id, 0) < similarity:
+                        best[doc_id] = similarity
+            for doc_id, similarity in best.items():
+                scores[doc_id] = scores.get(doc_id, 0) + similarity / len(qtokens)
+        return {doc_id: score for doc_id, score in scores.items()
+                if score >= FUZZY_CUTOFF}
@@ -3,10 +3,16 @@ from feeluown.gui.page_containers.table import Renderer
 
 
 class LibraryRenderer(Renderer):
-    def __init__(self, songs, albums, artists):
+    def __init__(self, songs, albums, artists, provider=None):
+        """
+        .. versionchanged:: 5.2
+            Add `provider` parameter, the renderer is updated when
+            the library of the provider is changed.
+        """
         self.songs = songs
         self.albums = albums
         self.artists = artists
+        self.provider = provider
 
     async def render(self):
         self.meta_widget.show()
@@ -24,3 +30,25 @@ class LibraryRenderer(Renderer):
                                     show_count=True))
         self.tabbar.show_albums_needed.connect(lambda: self.show_albums(self.albums))
         self.tabbar.show_artists_needed.connect(lambda: self.show_artists(self.artists))
+        if self.provider is not None:
+            self.provider.library_changed.connect(self.on_library_changed,
+                                                  aioqueue=True)
+
+    async def tearDown(self):
+        if self.provider is not None:
+            self.provider.library_changed.disconnect(self.on_library_changed)
+
+    def on_library_changed(self, added, removed):
+        removed_ids = {song.identifier for song in removed}
+        self.songs = [song for song in self.songs
+                      if song.identifier not in removed_ids] + added
+        self.albums = self.provider.albums
+        self.artists = self.provider.artists
+        # Re-render the current table so that user can see the changes.
+        current_table = self.container.current_table
+        if current_table is self.songs_table:
+            self.show_songs(reader=wrap(self.songs), show_count=True)
+        elif current_table is self.albums_table:
+            self.show_albums(self.albums)
+        elif current_table is self.artists_table:
+            self.show_artists(self.artists)
@@ -0,0 +1,280 @@
+"""
+feeluown.local.watcher
+~~~~~~~~~~~~~~~~~~~~~~
+
+Watch music folders, and report changed files in batches.
+
+Changes are watched with inotify on Linux. On other platforms, or when
+inotify is not usable (for example, the watch limit is reached), the mtime
+of directories is polled instead. A directory's mtime changes when files
+are created, deleted or renamed in it, so this is cheap but it misses
+files modified in place.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from .db import iter_directory
+
+logger = logging.getLogger(__name__)
+
+#: Seconds to wait for more events before reporting changes. Copying an
+#: album generates many events, and they should be processed together.
+WATCH_DEBOUNCE = 2
+#: Changes are reported at least every such seconds, even if events keep coming.
+WATCH_MAX_DELAY = 10
+#: Seconds between two polls for the polling backend.
+WATCH_POLL_INTERVAL = 5
+
+# inotify constants, see inotify(7).
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+               | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyBackend:
+    """Watch directories with inotify, only available on Linux."""
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._wds: Dict[int, Tuple[str, int]] = {}  # {wd: (directory, depth)}
+
+    def watch(self, directory, depth):
+        """Watch the directory and its sub-directories within the depth."""
+        if depth < 0 or not os.path.isdir(directory):
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                          _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._wds[wd] = (directory, depth)
+        for entry in os.scandir(directory):
+            if entry.is_dir(follow_symlinks=False):
+                self.watch(entry.path, depth - 1)
+
+    def read(self, timeout) -> Set[Tuple[str, int]]:
+        """Wait for events, return changed paths and their remaining depths."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events are lost, so everything should be synced.
+                logger.warning('inotify queue overflows')
+                changed.update(self._wds.values())
+                continue
+            if mask & IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            if wd not in self._wds:
+                continue
+            directory, depth = self._wds[wd]
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changed.add((directory, depth))
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self.watch(path, depth - 1)
+                    except OSError:
+                        logger.exception(f'watch {path} failed')
+                changed.add((path, depth - 1))
+            elif not mask & IN_CREATE:
+                # Files are reported when they are written completely.
+                changed.add((path, depth))
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """Poll the mtime of directories."""
+
+    def __init__(self, interval=WATCH_POLL_INTERVAL):
+        self.interval = interval
+        self._dirs: Dict[str, Tuple[int, int]] = {}  # {directory: (mtime_ns, depth)}
+        self._next_poll_at = time.monotonic() + interval
+
+    def watch(self, directory, depth):
+        """Watch the directory and its sub-directories within the depth."""
+        if depth < 0:
+            return
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        self._dirs[directory] = (mtime, depth)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                self.watch(entry.path, depth - 1)
+
+    def read(self, timeout) -> Set[Tuple[str, int]]:
+        """Wait for the next poll, return changed directories and their depths."""
+        now = time.monotonic()
+        if now < self._next_poll_at:
+            time.sleep(min(timeout, self._next_poll_at - now))
+            if time.monotonic() < self._next_poll_at:
+                return set()
+        self._next_poll_at = time.monotonic() + self.interval
+
+        changed = set()
+        for directory, (mtime, depth) in list(self._dirs.items()):
+            try:
+                new_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                new_mtime = None
+            if new_mtime == mtime:
+                continue
+            changed.add((directory, depth))
+            # Forget the directory and its sub-directories, and watch them
+            # again so that new sub-directories are watched.
+            prefix = os.path.join(directory, '')
+            for d in [d for d in self._dirs if d == directory or d.startswith(prefix)]:
+                del self._dirs[d]
+            if new_mtime is not None:
+                self.watch(directory, depth)
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_backend():
+    try:
+        return InotifyBackend()
+    except (OSError, AttributeError):
+        # AttributeError is raised if libc has no inotify functions.
+        logger.info('inotify is not available, poll music folders instead')
+        return PollingBackend()
+
+
+class MusicFolderWatcher:
+    """Watch music folders in a thread and report changes with a callback
+
+    Events are collected until no more event comes in :data:`WATCH_DEBOUNCE`
+    seconds, then the callback is called with changed media files and
+    changed directories, see :meth:`feeluown.local.db.DB.sync`.
+    """
+
+    def __init__(
+        self,
+        folders: Iterable[str],
+        depth: int,
+        exts: Iterable[str],
+        callback: Callable[[Set[str], Set[str]], None],
+        debounce=WATCH_DEBOUNCE,
+        max_delay=WATCH_MAX_DELAY,
+        backend=None,
+    ):
+        self.folders = list(folders)
+        self.depth = depth
+        self.exts = list(exts)
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        self._backend = backend
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._backend is None:
+            self._backend = create_backend()
+        try:
+            self._watch_folders()
+        except OSError:
+            if isinstance(self._backend, PollingBackend):
+                raise
+            # For example, the inotify watch limit is reached.
+            logger.exception('watch music folders with inotify failed')
+            self._backend.close()
+            self._backend = PollingBackend()
+            self._watch_folders()
+        self._thread = threading.Thread(target=self._run, name='MusicFolderWatcher',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch_folders(self):
+        for folder in self.folders:
+            self._backend.watch(folder, self.depth)
+
+    def _run(self):
+        pending: Set[Tuple[str, int]] = set()
+        first_event_at = last_event_at = 0.0
+        try:
+            while not self._stopped.is_set():
+                changed = self._backend.read(timeout=min(self.debounce, 1))
+                now = time.monotonic()
+                if changed:
+                    if not pending:
+                        first_event_at = now
+                    last_event_at = now
+                    pending.update(changed)
+                if pending and (now - last_event_at >= self.debounce
+                                or now - first_event_at >= self.max_delay):
+                    self._report(pending)
+                    pending = set()
+        finally:
+            self._backend.close()
+
+    def _report(self, changed):
+        fpaths, dirs = set(), set()
+        for path, depth in changed:
+            if os.path.isdir(path):
+                dirs.add(path)
+                fpaths.update(iter_directory(path, self.exts, depth))
+            elif path.split('.')[-1] in self.exts:
+                fpaths.add(path)
+            elif not os.path.exists(path):
+                # The path may be a removed directory.
+                dirs.add(path)
+        logger.info(f'music folders changed: {len(fpaths)} files, {len(dirs)} dirs')
+        try:
+            self.callback(fpaths, dirs)
+        except:  # noqa
+            logger.exception('handle music folder changes failed')
@@ -43,7 +43,7 @@ class NowPlayingService(aionp.NowPlayingInterface):
                                                   aioqueue=True)
         self._app.player.state_changed.connect(self.update_playback_status)
         self._app.player.metadata_changed.connect(self.update_song_metadata,
-                                                  aioqueue=True)
+                                                  aioqueue=True, coalesce=True)
         self._app.player.media_changed.connect(self.on_player_media_changed,
                                                aioqueue=True)
         self._app.playlist.playback_mode_changed.connect(
@@ -9,6 +9,7 @@ from .fm import FM
 from .radio import SongRadio, SongsRadio
 from .lyric import LiveLyric, parse_lyric_text, Line as LyricLine, Lyric
 from .recently_played import RecentlyPlayed
+from .play_history import PlayHistory
 from .delegate import PlayerPositionDelegate
 
 
@@ -38,4 +39,5 @@ __all__ = (
     'Lyric',
 
     'RecentlyPlayed',
+    'PlayHistory',
 )
@@ -149,6 +149,19 @@ class AbstractPlayer(metaclass=ABCMeta):
         :param metadata: metadata for the media
         """
 
+    def preload(self, media) -> bool:
+        """Preload the media which is played after current media
+
+        Player can prepare the media in advance, so that the transition is
+        gapless. The media is only preloaded, the caller should still call
+        :meth:`play` with the same media object to switch to it.
+
+        :return: True if the media is preloaded.
+
+        .. versionadded:: 5.2
+        """
+        return False
+
     @abstractmethod
     def set_play_range(self, start=None, end=None):
         pass
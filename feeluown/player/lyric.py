@@ -4,7 +4,7 @@ import logging
 from typing import Dict, Optional, TYPE_CHECKING
 from collections import namedtuple, OrderedDict
 
-from feeluown.library import LyricModel
+from feeluown.library import BaseModel, LyricModel
 from feeluown.utils.aio import run_fn
 from feeluown.utils.dispatch import Signal
 
@@ -13,6 +13,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+#: Key of the lyric cached on song model, see :class:`feeluown.player.Prefetcher`.
+LYRIC_CACHE_KEY = 'lyric'
+
 
 def find_previous(element, list_):
     """
@@ -220,7 +223,18 @@ class LiveLyric:
                 lyric = None
             self.set_lyric(lyric)
 
-        future = run_fn(self._app.library.song_get_lyric, song)
+        if isinstance(song, BaseModel):
+            # The lyric may be prefetched by the playlist.
+            lyric, exists = song.cache_get(LYRIC_CACHE_KEY)
+            if exists:
+                self.set_lyric(lyric)
+                return
+
+        future = run_fn(
+            self._app.library.song_get_lyric,
+            song,
+            source=getattr(song, 'source', None),
+        )
         future.add_done_callback(cb)
 
     def set_lyric(self, model: Optional[LyricModel]):
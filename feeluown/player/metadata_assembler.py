@@ -5,6 +5,7 @@ from feeluown.excs import ResourceNotFound, ModelNotFound
 from feeluown.library import reverse, SongModel
 from feeluown.player import Metadata, MetadataFields
 from feeluown.utils import aio
+from feeluown.utils.scheduler import Priority
 
 if TYPE_CHECKING:
     from feeluown.app import App
@@ -32,7 +33,12 @@ class MetadataAssembler:
         empty_result = ('', '', None)
         try:
             usong: SongModel = await aio.wait_for(
-                aio.run_fn(self._app.library.song_upgrade, song),
+                aio.run_fn(
+                    self._app.library.song_upgrade,
+                    song,
+                    source=song.source,
+                    priority=Priority.high,
+                ),
                 timeout=1,
             )
         except ResourceNotFound:
@@ -49,7 +55,12 @@ class MetadataAssembler:
         empty_result = ('', '')
         try:
             album = await aio.wait_for(
-                aio.run_fn(self._app.library.album_upgrade, album),
+                aio.run_fn(
+                    self._app.library.album_upgrade,
+                    album,
+                    source=album.source,
+                    priority=Priority.high,
+                ),
                 timeout=1
             )
         except ResourceNotFound:
@@ -84,7 +95,12 @@ class MetadataAssembler:
             MetadataFields.uri: reverse(video),
         })
         try:
-            video = await aio.run_fn(self._app.library.video_upgrade, video)
+            video = await aio.run_fn(
+                self._app.library.video_upgrade,
+                video,
+                source=video.source,
+                priority=Priority.high,
+            )
         except ModelNotFound as e:
             logger.warning(f"can't get cover of video due to {str(e)}")
         else:
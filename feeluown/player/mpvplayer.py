@@ -1,9 +1,7 @@
 import locale
 import logging
 import time
-import math
-import os
-import sys
+from typing import Dict, Optional
 
 from feeluown.mpv import (  # type: ignore
     MPV,
@@ -15,7 +13,7 @@ from feeluown.mpv import (  # type: ignore
     ErrorCode,
 )
 
-from threading import Thread, RLock
+from threading import RLock, Timer
 from feeluown.utils.dispatch import Signal
 from feeluown.media import Media, VideoAudioManifest
 from .base_player import AbstractPlayer, State
@@ -23,6 +21,12 @@ from .metadata import MetadataFields, Metadata
 
 logger = logging.getLogger(__name__)
 
+#: Label of the audio filter which fades current media in or out.
+FADE_FILTER_LABEL = 'fuo-fade'
+#: Audio in mpv's output buffer is not processed by audio filters any more,
+#: so a fade starts after the buffered audio. 0.2s is mpv's default buffer size.
+AUDIO_BUFFER_SECONDS = 0.2
+
 
 class MpvPlayer(AbstractPlayer):
     """
@@ -40,10 +44,19 @@ class MpvPlayer(AbstractPlayer):
         winid=None,
         fade=False,
         fade_time_ms=500,
+        gapless=False,
         **kwargs
     ):
         """
         :param _: keep this arg to keep backward compatibility
+        :param fade: fade in/out on resume/pause. When gapless is also enabled,
+            current media and the preloaded media overlap for `fade_time_ms`.
+        :param gapless: preload the next media in mpv's internal playlist,
+            see :meth:`preload`.
+
+        .. versionchanged:: 5.2
+            Fading is done by mpv's audio filters instead of changing volume
+            in a python thread.
         """
         super().__init__(**kwargs)
         # https://github.com/cosven/FeelUOwn/issues/246
@@ -70,12 +83,23 @@ class MpvPlayer(AbstractPlayer):
         except:  # noqa
             logger.info('ytdl option is not supported in this version of libmpv')
         _mpv_set_property_string(self._mpv.handle, b'audio-device', audio_device)
+        self._audio_device = audio_device
         # old version libmpv(for example: (1, 20)) should set option by using
         # _mpv_set_option_string, while newer version can use _mpv_set_property_string
         _mpv_set_option_string(
             self._mpv.handle, b'user-agent', b'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
         )
 
+        self.gapless = gapless
+        if self.gapless:
+            # Open the next playlist entry while the current one is playing.
+            _mpv_set_option_string(self._mpv.handle, b'prefetch-playlist', b'yes')
+            _mpv_set_option_string(self._mpv.handle, b'gapless-audio', b'weak')
+        # The media which is appended to mpv's internal playlist.
+        self._preloaded_media = None
+        # Used to measure the gap between media_finished and media_loaded.
+        self._media_finished_at = None
+
         #: if video_format changes to None, there is no video available
         self.video_format_changed = Signal()  # Optional[str]
         self.audio_bitrate_changed = Signal()  # Optional[int], for example: 128001
@@ -102,11 +126,26 @@ class MpvPlayer(AbstractPlayer):
         self.pausing = False
 
         self.do_fade = fade
-        if self.do_fade:
-            self.fade_lock = RLock()
-            self.fade_time_ms = fade_time_ms
+        self.fade_time_ms = fade_time_ms
+        self.fade_lock = RLock()
+        # {purpose: afade filter}. Filters are set as file local options,
+        # so that mpv removes them when current media is changed.
+        self._fades: Dict[str, str] = {}
+        self._fade_out_timer: Optional[Timer] = None
+        # During the overlap, the head of the preloaded media is played by
+        # a helper mpv instance, and mpv's playlist starts the preloaded
+        # media from where the overlap ends.
+        self._overlap_mpv: Optional[MPV] = None
+        self._overlap_start: Optional[float] = None
+        self._overlap_timer: Optional[Timer] = None
+        # The helper is playing (or paused in) the head of the preloaded media.
+        self._overlap_started = False
 
     def shutdown(self):
+        self._disarm_overlap()
+        if self._overlap_mpv is not None:
+            self._overlap_mpv.terminate()
+            self._overlap_mpv = None
         # The mpv has already been terminated.
         # The mpv can't terminate twice.
         if self._mpv.handle is not None:
@@ -119,9 +158,15 @@ class MpvPlayer(AbstractPlayer):
             _mpv_set_property_string(self._mpv.handle, b'vid', b'auto')
 
         self.media_about_to_changed.emit(self._current_media, media)
+        self._cancel_fade_out()
+        self._fades.clear()
         if media is None:
+            self._disarm_overlap()
             self._stop_mpv()
+        elif media is self._preloaded_media:
+            self._play_preloaded()
         else:
+            self._disarm_overlap()
             logger.debug("Player will play: '%s'", media)
             if isinstance(media, Media):
                 media = media
@@ -157,6 +202,9 @@ class MpvPlayer(AbstractPlayer):
                     self._mpv.play(audio_url)
             else:
                 assert False, 'Unknown manifest'
+        self._preloaded_media = None
+        self._overlap_start = None
+        self._overlap_started = False
         self._current_media = media
         self.media_changed.emit(media)
         if metadata is None:
@@ -167,6 +215,45 @@ class MpvPlayer(AbstractPlayer):
             self._current_metadata = metadata
         self.metadata_changed.emit(self.current_metadata)
 
+    def preload(self, media) -> bool:
+        """Append the media to mpv's internal playlist
+
+        mpv opens the entry in advance (``prefetch-playlist``) and switches to
+        it as soon as current media finishes. Network options of mpv are
+        global, so only media with the same network options as current media
+        can be preloaded.
+        """
+        if not self.gapless or not isinstance(media, Media):
+            return False
+        current_media = self._current_media
+        if current_media is None or media.manifest is not None:
+            return False
+        if (
+            media.http_headers != current_media.http_headers
+            or media.http_proxy != current_media.http_proxy
+            or media.decryption_key != current_media.decryption_key
+        ):
+            logger.debug("Can't preload media with different network options")
+            return False
+        self._disarm_overlap()
+        self._preloaded_media = media
+        if not (self.do_fade and self._arm_overlap(media)):
+            # Keep only the current entry, then append the next one.
+            self._mpv.playlist_clear()
+            self._mpv.playlist_append(media.url)
+        logger.info("Player preloads media: '%s'", media.url)
+        return True
+
+    def _play_preloaded(self):
+        # mpv switches to the preloaded entry by itself when current media
+        # finishes, otherwise, switch to it manually.
+        if self._mpv.playlist_pos != 1:
+            # The head of the media must not be skipped.
+            self._disarm_overlap()
+            self._mpv.playlist_next('force')
+        logger.debug("Player switches to the preloaded media: '%s'",
+                     self._preloaded_media)
+
     def set_infinite_loop(self, on: bool):
         """Enable or disable infinite loop playback."""
         loop = "inf" if on is True else "no"
@@ -184,66 +271,167 @@ class MpvPlayer(AbstractPlayer):
             self.seeked.emit(start)
         _mpv_set_option_string(self._mpv.handle, b'end', bytes(end_str, 'utf-8'))
 
-    def set_volume(self, max_volume: int, fade_in: bool):
-        # Since Python 3.11 we have high resolution time.sleep()
-        if sys.version_info.minor >= 11 or sys.version_info.major > 3:
-            interval = 0.001
-        else:
-            interval = 0.02 if os.name == "nt" else 0.01
-
-        freq = int(self.fade_time_ms / 1000 / interval)
+    def _apply_fades(self):
+        graph = ','.join(self._fades.values())
+        value = f'@{FADE_FILTER_LABEL}:lavfi=[{graph}]' if graph else ''
+        _mpv_set_property_string(
+            self._mpv.handle, b'file-local-options/af', bytes(value, 'utf-8')
+        )
 
-        for _tick in range(freq):
-            new_volume = math.ceil(
-                fade_curve(_tick / freq, fade_in=fade_in) * max_volume
-            )
-            self.volume = new_volume
-            time.sleep(interval)
+    def _cancel_fade_out(self):
+        if self._fade_out_timer is not None:
+            self._fade_out_timer.cancel()
+            self._fade_out_timer = None
+            self.pausing = False
 
     def fade_in(self):
         with self.fade_lock:
+            if self.pausing:
+                self._cancel_fade_out()
             # skip fade-in on playing
-            if not self._mpv.pause:
+            elif not self._mpv.pause:
                 return
-
-            max_volume = self.volume
-
-            self.volume = 0
+            self._fades['pause'] = afade(
+                'in', self.fade_time_ms / 1000, self._position + AUDIO_BUFFER_SECONDS
+            )
+            self._apply_fades()
             self._resume()
-            self.set_volume(max_volume, fade_in=True)
 
     def fade_out(self):
         with self.fade_lock:
             # skip fade-out on pause
             if self._mpv.pause or self.pausing:
                 return
-
-            max_volume = self.volume
             self.pausing = True
+            self._pause_overlap()
+            duration = self.fade_time_ms / 1000
+            self._fades['pause'] = afade(
+                'out', duration, self._position + AUDIO_BUFFER_SECONDS
+            )
+            self._apply_fades()
+            # Pause when the fade is finished, mpv outputs silence after it.
+            self._fade_out_timer = Timer(
+                AUDIO_BUFFER_SECONDS + duration, self._on_fade_out_finished
+            )
+            self._fade_out_timer.daemon = True
+            self._fade_out_timer.start()
 
-            self.set_volume(max_volume, fade_in=False)
+    def _on_fade_out_finished(self):
+        with self.fade_lock:
+            if self._fade_out_timer is None:  # The fade-out is cancelled.
+                return
+            self._fade_out_timer = None
             self._pause()
-
             self.pausing = False
-            self.volume = max_volume
+
+    def _arm_overlap(self, media) -> bool:
+        """Overlap current media's tail and the media's head
+
+        Current media fades out at its end and the helper mpv plays the head
+        of the media with a fade-in. mpv's playlist then continues the media
+        from where the head ends.
+        """
+        overlap = self.fade_time_ms / 1000
+        if not self.duration or self.duration <= overlap * 2 or overlap <= 0:
+            return False
+        helper = self._get_overlap_mpv()
+        self._set_http_headers(media.http_headers, helper.handle)
+        self._set_http_proxy(media.http_proxy, helper.handle)
+        self._set_decryption_key(media.decryption_key, helper.handle)
+        helper.pause = True
+        helper.volume = self.volume
+        helper.loadfile(
+            media.url, end=f'{overlap:.3f}', af=f'lavfi=[{afade("in", overlap)}]'
+        )
+        self._mpv.playlist_clear()
+        self._mpv.playlist_append(media.url, start=f'{overlap:.3f}')
+        self._overlap_start = self.duration - overlap
+        self._fades['overlap'] = afade('out', overlap, self._overlap_start)
+        self._apply_fades()
+        self._schedule_overlap()
+        return True
+
+    def _disarm_overlap(self):
+        """Cancel the armed overlap, the media is preloaded without overlap."""
+        if self._overlap_timer is not None:
+            self._overlap_timer.cancel()
+            self._overlap_timer = None
+        if self._overlap_start is None:
+            return
+        self._overlap_start = None
+        self._overlap_started = False
+        if self._overlap_mpv is not None:
+            self._overlap_mpv.stop()
+        if self._fades.pop('overlap', None) is not None:
+            self._apply_fades()
+        if self._preloaded_media is not None:
+            self._mpv.playlist_clear()
+            self._mpv.playlist_append(self._preloaded_media.url)
+
+    def _schedule_overlap(self):
+        if self._overlap_timer is not None:
+            self._overlap_timer.cancel()
+            self._overlap_timer = None
+        if self._overlap_start is None:
+            return
+        if self._overlap_started:
+            # The helper is paused and resumed along with current media.
+            if self._overlap_mpv is not None:
+                self._overlap_mpv.pause = self._mpv.pause
+            return
+        if self._mpv.pause:
+            return
+        delay = self._overlap_start - self._position
+        if delay < 0:  # For example, user seeks to the tail.
+            self._disarm_overlap()
+            return
+        self._overlap_timer = Timer(delay, self._start_overlap)
+        self._overlap_timer.daemon = True
+        self._overlap_timer.start()
+
+    def _start_overlap(self):
+        self._overlap_timer = None
+        if self._overlap_mpv is not None:
+            logger.debug('Player starts to overlap current and preloaded media')
+            self._overlap_started = True
+            self._overlap_mpv.pause = False
+
+    def _pause_overlap(self):
+        if self._overlap_started and self._overlap_mpv is not None:
+            self._overlap_mpv.pause = True
+
+    def _get_overlap_mpv(self) -> MPV:
+        if self._overlap_mpv is None:
+            helper = MPV()
+            _mpv_set_option_string(helper.handle, b'vid', b'no')
+            _mpv_set_property_string(helper.handle, b'audio-device', self._audio_device)
+            _mpv_set_option_string(
+                helper.handle,
+                b'user-agent',
+                b'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+            )
+            self._overlap_mpv = helper
+        return self._overlap_mpv
 
     def _resume(self):
         self._mpv.pause = False
         self.state = State.playing
+        self._schedule_overlap()
 
     def _pause(self):
         self._mpv.pause = True
         self.state = State.paused
+        self._schedule_overlap()
 
     def resume(self):
         if self.do_fade:
-            Thread(target=self.fade_in).start()
+            self.fade_in()
         else:
             self._resume()
 
     def pause(self):
         if self.do_fade:
-            Thread(target=self.fade_out).start()
+            self.fade_out()
         else:
             self._pause()
 
@@ -255,6 +443,7 @@ class MpvPlayer(AbstractPlayer):
 
     def stop(self):
         self._mpv.pause = True
+        self._pause_overlap()
         self.state = State.stopped
         self.play(None)
         logger.debug('Player stopped.')
@@ -268,6 +457,14 @@ class MpvPlayer(AbstractPlayer):
         if self._current_media:
             self._mpv.seek(position, reference='absolute')
             self._position = position
+            # Fades are bound to positions.
+            if self._fades.pop('pause', None) is not None:
+                self._apply_fades()
+            # The head of the preloaded media is (partly) played by the helper,
+            # so it must be played again by mpv after seeking.
+            if self._overlap_started:
+                self._disarm_overlap()
+            self._schedule_overlap()
             self.seeked.emit(position)
         else:
             logger.warning("can't set position when current media is empty")
@@ -276,6 +473,8 @@ class MpvPlayer(AbstractPlayer):
     def volume(self, value):
         super(MpvPlayer, MpvPlayer).volume.__set__(self, value)
         self._mpv.volume = self.volume
+        if self._overlap_mpv is not None:
+            self._overlap_mpv.volume = self.volume
 
     @property
     def audio_bitrate(self):
@@ -307,6 +506,14 @@ class MpvPlayer(AbstractPlayer):
         """listening to mpv duration change event"""
         logger.debug('Player receive duration changed signal')
         self.duration = duration
+        # The next media may be preloaded before the duration is known.
+        if (
+            self.do_fade
+            and self._preloaded_media is not None
+            and self._overlap_start is None
+            and self._mpv.playlist_pos == 0
+        ):
+            self._arm_overlap(self._preloaded_media)
 
     def _on_video_format_changed(self, vformat):
         self.video_format = vformat
@@ -319,7 +526,10 @@ class MpvPlayer(AbstractPlayer):
         if event_id == MpvEventID.END_FILE:
             reason = event['event']['reason']
             logger.debug('Current song finished. reason: %d' % reason)
+            # mpv removes file local options, including the fade filters.
+            self._fades.clear()
             if self.state != State.stopped and reason != MpvEventEndFile.ABORTED:
+                self._media_finished_at = time.monotonic()
                 self.media_finished.emit()
                 if reason == MpvEventEndFile.ERROR \
                         and event['event']['error'] == ErrorCode.LOADING_FAILED:
@@ -327,6 +537,10 @@ class MpvPlayer(AbstractPlayer):
 
         elif event_id == MpvEventID.FILE_LOADED:
             # If the media is a live streaming, this event may not be received.
+            if self._media_finished_at is not None:
+                gap = (time.monotonic() - self._media_finished_at) * 1000
+                self._media_finished_at = None
+                logger.info('Media transition gap: %.1fms', gap)
             self.media_loaded.emit()
             self.media_loaded_v2.emit({'video_format': self._mpv.video_format})
         elif event_id == MpvEventID.METADATA_UPDATE:
@@ -347,7 +561,8 @@ class MpvPlayer(AbstractPlayer):
                         self._current_metadata[src] = value
                 self.metadata_changed.emit(self.current_metadata)
 
-    def _set_http_headers(self, http_headers):
+    def _set_http_headers(self, http_headers, handle=None):
+        handle = handle or self._mpv.handle
         if http_headers:
             headers = []
             for key, value in http_headers.items():
@@ -355,35 +570,30 @@ class MpvPlayer(AbstractPlayer):
             headers_text = ','.join(headers)
             headers_bytes = bytes(headers_text, 'utf-8')
             logger.info('play media with headers: %s', headers_text)
-            _mpv_set_option_string(
-                self._mpv.handle, b'http-header-fields', headers_bytes
-            )
+            _mpv_set_option_string(handle, b'http-header-fields', headers_bytes)
         else:
-            _mpv_set_option_string(self._mpv.handle, b'http-header-fields', b'')
+            _mpv_set_option_string(handle, b'http-header-fields', b'')
 
-    def _set_http_proxy(self, http_proxy):
+    def _set_http_proxy(self, http_proxy, handle=None):
         _mpv_set_option_string(
-            self._mpv.handle, b'http-proxy', bytes(http_proxy, 'utf-8')
+            handle or self._mpv.handle, b'http-proxy', bytes(http_proxy, 'utf-8')
         )
 
-    def _set_decryption_key(self, decryption_key):
+    def _set_decryption_key(self, decryption_key, handle=None):
         if decryption_key is not None:
             value = bytes(f'decryption_key={decryption_key}', 'utf-8')
         else:
             value = b''
-        _mpv_set_option_string(self._mpv.handle, b'demuxer-lavf-o', value)
+        _mpv_set_option_string(handle or self._mpv.handle, b'demuxer-lavf-o', value)
 
     def __log_handler(self, loglevel, component, message):
         print('[{}] {}: {}'.format(loglevel, component, message))
 
 
-# k: factor between 0 and 1, to represent tick/fade_time
-def fade_curve(k: float, fade_in: bool) -> float:
-
-    def sigmoid(x: float) -> float:
-        return math.pow(1 + math.pow(math.e, -11.4514 * (x - 0.5)), -1)
+def afade(fade_type: str, duration: float, start: float = 0) -> str:
+    """Build a ffmpeg afade filter, the volume curve is computed by mpv
 
-    if fade_in:
-        return sigmoid(k)
-    else:
-        return 1 - sigmoid(k)
+    >>> afade('in', 0.5, start=10)
+    'afade=t=in:st=10.000:d=0.500:curve=hsin'
+    """
+    return f'afade=t={fade_type}:st={start:.3f}:d={duration:.3f}:curve=hsin'
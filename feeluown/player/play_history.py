@@ -0,0 +1,198 @@
+"""
+feeluown.player.play_history
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A persistent store of play history, backed by SQLite.
+
+Each play is appended to an event log, with the time it starts, the seconds
+played and whether it is skipped. Per-song statistics are updated along with
+the log, so that queries such as recently played songs and most played songs
+are answered by indexes instead of scanning the whole log.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from feeluown.library import reverse, resolve_many
+from feeluown.utils.reader import RandomSequentialReader
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS play_events (
+    id INTEGER PRIMARY KEY,
+    uri TEXT NOT NULL,
+    played_at REAL NOT NULL,
+    duration REAL NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS play_events_uri ON play_events (uri);
+CREATE TABLE IF NOT EXISTS songs (
+    uri TEXT PRIMARY KEY,
+    line TEXT NOT NULL,
+    play_count INTEGER NOT NULL DEFAULT 0,
+    skip_count INTEGER NOT NULL DEFAULT 0,
+    last_played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS songs_last_played_at ON songs (last_played_at);
+CREATE INDEX IF NOT EXISTS songs_play_count ON songs (play_count);
+CREATE TABLE IF NOT EXISTS song_artists (
+    artist TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    PRIMARY KEY (artist, uri)
+);
+'''
+
+
+def _split_artists_name(artists_name: str) -> List[str]:
+    return [name.strip() for name in (artists_name or '').split(',') if name.strip()]
+
+
+class PlayHistory:
+    """Play history stored in a SQLite database
+
+    The database is opened on first use, so creating it costs nothing.
+    It is thread safe.
+
+    .. versionadded:: 5.2
+    """
+
+    def __init__(self, fpath: str):
+        self.fpath = fpath
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.fpath != ':memory:':
+                os.makedirs(os.path.dirname(self.fpath) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.fpath, check_same_thread=False)
+            # A play is recorded on the main thread, WAL mode makes
+            # a commit cheap.
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record(self, song, played_at: Optional[float] = None) -> int:
+        """Record that the song starts to play, return the id of the event.
+
+        The seconds played and the skip flag are set by :meth:`finish`
+        when the song stops.
+        """
+        played_at = time.time() if played_at is None else played_at
+        uri = reverse(song)
+        line = reverse(song, as_line=True)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    'INSERT INTO play_events (uri, played_at) VALUES (?, ?)',
+                    (uri, played_at))
+                conn.execute(
+                    'INSERT INTO songs (uri, line, play_count, last_played_at) '
+                    'VALUES (?, ?, 1, ?) '
+                    'ON CONFLICT (uri) DO UPDATE SET line = excluded.line, '
+                    'play_count = play_count + 1, '
+                    'last_played_at = MAX(last_played_at, excluded.last_played_at)',
+                    (uri, line, played_at))
+                conn.executemany(
+                    'INSERT OR IGNORE INTO song_artists (artist, uri) VALUES (?, ?)',
+                    [(name, uri) for name in _split_artists_name(song.artists_name)])
+            return cursor.lastrowid
+
+    def finish(self, event_id: int, duration: float, skipped: bool = False):
+        """Set the seconds played and the skip flag of the event."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                row = conn.execute(
+                    'SELECT uri, skipped FROM play_events WHERE id = ?',
+                    (event_id, )).fetchone()
+                if row is None:
+                    return
+                uri, was_skipped = row
+                conn.execute(
+                    'UPDATE play_events SET duration = ?, skipped = ? WHERE id = ?',
+                    (duration, int(skipped), event_id))
+                conn.execute(
+                    'UPDATE songs SET skip_count = skip_count + ? WHERE uri = ?',
+                    (int(skipped) - was_skipped, uri))
+
+    def _query(self, sql, args=()) -> list:
+        with self._lock:
+            return self._connect().execute(sql, args).fetchall()
+
+    def count_songs(self) -> int:
+        """Return the count of songs ever played."""
+        return self._query('SELECT COUNT(*) FROM songs')[0][0]
+
+    def list_recently_played(self, limit: int, offset: int = 0) -> list:
+        """List songs in the order of the last time they are played."""
+        rows = self._query(
+            'SELECT line FROM songs ORDER BY last_played_at DESC LIMIT ? OFFSET ?',
+            (limit, offset))
+        return resolve_many(line for line, in rows)
+
+    def create_recently_played_reader(self) -> RandomSequentialReader:
+        """Create a reader which reads recently played songs page by page."""
+        return RandomSequentialReader(
+            self.count_songs(),
+            lambda start, end: self.list_recently_played(end - start, start),
+            max_per_read=100,
+        )
+
+    def list_most_played(self, limit: int) -> List[Tuple[object, int]]:
+        """List most played songs, with their play counts."""
+        rows = self._query(
+            'SELECT line, play_count FROM songs '
+            'ORDER BY play_count DESC, last_played_at DESC LIMIT ?', (limit, ))
+        songs = resolve_many(line for line, _ in rows)
+        return list(zip(songs, (count for _, count in rows)))
+
+    def get_play_count(self, song) -> int:
+        rows = self._query('SELECT play_count FROM songs WHERE uri = ?',
+                           (reverse(song), ))
+        return rows[0][0] if rows else 0
+
+    def get_artist_play_count(self, artist_name: str) -> int:
+        """Return the play count of songs of the artist (matched by name)."""
+        rows = self._query(
+            'SELECT SUM(songs.play_count) FROM song_artists '
+            'JOIN songs ON songs.uri = song_artists.uri '
+            'WHERE song_artists.artist = ?', (artist_name.strip(), ))
+        return rows[0][0] or 0
+
+    def get_skip_rate(self, song=None) -> float:
+        """Return the rate of skipped plays of the song, or of all songs."""
+        if song is None:
+            rows = self._query('SELECT SUM(play_count), SUM(skip_count) FROM songs')
+        else:
+            rows = self._query('SELECT play_count, skip_count FROM songs WHERE uri = ?',
+                               (reverse(song), ))
+        if not rows or not rows[0][0]:
+            return 0.0
+        play_count, skip_count = rows[0]
+        return skip_count / play_count
+
+    def import_songs(self, songs):
+        """Import recently played songs, which are sorted by the last time
+        they are played, newest first.
+
+        It is used to migrate the songs which are kept in the state file.
+        """
+        songs = list(songs)
+        now = time.time()
+        for i, song in enumerate(reversed(songs)):
+            self.record(song, played_at=now - len(songs) + i)
@@ -2,14 +2,16 @@ import asyncio
 import logging
 import random
 from enum import IntEnum, Enum
+from itertools import chain
 from typing import Optional, TYPE_CHECKING
 from threading import Lock
 
 from feeluown.excs import ProviderIOError
 from feeluown.utils import aio
 from feeluown.utils.aio import run_fn, run_afn
+from feeluown.utils.scheduler import ExecutorBusy, Priority
 from feeluown.utils.dispatch import Signal
-from feeluown.utils.utils import DedupList
+from feeluown.utils.utils import DedupList, IndexedDedupList
 from feeluown.library import (
     MediaNotFound,
     SongModel,
@@ -17,10 +19,13 @@ from feeluown.library import (
     VideoModel,
     ModelNotFound,
     BriefSongModel,
+    get_standby_score,
 )
 from feeluown.media import Media
 from feeluown.i18n import t
 from .metadata_assembler import MetadataAssembler
+from .prefetcher import Prefetcher
+from .shuffle import ShuffledSongs
 
 if TYPE_CHECKING:
     from feeluown.app import App
@@ -30,6 +35,7 @@ logger = logging.getLogger(__name__)
 TASK_SET_CURRENT_MODEL = "playlist.set_current_model"
 TASK_PLAY_MODEL = "playlist.play_model"
 TASK_PREPARE_MEDIA = "playlist.prepare_media"
+TASK_PREFETCH = "playlist.prefetch"
 
 
 class PlaybackMode(IntEnum):
@@ -100,13 +106,17 @@ class Playlist:
         songs=None,
         playback_mode=PlaybackMode.loop,
         audio_select_policy="hq<>",
+        prefetch_count=0,
     ):
         """
         :param songs: list of :class:`feeluown.library.SongModel`
         :param playback_mode: :class:`feeluown.player.PlaybackMode`
+        :param prefetch_count: how many upcoming songs are prepared in background
+            while the current song is playing. 0 means disabled.
         """
         self._app = app
         self._metadata_mgr = MetadataAssembler(app)
+        self._prefetcher = Prefetcher(app, self._metadata_mgr, count=prefetch_count)
 
         #: init playlist mode normal
         self._mode = PlaylistMode.normal
@@ -127,8 +137,10 @@ class Playlist:
         #: songs whose url is invalid
         self._bad_songs = DedupList()
 
-        # A data structure to store the song list.
-        self._songs = DedupList(songs or [])
+        # A data structure to store the song list. Songs are looked up by
+        # index and indexes are looked up by song frequently, so an indexed
+        # structure is used to keep them fast for big playlists.
+        self._songs = IndexedDedupList(songs or [])
         self._shuffled_songs = None
         self._queue = self._songs  # A pointer the the current song list.
 
@@ -254,25 +266,18 @@ class Playlist:
     def _queue_is_shuffled_songs(self):
         return self._queue is self._shuffled_songs
 
+    # NOTE: the shuffled songs apply changes to the songs by themselves.
     def _queue_insert(self, index, song):
         self._queue.insert(index, song)
-        if self._queue_is_shuffled_songs:
-            self._songs.append(song)
 
     def _queue_append(self, song):
         self._queue.append(song)
-        if self._queue_is_shuffled_songs:
-            self._songs.append(song)
 
     def _queue_remove(self, song):
         self._queue.remove(song)
-        if self._queue_is_shuffled_songs:
-            self._songs.remove(song)
 
     def _queue_clear(self):
         self._queue.clear()
-        if self._queue_is_shuffled_songs:
-            self._songs.clear()
 
     def set_models(self, models, next_=False, fm=False):
         """
@@ -299,10 +304,7 @@ class Playlist:
 
         with self._queue_lock:
             start_index = len(self._queue)
-            self._songs.extend(nonexisting_models)
-            if self._queue_is_shuffled_songs:
-                random.shuffle(nonexisting_models)
-                self._shuffled_songs.extend(nonexisting_models)
+            self._queue.extend(nonexisting_models)
             end_index = len(self._queue)
             self.songs_added.emit(start_index, end_index - start_index)
 
@@ -411,6 +413,7 @@ class Playlist:
             if length > 0:
                 self.songs_removed.emit(0, length)
             self._bad_songs.clear()
+            self._prefetcher.clear()
 
     def list(self):
         """Get all songs in playlists"""
@@ -482,8 +485,7 @@ class Playlist:
     def _enter_shuffle_mode(self):
         with self._queue_lock:
             assert self._shuffled_songs is None
-            self._shuffled_songs = self._queue.copy()
-            random.shuffle(self._shuffled_songs)
+            self._shuffled_songs = ShuffledSongs(self._songs)
             self._queue = self._shuffled_songs
             self.songs_reordered.emit(0, len(self._queue))
 
@@ -522,37 +524,40 @@ class Playlist:
             logger.debug("No good song in playlist.")
             return None
 
-        good_songs = []
+        length = len(self._queue)
+        if random_:
+            base = random.randrange(length)
+        # Walk from the base and skip bad songs, the walk stops at the first
+        # good song, so songs are not copied or visited unnecessarily.
         if direction > 0:
-            if loop is True:
-                song_list = self._queue[base:] + self._queue[0:base]
-            else:
-                song_list = self._queue[base:]
+            start = slice(base, None).indices(length)[0]
+            indexes = chain(range(start, length), range(0, start) if loop else ())
         else:
-            if loop is True:
-                song_list = self._queue[base::-1] + self._queue[:base:-1]
-            else:
-                song_list = self._queue[base::-1]
-        for song in song_list:
+            start = slice(base, None, -1).indices(length)[0]
+            indexes = chain(range(start, -1, -1),
+                            range(length - 1, start, -1) if loop else ())
+        for index in indexes:
+            song = self._queue[index]
             if song not in self._bad_songs:
-                good_songs.append(song)
-        if not good_songs:
-            return None
-        if random_:
-            return random.choice(good_songs)
-        else:
-            return good_songs[0]
+                return song
+        return None
 
     def _get_next_song_no_lock(self):
         """
         Requires: acquire `_queue_lock` before calling this method.
         """
         assert self._queue_lock.locked()
+        return self._get_next_song_of_no_lock(self.current_song)
 
-        if self.current_song is None:
+    def _get_next_song_of_no_lock(self, song):
+        """Get the song which is played after `song`.
+
+        Requires: acquire `_queue_lock` before calling this method.
+        """
+        if song is None:
             return self._get_good_song()
 
-        current_index = self._queue.index(self.current_song)
+        current_index = self._queue.index(song)
         is_last_song = current_index == len(self._queue) - 1
         if is_last_song and self.playback_mode == PlaybackMode.sequential:
             next_song = None
@@ -565,6 +570,23 @@ class Playlist:
             next_song = self._get_good_song(base=base_index, loop=loop)
         return next_song
 
+    def _list_upcoming_songs_no_lock(self, count):
+        """List at most `count` songs that will be played after current song.
+
+        Requires: acquire `_queue_lock` before calling this method.
+        """
+        songs = []
+        song = self.current_song
+        while len(songs) < count:
+            try:
+                song = self._get_next_song_of_no_lock(song)
+            except ValueError:  # The song is not in the queue.
+                break
+            if song is None or song == self.current_song or song in songs:
+                break
+            songs.append(song)
+        return songs
+
     @property
     def next_song(self):
         """next song for player, calculated based on playback_mode"""
@@ -632,10 +654,18 @@ class Playlist:
             self._current_song_mv = None
         else:
             try:
-                mv = await run_fn(self._app.library.song_get_mv, song)
+                mv = await run_fn(
+                    self._app.library.song_get_mv,
+                    song,
+                    source=song.source,
+                    priority=Priority.low,
+                )
             except ProviderIOError:
                 logger.exception("get song mv info failed")
                 self._current_song_mv = None
+            except ExecutorBusy:
+                logger.warning("get song mv info failed: provider is busy")
+                self._current_song_mv = None
             else:
                 self._current_song_mv = mv
         self.song_mv_changed.emit(song, self._current_song_mv)
@@ -674,6 +704,13 @@ class Playlist:
         if self.mode is PlaylistMode.fm and song not in self._queue:
             self.mode = PlaylistMode.normal
 
+        bundle = None if self.watch_mode else self._prefetcher.pop(song)
+        if bundle is not None:
+            logger.info(f"use prefetched media for {song}")
+            self.play_model_stage_changed.emit(PlaylistPlayModelStage.load_media)
+            self.set_current_song_with_media(song, bundle.media, bundle.metadata)
+            return
+
         target_song = song  # The song to be set.
         media = None  # The corresponding media to be set.
         try:
@@ -728,7 +765,12 @@ class Playlist:
         self._app.show_msg(f"{song} 的播放资源在孩子节点上，将孩子节点添加到播放列表")
         self.mark_as_bad(song)
         logger.info(f"{song} has children, replace the current playlist")
-        song = await run_fn(self._app.library.song_upgrade, song)
+        song = await run_fn(
+            self._app.library.song_upgrade,
+            song,
+            source=song.source,
+            priority=Priority.high,
+        )
         if song.children:
             self.batch_add(song.children)
             await self.a_set_current_song(song.children[0])
@@ -739,11 +781,9 @@ class Playlist:
     async def find_and_use_standby(self, song):
         self._app.show_msg(t("track-standby-try", track=song))
         logger.info(f"try to find standby from other providers for {song}")
-        standby_candidates = await self._app.library.a_list_song_standby_v2(
-            song, self.audio_select_policy
-        )
-        if standby_candidates:
-            standby, media = standby_candidates[0]
+        standby_and_media = await self._a_find_standby(song)
+        if standby_and_media is not None:
+            standby, media = standby_and_media
             logger.info(f"song standby was found in {standby.source} ✅")
             self._app.show_msg(
                 t("track-standby-found", track=song, standby=standby.source)
@@ -761,6 +801,37 @@ class Playlist:
         self._app.show_msg(t("track-standby-unavailable", track=song))
         return song, None
 
+    async def _a_find_standby(self, song):
+        """Find standby in the standby cache first, then search providers."""
+        library = self._app.library
+        cache = library.standby_cache
+        entry = cache.get(song)
+        if entry is not None:
+            if entry.standby is None:
+                logger.info(f"{song} has no standby (cached)")
+                return None
+            if library.get(entry.standby.source) is not None:
+                media = await library.a_song_prepare_media_no_exc(
+                    entry.standby, self.audio_select_policy
+                )
+                if media is not None:
+                    return entry.standby, media
+            # The cached standby is unavailable now, look for another one.
+            cache.invalidate(song)
+
+        failed_sources: set = set()
+        standby_candidates = await library.a_list_song_standby_v2(
+            song, self.audio_select_policy, failed_sources=failed_sources
+        )
+        if standby_candidates:
+            standby, media = standby_candidates[0]
+            cache.set(song, standby, get_standby_score(song, standby))
+            return standby, media
+        # The standby may exist in providers which failed to search.
+        if not failed_sources:
+            cache.set_not_found(song)
+        return None
+
     def set_current_song_with_media(self, song, media, metadata=None):
         if song is None:
             self.set_current_song_none()
@@ -782,6 +853,22 @@ class Playlist:
                 kwargs["video"] = False
             # TODO: set artwork field
             self._app.player.play(media, metadata=metadata, **kwargs)
+            self._schedule_prefetch()
+
+    def _schedule_prefetch(self):
+        """Prefetch upcoming songs in background."""
+        if self._prefetcher.count <= 0 or self.watch_mode:
+            return
+        if self.current_song is None:
+            return
+        with self._queue_lock:
+            songs = self._list_upcoming_songs_no_lock(self._prefetcher.count)
+        self._app.task_mgr.run_afn_preemptive(
+            self._prefetcher.a_prefetch,
+            songs,
+            self.audio_select_policy,
+            name=TASK_PREFETCH,
+        )
 
     def set_current_song_none(self):
         """A special case of `set_current_song_with_media`."""
@@ -800,6 +887,8 @@ class Playlist:
             self._app.library.song_prepare_media,
             song,
             self.audio_select_policy,
+            source=song.source,
+            priority=Priority.high,
         )
 
     async def _prepare_mv_media(self, song) -> Optional[Media]:
@@ -808,6 +897,8 @@ class Playlist:
                 self._app.library.song_prepare_mv_media,
                 song,
                 self._app.config.VIDEO_SELECT_POLICY,
+                source=song.source,
+                priority=Priority.high,
             )
         except MediaNotFound:
             mv_media = None
@@ -834,6 +925,8 @@ class Playlist:
                 self._app.library.video_prepare_media,
                 video,
                 self._app.config.VIDEO_SELECT_POLICY,
+                source=video.source,
+                priority=Priority.high,
             )
         except MediaNotFound:
             self._app.show_msg(t("playback-url-unavailable"))
@@ -862,7 +955,9 @@ class Playlist:
 
         try:
             # Try to upgrade the model.
-            umodel = await aio.run_fn(upgrade_fn, model)
+            umodel = await aio.run_fn(
+                upgrade_fn, model, source=model.source, priority=Priority.high
+            )
         except ModelNotFound:
             pass
         except Exception as e:  # noqa
@@ -0,0 +1,116 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+from feeluown.library import BriefSongModel, MediaNotFound
+from feeluown.media import Media
+from feeluown.utils.aio import run_fn
+from feeluown.utils.scheduler import Priority
+from .lyric import LYRIC_CACHE_KEY
+
+if TYPE_CHECKING:
+    from feeluown.app import App
+    from .metadata_assembler import MetadataAssembler
+
+logger = logging.getLogger(__name__)
+
+#: Seconds that a prefetched media is considered valid. Media urls of
+#: many providers expire after a while, so expired media are dropped.
+PREFETCH_MEDIA_TTL = 300
+
+
+@dataclass
+class PrefetchedBundle:
+    song: BriefSongModel
+    media: Media
+    metadata: Any
+    prepared_at: float = field(default_factory=time.monotonic)
+
+    def is_expired(self, ttl) -> bool:
+        return time.monotonic() - self.prepared_at > ttl
+
+
+class Prefetcher:
+    """Prepare media, metadata and lyric for upcoming songs in background
+
+    The playlist asks the prefetcher to prefetch the upcoming songs when
+    a song starts to play, and it pops the prepared bundle when the next
+    song is set as the current song, so that the song can be played at once.
+    """
+
+    def __init__(
+        self,
+        app: "App",
+        metadata_mgr: "MetadataAssembler",
+        count=1,
+        ttl=PREFETCH_MEDIA_TTL,
+    ):
+        self._app = app
+        self._metadata_mgr = metadata_mgr
+        #: How many upcoming songs are prefetched, 0 means disabled.
+        self.count = count
+        self.ttl = ttl
+
+        self._bundles: Dict[BriefSongModel, PrefetchedBundle] = {}
+
+    def pop(self, song) -> Optional[PrefetchedBundle]:
+        """Pop the prefetched bundle of the song, return None if not found."""
+        bundle = self._bundles.pop(song, None)
+        if bundle is not None and bundle.is_expired(self.ttl):
+            logger.info(f"prefetched media of {song} is expired")
+            return None
+        return bundle
+
+    def clear(self):
+        self._bundles.clear()
+
+    async def a_prefetch(self, songs, policy):
+        """Prefetch songs one by one, in the order they will be played."""
+        # Drop bundles of songs that are not upcoming anymore.
+        for song in list(self._bundles):
+            if song not in songs:
+                self._bundles.pop(song)
+
+        for song in songs:
+            bundle = self._bundles.get(song)
+            if bundle is not None and not bundle.is_expired(self.ttl):
+                if song == songs[0]:
+                    self._preload(song)
+                continue
+            try:
+                media = await run_fn(
+                    self._app.library.song_prepare_media,
+                    song,
+                    policy,
+                    source=song.source,
+                )
+            except MediaNotFound:
+                # Let the playlist find a standby when the song is played.
+                logger.info(f"prefetch media for {song} failed: media not found")
+                continue
+            except Exception:  # noqa
+                logger.exception(f"prefetch media for {song} failed")
+                continue
+            metadata = await self._metadata_mgr.prepare_for_song(song)
+            try:
+                lyric = await run_fn(
+                    self._app.library.song_get_lyric,
+                    song,
+                    source=song.source,
+                    priority=Priority.low,
+                )
+            except Exception:  # noqa
+                logger.exception(f"prefetch lyric for {song} failed")
+            else:
+                song.cache_set(LYRIC_CACHE_KEY, lyric, ttl=self.ttl)
+            self._bundles[song] = PrefetchedBundle(song, media, metadata)
+            logger.info(f"prefetch media for {song} succeed")
+            if song == songs[0]:
+                self._preload(song)
+
+    def _preload(self, song):
+        # Let the player open the next media in advance, for gapless playback.
+        bundle = self._bundles.get(song)
+        if bundle is not None:
+            self._app.player.preload(bundle.media)
@@ -1,34 +1,135 @@
+import logging
+import sqlite3
+import time
+
 from feeluown.library import ModelType
+from feeluown.utils.reader import create_reader
 from feeluown.utils.utils import DedupList
 
+logger = logging.getLogger(__name__)
+
+#: Max count of songs listed by :meth:`RecentlyPlayed.list_songs`.
+RECENTLY_PLAYED_LIMIT = 100
+
 
 class RecentlyPlayed:
     """
     RecentlyPlayed records recently played models, currently including songs
     and videos. Maybe artists and albums will be recorded in the future.
+
+    .. versionchanged:: 5.2
+        Add `history` and `player` parameters. When a play history is given,
+        plays are recorded into it, and songs are read from it. The player is
+        used to know how long a song is played and whether it is skipped.
     """
-    def __init__(self, playlist):
+    def __init__(self, playlist, history=None, player=None):
+        #: :class:`feeluown.player.play_history.PlayHistory` or None.
+        self.history = history
+        self._player = player
         # Store recently played songs. Newest song is appended to left.
         self._songs = DedupList()
+        # (event id, start time) of the song being played.
+        self._playing = None
+        self._finished = False
 
         playlist.song_changed_v2.connect(self._on_song_played)
+        if player is not None:
+            player.media_finished.connect(self._on_media_finished)
 
     def init_from_models(self, models):
-        for model in models:
-            if ModelType(model.meta.model_type) is ModelType.song:
-                self._songs.append(model)
+        songs = [model for model in models
+                 if ModelType(model.meta.model_type) is ModelType.song]
+        if self.history is None:
+            for song in songs:
+                self._songs.append(song)
+            return
+        try:
+            # Songs in the state file are imported into the empty history.
+            if songs and self.history.count_songs() == 0:
+                self.history.import_songs(songs)
+        except sqlite3.Error:
+            logger.exception('import recently played songs failed')
 
     def list_songs(self):
         """List recently played songs (list of BriefSongModel).
         """
-        return list(self._songs.copy())
+        if self.history is None:
+            return list(self._songs.copy())
+        try:
+            return self.history.list_recently_played(RECENTLY_PLAYED_LIMIT)
+        except sqlite3.Error:
+            logger.exception('list recently played songs failed')
+            return []
+
+    def create_songs_reader(self):
+        """Create a reader of all recently played songs.
+
+        .. versionadded:: 5.2
+        """
+        if self.history is None:
+            return create_reader(self.list_songs())
+        try:
+            return self.history.create_recently_played_reader()
+        except sqlite3.Error:
+            logger.exception('read recently played songs failed')
+            return create_reader([])
+
+    def close(self):
+        """Finish the song being played and close the history.
+
+        Quitting the app does not mean the song is skipped.
+
+        .. versionadded:: 5.2
+        """
+        self._finish_playing(interrupted=False)
+        if self.history is not None:
+            self.history.close()
 
-    def _on_song_played(self, song, _):
+    def _on_media_finished(self):
+        self._finished = True
+
+    def _finish_playing(self, interrupted=True):
+        """
+        :param interrupted: whether another song is played before the
+            song is finished, which means the song is skipped.
+        """
+        if self._playing is None:
+            return
+        event_id, started_at = self._playing
+        self._playing = None
+        # The player still plays the previous song when the song is changed,
+        # so the position is the seconds played of the previous song.
+        if self._finished:
+            duration = self._player.duration
+        elif self._player is not None:
+            duration = self._player.position
+        else:
+            duration = None
+        if duration is None:
+            duration = time.monotonic() - started_at
+        try:
+            self.history.finish(event_id, duration,
+                                skipped=interrupted and not self._finished)
+        except sqlite3.Error:
+            logger.exception('save play history failed')
+
+    def _on_song_played(self, song, media):
+        if self.history is not None:
+            # The song is None when the player is stopped.
+            self._finish_playing(interrupted=song is not None)
+            self._finished = False
+            # The song can't be played and the playlist will skip it.
+            if song is not None and media is not None:
+                try:
+                    self._playing = (self.history.record(song), time.monotonic())
+                except sqlite3.Error:
+                    logger.exception('save play history failed')
+            return
         # Remove the song and place the song at the very first if it already exists.
-        if song is None:
+        if song is None or media is None:
             return
         if song in self._songs:
             self._songs.remove(song)
-        if len(self._songs) >= 100:
+        if len(self._songs) >= RECENTLY_PLAYED_LIMIT:
             self._songs.pop()
         self._songs.insert(0, song)
@@ -0,0 +1,135 @@
+"""
+feeluown.player.shuffle
+~~~~~~~~~~~~~~~~~~~~~~~
+
+The song queue of a playlist in random playback mode.
+"""
+
+import random
+from collections.abc import MutableSequence
+
+from feeluown.utils.utils import IndexedDedupList
+
+
+class ShuffledSongs(MutableSequence):
+    """Songs in a random order, the order is generated lazily
+
+    It is a view of `songs` (the songs in the original order), and changes
+    made to it are applied to `songs` as well. The head of the random
+    order is drawn from the pool of undrawn songs with Fisher–Yates
+    shuffle on demand, so creating it is O(1) and getting the song
+    after a drawn song is O(1) amortized, instead of shuffling all songs.
+
+    Drawn songs keep their order when songs are added or removed. A new song
+    is put into the pool, unless it is inserted into the drawn songs.
+
+    .. versionadded:: 5.2
+    """
+
+    def __init__(self, songs: IndexedDedupList):
+        self._songs = songs
+        self._drawn = IndexedDedupList()
+        # Undrawn songs. Removed songs and songs which are drawn out of
+        # order are not removed from the pool, they are skipped when drawing.
+        self._pool = list(songs)
+
+    def _draw(self, count):
+        """Draw songs until at least `count` songs are drawn."""
+        count = min(count, len(self._songs))
+        pool = self._pool
+        while len(self._drawn) < count:
+            i = random.randrange(len(pool))
+            pool[i], pool[-1] = pool[-1], pool[i]
+            song = pool.pop()
+            if song in self._songs and song not in self._drawn:
+                self._drawn.append(song)
+
+    def _draw_song(self, song):
+        """Draw the song as the next song if it is not drawn."""
+        if song not in self._drawn:
+            self._drawn.append(song)
+
+    def __len__(self):
+        return len(self._songs)
+
+    def __iter__(self):
+        self._draw(len(self._songs))
+        return iter(self._drawn)
+
+    def __reversed__(self):
+        self._draw(len(self._songs))
+        return reversed(self._drawn)
+
+    def __contains__(self, song):
+        return song in self._songs
+
+    def __eq__(self, other):
+        if isinstance(other, (list, MutableSequence)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f'{type(self).__name__}({list(self)!r})'
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            self._draw(max(start, stop) + 1 if step < 0 else stop)
+        else:
+            self._draw(index + 1 if index >= 0 else len(self))
+        return self._drawn[index]
+
+    def __setitem__(self, index, song):
+        if song in self._songs:
+            raise ValueError('item already exists in ShuffledSongs')
+        old_song = self[index]
+        self._drawn[index] = song
+        self._songs[self._songs.index(old_song)] = song
+
+    def __delitem__(self, index):
+        self.pop(index)
+
+    def copy(self):
+        return IndexedDedupList(self, dedup=False)
+
+    def count(self, song):
+        return int(song in self._songs)
+
+    def index(self, song, start: int = None, stop: int = None):
+        if song not in self._songs:
+            raise ValueError('not in list')
+        # The song becomes the next drawn song, so that the songs after it
+        # can be drawn without drawing songs before it.
+        self._draw_song(song)
+        return self._drawn.index(song, start, stop)
+
+    def insert(self, index: int, song):
+        if song in self._songs:
+            return
+        if index < 0:
+            index = max(index + len(self), 0)
+        self._songs.append(song)
+        if index <= len(self._drawn):
+            self._drawn.insert(index, song)
+        else:
+            self._pool.append(song)
+
+    def extend(self, songs):
+        songs = [song for song in dict.fromkeys(songs) if song not in self._songs]
+        self._songs.extend(songs)
+        self._pool.extend(songs)
+
+    def pop(self, index: int = -1):
+        song = self[index]
+        self.remove(song)
+        return song
+
+    def remove(self, song):
+        self._songs.remove(song)
+        if song in self._drawn:
+            self._drawn.remove(song)
+
+    def clear(self):
+        self._songs.clear()
+        self._drawn.clear()
+        self._pool.clear()
@@ -1,8 +1,13 @@
+import multiprocessing
 import sys
 import os
 
 
 if __name__ == '__main__':
+    # The worker processes of the local music scanner run this executable,
+    # freeze_support makes them run the worker instead of the app.
+    multiprocessing.freeze_support()
+
     # Chdir first and then load feeluown, so that libmpv can be loaded correctly.
     # On macOS, the dir is changed to FeelUOwnX.app/Contents/Frameworks.
     if hasattr(sys, '_MEIPASS'):
@@ -7,6 +7,8 @@ TODO: too much code to define serializers for an object.
 from feeluown.app import App
 from feeluown.library import AbstractProvider, SimpleSearchResult, reverse
 from feeluown.player import PlaybackMode, State, Metadata
+from feeluown.utils.dispatch import Signal
+from feeluown.utils.scheduler import provider_scheduler
 from . import PlainSerializer, PythonSerializer, \
     SerializerMeta, SimpleSerializerMixin
 from .python import ListSerializer as PythonListSerializer
@@ -68,6 +70,23 @@ class AppSerializerMixin:
             ('volume', player.volume),
             ('state', player.state.name),
         ]
+        # The main thread falls behind if the queue keeps growing.
+        queue_stats = Signal.queue_stats()
+        items.extend([
+            ('signal-queue-depth', queue_stats['depth']),
+            ('signal-dropped', queue_stats['dropped']),
+        ])
+        # Queue depth and wait time of each provider's priority lanes.
+        for source, lanes in sorted(provider_scheduler.stats().items()):
+            for lane, stats in lanes.items():
+                if not stats['submitted']:
+                    continue
+                items.append((
+                    f'scheduler-{source}-{lane}',
+                    f"depth={stats['depth']} rejected={stats['rejected']} "
+                    f"wait-avg={stats['wait_avg'] * 1000:.0f}ms "
+                    f"wait-max={stats['wait_max'] * 1000:.0f}ms"
+                ))
         if player.state in (State.playing, State.paused) and \
                 player.current_song is not None:
             items.extend([
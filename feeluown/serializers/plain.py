@@ -1,3 +1,4 @@
+from collections.abc import MutableSequence
 from textwrap import indent
 # FIXME: maybe we should move `reverse` into serializers package
 from .base import Serializer, SerializerMeta, SerializerError
@@ -157,7 +158,7 @@ class ListSerializer(PlainSerializer, metaclass=SerializerMeta):
     """
 
     class Meta:
-        types = (list,)
+        types = (list, MutableSequence)
 
     def serialize(self, list_):
         from .objs import SearchPlainSerializer
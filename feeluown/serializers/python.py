@@ -1,3 +1,5 @@
+from collections.abc import MutableSequence
+
 from feeluown.library import BaseModel
 
 from .typename import attach_typename, get_type_by_name, model_cls_list
@@ -72,7 +74,7 @@ class ModelSerializer(PythonSerializer, metaclass=SerializerMeta):
 
 class ListSerializer(PythonSerializer, metaclass=SerializerMeta):
     class Meta:
-        types = (list, )
+        types = (list, MutableSequence)
 
     def serialize(self, list_):
         if not list_:
@@ -164,7 +164,12 @@ def unparse(request: Request):
     if request.has_heredoc:
         cmdline.append(f'<<{request.heredoc_word}')
     else:
-        cmdline.extend([shlex.quote(each) for each in request.cmd_args])
+        for each in request.cmd_args:
+            # The value of an argument with nargs='+' is a list.
+            if isinstance(each, (list, tuple)):
+                cmdline.extend([shlex.quote(e) for e in each])
+            else:
+                cmdline.append(shlex.quote(each))
 
     # Unparse cmd options.
     for key, value in itertools.chain(
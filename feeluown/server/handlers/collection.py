@@ -0,0 +1,38 @@
+from feeluown.collection import COLL_LIBRARY_IDENTIFIER, COLL_POOL_IDENTIFIER
+from feeluown.library import CollectionType, ResolveFailed, ResolverNotFound
+from .cmd import Cmd
+from .excs import HandlerException
+from .base import AbstractHandler
+
+
+class CollectionHandler(AbstractHandler):
+    """
+    Add models to a local collection, or remove models from it::
+
+        coll add library fuo://local/songs/1 fuo://local/songs/2
+        coll remove 123456 fuo://local/albums/1
+
+    The collection is identified by its identifier, or `library`/`pool`
+    for the system collections.
+
+    .. versionadded:: 5.2
+    """
+    cmds = ('coll', )
+
+    def handle(self, cmd: Cmd):
+        action, identifier, uris = cmd.args
+        coll_mgr = self._app.coll_mgr
+        identifier = {
+            COLL_LIBRARY_IDENTIFIER: CollectionType.sys_library,
+            COLL_POOL_IDENTIFIER: CollectionType.sys_pool,
+        }.get(identifier, identifier)
+        try:
+            coll_mgr.get(identifier)
+        except (KeyError, ValueError):
+            raise HandlerException(f'{identifier}: collection not found') from None
+        try:
+            if action == 'add':
+                return coll_mgr.add_many(identifier, uris)
+            return coll_mgr.remove_many(identifier, uris)
+        except (ResolverNotFound, ResolveFailed) as e:
+            raise HandlerException(f'invalid uri: {e}') from None
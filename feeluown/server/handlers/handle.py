@@ -69,6 +69,8 @@ from .show import ShowHandler  # noqa
 from .exec_ import ExecHandler  # noqa
 from .sub import SubHandler  # noqa
 from .set_ import SetHandler  # noqa
+from .collection import CollectionHandler  # noqa
+from .profile import ProfileHandler  # noqa
 try:
     from .jsonrpc_ import JsonRPCHandler  # noqa
 except ImportError as e:
@@ -0,0 +1,53 @@
+from feeluown.utils import profiler
+from .cmd import Cmd
+from .excs import HandlerException
+from .base import AbstractHandler
+
+
+class ProfileHandler(AbstractHandler):
+    """
+    Profile signal receivers, see :mod:`feeluown.utils.profiler`::
+
+        profile start --threshold=20
+        profile show
+        profile dump --output=/tmp/run1.json
+        profile stop
+
+    `show` lists receivers, slowest first. `dump` outputs the stats as JSON,
+    or writes them to the file given by `--output`, so that runs can be diffed.
+
+    .. versionadded:: 5.2
+    """
+    cmds = ('profile', )
+
+    def handle(self, cmd: Cmd):
+        action, = cmd.args
+        options = cmd.options
+        if action == 'start':
+            threshold = options.get('threshold')
+            if threshold is not None:
+                threshold = threshold / 1000
+            profiler.start(threshold, app=self._app)
+            return ''
+        if action == 'stop':
+            profiler.stop()
+            return ''
+
+        slot_profiler = profiler.get_profiler()
+        if slot_profiler is None:
+            raise HandlerException('profiler is never started')
+        if action == 'reset':
+            slot_profiler.reset()
+            return ''
+        if action == 'show':
+            return slot_profiler.format_table()
+        # Dump.
+        output = options.get('output')
+        if output is None:
+            return slot_profiler.dumps()
+        try:
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(slot_profiler.dumps())
+        except OSError as e:
+            raise HandlerException(f'dump failed: {e}') from None
+        return ''
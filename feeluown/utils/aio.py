@@ -12,6 +12,8 @@ for some frequently used API.
 import asyncio
 import sys
 
+from feeluown.utils.scheduler import Priority, provider_scheduler
+
 
 if sys.version_info >= (3, 7):
     # create_task is temporarily not working properly with quamash
@@ -67,9 +69,21 @@ def run_afn_ref(afn, *args):
     return task
 
 
-def run_fn(fn, *args):
+def run_fn(fn, *args, source=None, priority=Priority.normal):
     """Alias for run_in_executor with default executor
 
+    When `source` (a provider identifier) is specified, the function runs
+    in the bounded executor of the provider instead, and `priority` decides
+    which lane it is queued in. So a hanging provider can not take all the
+    worker threads of the default executor.
+
     .. versionadded:: 3.7.8
+
+    .. versionchanged:: 5.2
+        Add `source` and `priority` parameters.
     """
-    return run_in_executor(None, fn, *args)
+    if source is None:
+        return run_in_executor(None, fn, *args)
+    loop = asyncio.get_running_loop()
+    future = provider_scheduler.submit(source, fn, *args, priority=priority)
+    return asyncio.wrap_future(future, loop=loop)
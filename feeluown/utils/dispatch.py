@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
 import janus
 import logging
+import threading
+import time
 import weakref
+from contextlib import contextmanager
 
 
 logger = logging.getLogger(__name__)
+_dropped_lock = threading.Lock()
 
 
 def gen_id(target):
@@ -14,6 +19,102 @@ def gen_id(target):
     return id(target)
 
 
+class QueuedReceiver:
+    """Delivery state of a receiver which is called by the aio worker
+
+    By default, each emit puts one item into the queue. If `coalesce` is
+    true, only the latest args are delivered: when the receiver has an
+    undelivered item in the queue, a new emit replaces its args, and the
+    replaced args are counted as dropped. If `max_rate` is set, the receiver
+    is called at most `max_rate` times per second, which implies coalescing.
+
+    .. versionadded:: 5.2
+    """
+
+    def __init__(self, coalesce=False, max_rate=None, signal=None):
+        #: The signal which the receiver connects to, it is used by the profiler.
+        self.signal = signal
+        self.coalesce = coalesce or bool(max_rate)
+        self.interval = 1 / max_rate if max_rate else 0
+        #: Count of items in the queue which are not delivered yet.
+        self.depth = 0
+        #: Count of args replaced by newer args before they are delivered.
+        self.dropped = 0
+        self.delivered = 0
+        self._lock = threading.Lock()
+        self._pending = None  # (func, args)
+        self._delivered_at = 0.0
+
+    def put(self, func, args):
+        if self.coalesce:
+            with self._lock:
+                if self._pending is not None:
+                    self._pending = (func, args)
+                    self.dropped += 1
+                    with _dropped_lock:
+                        Signal.dropped_count += 1
+                    return
+                self._pending = (func, args)
+                self.depth += 1
+            try:
+                Signal.aioqueue.sync_q.put_nowait((self._deliver_latest, ()))
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                    self.depth -= 1
+                raise
+        else:
+            with self._lock:
+                self.depth += 1
+            try:
+                Signal.aioqueue.sync_q.put_nowait((self._deliver, (func, args)))
+            except Exception:
+                with self._lock:
+                    self.depth -= 1
+                raise
+
+    def _deliver(self, func, args):
+        with self._lock:
+            self.depth -= 1
+            self.delivered += 1
+        self._call(func, args)
+
+    def _deliver_latest(self):
+        if self.interval:
+            wait = self._delivered_at + self.interval - time.monotonic()
+            if wait > 0:
+                # Newer args replace the pending ones while waiting.
+                asyncio.get_running_loop().call_later(wait, self._deliver_later)
+                return
+        with self._lock:
+            func, args = self._pending
+            self._pending = None
+            self.depth -= 1
+            self.delivered += 1
+        self._delivered_at = time.monotonic()
+        self._call(func, args)
+
+    def _call(self, func, args):
+        profiler = Signal.profiler
+        if profiler is None:
+            func(*args)
+        elif func is _call_batch:
+            profiler.call(self.signal, func, args,
+                          label=profiler.label(args[0]), calls=len(args[1]))
+        else:
+            profiler.call(self.signal, func, args)
+
+    def _deliver_later(self):
+        try:
+            self._deliver_latest()
+        except:  # noqa
+            logger.exception('deliver the latest args failed')
+
+    def stats(self) -> dict:
+        return {'depth': self.depth, 'dropped': self.dropped,
+                'delivered': self.delivered}
+
+
 class Signal:
     """provider signal/slot design pattern
 
@@ -24,11 +125,28 @@ class Signal:
     aioqueue = None
     has_aio_support = False
     worker_task = None
+    #: Count of args dropped by all coalescing receivers.
+    dropped_count = 0
+    #: :class:`feeluown.utils.profiler.SlotProfiler` which records the time
+    #: receivers take, profiling is disabled if it is None.
+    profiler = None
 
     def __init__(self, name='', *sig):
+        #: The name is used by the profiler. It is the fuoexec symbol of the signal
+        #: if it is empty, see :func:`feeluown.utils.profiler.name_signals`.
+        self.name = name
         self.sig = sig
         self.aioqueued_receiver_ids = set()
         self.receivers = set()
+        # {receiver id: QueuedReceiver} of aioqueued receivers.
+        self._queued_receivers = {}
+        # A tuple of (receiver, is weakref, QueuedReceiver or None), it is
+        # compiled from receivers when the signal is emitted, and it is reset
+        # when receivers are changed.
+        self._dispatch = None
+        # Args of emits which are deferred by :meth:`batch`.
+        self._batched = None
+        self._coalesce = False
 
     @classmethod
     def setup_aio_support(cls, loop=None):
@@ -64,29 +182,113 @@ class Signal:
                 logger.exception(f'run {func} with {args} failed')
             cls.aioqueue.async_q.task_done()
 
+    def _compile(self):
+        dispatch = []
+        for receiver in self.receivers:
+            weak = isinstance(receiver, weakref.ReferenceType)
+            func = receiver() if weak else receiver
+            if func is None:
+                logger.debug('receiver:{} is dead'.format(receiver))
+                continue
+            queued = self._queued_receivers.get(gen_id(func))
+            dispatch.append((receiver, weak, queued))
+        self._dispatch = tuple(dispatch)
+        return self._dispatch
+
     def emit(self, *args):
-        # allow remove receiver during emitting
-        for receiver in self.receivers.copy():
+        if self._batched is not None:
+            self._defer(args)
+            return
+        # The dispatch tuple is not changed by connect and disconnect, so
+        # receivers can be removed during emitting.
+        dispatch = self._dispatch
+        if dispatch is None:
+            dispatch = self._compile()
+        profiler = Signal.profiler
+        for receiver, weak, queued in dispatch:
+            func = receiver() if weak else receiver
+            if func is None:
+                logger.debug('receiver:{} is dead'.format(receiver))
+                continue
             try:
-                if self._is_alive(receiver):
-                    if isinstance(receiver, weakref.ReferenceType):
-                        func = receiver()
+                if queued is not None:
+                    if Signal.has_aio_support:
+                        queued.put(func, args)
                     else:
-                        func = receiver
-                    uid = gen_id(func)
-                    aioqueue = uid in self.aioqueued_receiver_ids
-                    if aioqueue:
-                        if Signal.has_aio_support:
-                            Signal.aioqueue.sync_q.put_nowait((func, args))
-                        else:
-                            raise RuntimeError('Signal has no asyncio support.')
-                    else:
-                        func(*args)
+                        raise RuntimeError('Signal has no asyncio support.')
+                elif profiler is None:
+                    func(*args)
                 else:
-                    logger.debug('receiver:{} is dead'.format(receiver))
+                    profiler.call(self, func, args)
             except Exception:
                 logger.exception('receiver %s raise error' % receiver)
 
+    def emit_batch(self, args_list):
+        """Emit the signal once for each args in `args_list`
+
+        Receivers are called in the order of args, as if the signal is emitted
+        for each args. An aioqueued receiver is queued once for the whole batch,
+        instead of once for each args, and a coalescing receiver only gets
+        the last args.
+
+        .. versionadded:: 5.2
+        """
+        args_list = [tuple(args) for args in args_list]
+        if not args_list:
+            return
+        dispatch = self._dispatch
+        if dispatch is None:
+            dispatch = self._compile()
+        profiler = Signal.profiler
+        for receiver, weak, queued in dispatch:
+            func = receiver() if weak else receiver
+            if func is None:
+                logger.debug('receiver:{} is dead'.format(receiver))
+                continue
+            if queued is not None:
+                try:
+                    if not Signal.has_aio_support:
+                        raise RuntimeError('Signal has no asyncio support.')
+                    if queued.coalesce:
+                        queued.put(func, args_list[-1])
+                    else:
+                        queued.put(_call_batch, (func, args_list))
+                except Exception:
+                    logger.exception('receiver %s raise error' % receiver)
+            elif profiler is None:
+                _call_batch(func, args_list)
+            else:
+                profiler.call(self, _call_batch, (func, args_list),
+                              label=profiler.label(func), calls=len(args_list))
+
+    @contextmanager
+    def batch(self, coalesce=False):
+        """Defer emits in the block, and emit them in a batch at the end
+
+        If `coalesce` is true, only the last emit is kept, which fits
+        signals whose receivers only care about the latest state, such as
+        position changed signals. Emits from other threads are deferred
+        as well during the block. Nested blocks are merged into the outer one.
+
+        .. versionadded:: 5.2
+        """
+        if self._batched is not None:
+            yield
+            return
+        self._batched = []
+        self._coalesce = coalesce
+        try:
+            yield
+        finally:
+            args_list, self._batched = self._batched, None
+            self.emit_batch(args_list)
+
+    def _defer(self, args):
+        if self._coalesce:
+            self._batched[:] = [args]
+        else:
+            self._batched.append(args)
+
     def _ref(self, receiver):
         ref = weakref.ref
         if hasattr(receiver, '__self__') and hasattr(receiver, '__func__'):
@@ -95,7 +297,8 @@ class Signal:
             weakref.finalize(receiver_object, self._clear_dead_receivers)
         return ref(receiver)
 
-    def connect(self, receiver, weak=True, aioqueue=False):
+    def connect(self, receiver, weak=True, aioqueue=False,
+                coalesce=False, max_rate=None):
         """Add a receiver to the sender for signal.
 
         :param receiver: A function or an instance method that receives the signal.
@@ -104,13 +307,23 @@ class Signal:
             One thing to remember, the receiver is not invoked immediately
             if this is true. Those receivers which must be invoked in the
             main thread can set this to true.
+        :param coalesce: Only for aioqueued receivers, deliver only the latest
+            args when the receiver falls behind, see :class:`QueuedReceiver`.
+        :param max_rate: Only for aioqueued receivers, max times per second
+            that the receiver is called.
+
+        .. versionchanged:: 5.2
+            Add `coalesce` and `max_rate` parameters.
         """
         if weak:
             self.receivers.add(self._ref(receiver))
         else:
             self.receivers.add(receiver)
         if aioqueue:
-            self.aioqueued_receiver_ids.add(gen_id(receiver))
+            uid = gen_id(receiver)
+            self.aioqueued_receiver_ids.add(uid)
+            self._queued_receivers[uid] = QueuedReceiver(coalesce, max_rate, self)
+        self._dispatch = None
 
     def disconnect(self, receiver):
         if receiver in self.receivers:
@@ -122,13 +335,51 @@ class Signal:
         uid = gen_id(receiver)
         if uid in self.aioqueued_receiver_ids:
             self.aioqueued_receiver_ids.remove(uid)
+            self._queued_receivers.pop(uid, None)
+        self._dispatch = None
         return False
 
+    def receiver_stats(self) -> list:
+        """Return (receiver, stats) of each alive aioqueued receiver.
+
+        .. versionadded:: 5.2
+        """
+        dispatch = self._dispatch
+        if dispatch is None:
+            dispatch = self._compile()
+        result = []
+        for receiver, weak, queued in dispatch:
+            func = receiver() if weak else receiver
+            if func is not None and queued is not None:
+                result.append((func, queued.stats()))
+        return result
+
+    @classmethod
+    def queue_stats(cls) -> dict:
+        """Return the depth of the aio queue and the count of dropped args.
+
+        The depth keeps growing if the main thread can not keep up with
+        the aioqueued receivers.
+
+        .. versionadded:: 5.2
+        """
+        depth = cls.aioqueue.sync_q.qsize() if cls.aioqueue is not None else 0
+        return {'depth': depth, 'dropped': cls.dropped_count}
+
     def _is_alive(self, r):
         return not (isinstance(r, weakref.ReferenceType) and r() is None)
 
     def _clear_dead_receivers(self):
         self.receivers = set([r for r in self.receivers if self._is_alive(r)])
+        self._dispatch = None
+
+
+def _call_batch(func, args_list):
+    for args in args_list:
+        try:
+            func(*args)
+        except Exception:
+            logger.exception(f'run {func} with {args} failed')
 
 
 def receiver(signal):
@@ -0,0 +1,227 @@
+"""
+feeluown.utils.profiler
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Profile signal receivers (slots), to find out which one makes the UI stutter.
+
+The profiler is opt-in. When it is started, :class:`Signal` measures the wall
+time of each receiver call, including the calls of aioqueued receivers which
+run on the main thread later. Calls, cumulative and maximum time are recorded
+per signal and per receiver, and a warning is logged for each call slower
+than the threshold::
+
+    profiler = start(threshold=0.05)
+    ...
+    stop()
+    print(profiler.dumps())
+
+Hooks added by fuoexec `add_hook` are attributed by their symbols.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from feeluown.utils.dispatch import Signal, gen_id
+
+logger = logging.getLogger(__name__)
+
+#: Default threshold of slow slots, in seconds.
+DEFAULT_THRESHOLD = 0.05
+
+# {receiver id: fuoexec symbol} of hooks added by fuoexec.
+_symbols: Dict[object, str] = {}
+_profiler: Optional['SlotProfiler'] = None
+
+
+def register_symbol(func, symbol: str):
+    """Attribute the receiver by the fuoexec symbol."""
+    _symbols[gen_id(func)] = symbol
+
+
+def unregister_symbol(func):
+    _symbols.pop(gen_id(func), None)
+
+
+def get_label(func) -> str:
+    """Return a readable name of the receiver."""
+    symbol = _symbols.get(gen_id(func))
+    if symbol is not None:
+        return f'fuoexec:{symbol}'
+    func_ = getattr(func, 'func', None)  # functools.partial
+    if func_ is not None:
+        return get_label(func_)
+    qualname = getattr(func, '__qualname__', None)
+    if qualname is None:
+        return repr(func)
+    return f'{getattr(func, "__module__", None)}.{qualname}'
+
+
+def get_signal_label(signal) -> str:
+    if signal is None:
+        return 'unknown'
+    return signal.name or f'Signal@{id(signal):x}'
+
+
+def name_signals(obj, prefix: str, depth: int = 2):
+    """Name unnamed signals which are attributes of `obj` by their symbols
+
+    The symbol is the same as the one used by fuoexec, such as
+    `app.player.position_changed`. Attributes of attributes are named as well,
+    until `depth` levels.
+    """
+    for key, value in list(getattr(obj, '__dict__', {}).items()):
+        if key.startswith('_'):
+            continue
+        symbol = f'{prefix}.{key}'
+        if isinstance(value, Signal):
+            if not value.name:
+                value.name = symbol
+        elif depth > 1 and hasattr(value, '__dict__') and \
+                not isinstance(value, type):
+            name_signals(value, symbol, depth - 1)
+
+
+class _Stats:
+    __slots__ = ('calls', 'total', 'max', 'slow')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+    def add(self, elapsed, calls, slow):
+        self.calls += calls
+        self.total += elapsed
+        self.slow += slow
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def to_dict(self) -> dict:
+        return {'calls': self.calls, 'total': self.total,
+                'max': self.max, 'slow': self.slow}
+
+
+class SlotProfiler:
+    """Record calls, cumulative and maximum wall time of signal receivers
+
+    All time are in seconds. It is thread safe.
+
+    .. versionadded:: 5.2
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        #: A call slower than the threshold (in seconds) is warned.
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # {signal label: (signal stats, {receiver label: receiver stats})}
+        self._stats: Dict[str, tuple] = {}
+
+    def call(self, signal, func, args, label=None, calls=1, nested=False):
+        """Call `func` with `args` and record the time it takes.
+
+        :param label: The name of the receiver, :func:`get_label` is used
+            by default.
+        :param calls: How many calls are made, for example, a batched call.
+        :param nested: If it is true, the time is not added to the signal,
+            because it is included in another receiver.
+        """
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(signal, label or self.label(func), elapsed, calls, nested)
+
+    def label(self, func) -> str:
+        return get_label(func)
+
+    def record(self, signal, label, elapsed, calls=1, nested=False):
+        signal_label = get_signal_label(signal)
+        slow = elapsed > self.threshold
+        if slow:
+            logger.warning('slow slot: %s of %s took %.1fms',
+                           label, signal_label, elapsed * 1000)
+        with self._lock:
+            entry = self._stats.get(signal_label)
+            if entry is None:
+                entry = self._stats[signal_label] = (_Stats(), {})
+            signal_stats, receivers = entry
+            if not nested:
+                signal_stats.add(elapsed, calls, slow)
+            stats = receivers.get(label)
+            if stats is None:
+                stats = receivers[label] = _Stats()
+            stats.add(elapsed, calls, slow)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def dump(self) -> dict:
+        """Return the stats, signals and receivers are sorted by names."""
+        with self._lock:
+            signals = {
+                signal_label: dict(
+                    signal_stats.to_dict(),
+                    receivers={label: stats.to_dict()
+                               for label, stats in sorted(receivers.items())},
+                )
+                for signal_label, (signal_stats, receivers)
+                in sorted(self._stats.items())
+            }
+        return {'threshold': self.threshold, 'signals': signals}
+
+    def dumps(self) -> str:
+        """Dump the stats as JSON, which is stable so that runs can be diffed."""
+        return json.dumps(self.dump(), indent=2, sort_keys=True)
+
+    def format_table(self, limit: Optional[int] = None) -> str:
+        """Format receivers as a table, slowest (by cumulative time) first."""
+        rows = []
+        for signal_label, entry in self.dump()['signals'].items():
+            for label, stats in entry['receivers'].items():
+                rows.append((signal_label, label, stats))
+        rows.sort(key=lambda row: row[2]['total'], reverse=True)
+        lines = [f'{"calls":>8} {"total(ms)":>10} {"max(ms)":>9} {"slow":>5}'
+                 '  receiver  <-  signal']
+        for signal_label, label, stats in rows[:limit]:
+            lines.append(f'{stats["calls"]:>8} {stats["total"] * 1000:>10.1f} '
+                         f'{stats["max"] * 1000:>9.1f} {stats["slow"]:>5}'
+                         f'  {label}  <-  {signal_label}')
+        return '\n'.join(lines)
+
+
+def start(threshold: Optional[float] = None, app=None) -> SlotProfiler:
+    """Start profiling, stats recorded before are kept.
+
+    If `threshold` is given, the threshold of the profiler is updated.
+    If `app` is given, signals of the app are named by their symbols.
+    """
+    global _profiler  # pylint: disable=global-statement
+    if app is not None:
+        name_signals(app, 'app')
+    if _profiler is None:
+        _profiler = SlotProfiler()
+    if threshold is not None:
+        _profiler.threshold = threshold
+    Signal.profiler = _profiler
+    return _profiler
+
+
+def stop() -> Optional[SlotProfiler]:
+    """Stop profiling, the stats can still be dumped."""
+    Signal.profiler = None
+    return _profiler
+
+
+def is_running() -> bool:
+    return Signal.profiler is not None
+
+
+def get_profiler() -> Optional[SlotProfiler]:
+    """Return the profiler, it is None if profiling has never been started."""
+    return _profiler
@@ -0,0 +1,241 @@
+"""
+feeluown.utils.scheduler
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Run blocking provider calls in per-provider thread pools.
+
+Each provider has its own bounded pool and queue, so a hanging provider
+can only exhaust its own worker threads. Work items in a queue are served
+by priority, so that playback critical work (such as preparing media for
+the current song) goes ahead of background work (such as fetching covers).
+"""
+
+import itertools
+import logging
+import queue
+import sys
+import time
+from concurrent.futures import Executor, Future
+from enum import IntEnum
+from threading import Lock, Semaphore, Thread
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+#: Maximum number of worker threads for each provider.
+PROVIDER_MAX_WORKERS = 4
+#: Maximum number of queued (not running) work items for each provider.
+PROVIDER_MAX_QUEUE_SIZE = 64
+
+_SENTINEL_PRIORITY = sys.maxsize
+
+
+class Priority(IntEnum):
+    """Priority lane of a work item, smaller value is served first."""
+
+    high = 0  #: Playback critical work, e.g. prepare media for current song.
+    normal = 10
+    low = 20  #: Background work, e.g. fetch cover or MV.
+
+
+class ExecutorBusy(RuntimeError):
+    """The queue of the executor is full."""
+
+
+class LaneStats:
+    def __init__(self):
+        self.submitted = 0
+        self.rejected = 0
+        self.depth = 0  # Items waiting in the queue.
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.started = 0
+
+    def as_dict(self):
+        return {
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "depth": self.depth,
+            "wait_avg": self.wait_total / self.started if self.started else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+
+class _WorkItem:
+    __slots__ = ("future", "fn", "args", "kwargs", "submitted_at")
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted_at = time.monotonic()
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except BaseException as e:  # noqa
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+
+class PriorityThreadPoolExecutor(Executor):
+    """A thread pool whose queue is bounded and ordered by priority
+
+    Worker threads are daemon threads, so a hanging call does not block
+    the process from exiting.
+
+    >>> executor = PriorityThreadPoolExecutor('demo', max_workers=1)
+    >>> executor.submit(sum, [1, 2], priority=Priority.high).result()
+    3
+    >>> executor.shutdown()
+    """
+
+    def __init__(
+        self,
+        name,
+        max_workers=PROVIDER_MAX_WORKERS,
+        max_queue_size=PROVIDER_MAX_QUEUE_SIZE,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = Lock()
+        self._idle_semaphore = Semaphore(0)
+        self._threads = []
+        self._shutdown = False
+        self._stats = {priority: LaneStats() for priority in Priority}
+
+    def submit(self, fn, /, *args, priority=Priority.normal, **kwargs):
+        """Submit a work item
+
+        When the queue is full, the returned future fails with
+        :class:`ExecutorBusy`, unless the item is of high priority.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            stats = self._stats[priority]
+            stats.submitted += 1
+            if (
+                priority is not Priority.high
+                and self._queue.qsize() >= self.max_queue_size
+            ):
+                stats.rejected += 1
+                future.set_exception(ExecutorBusy(f"executor:{self.name} is busy"))
+                return future
+            stats.depth += 1
+            item = _WorkItem(future, fn, args, kwargs)
+            self._queue.put((priority, next(self._seq), item))
+            self._adjust_thread_count()
+        return future
+
+    def _adjust_thread_count(self):
+        # An idle worker will pick up the item.
+        if self._idle_semaphore.acquire(timeout=0):
+            return
+        if len(self._threads) < self.max_workers:
+            thread = Thread(
+                target=self._worker,
+                name=f"{self.name}_{len(self._threads)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            priority, _, item = self._queue.get()
+            if item is None:
+                return
+            wait = time.monotonic() - item.submitted_at
+            with self._lock:
+                stats = self._stats[priority]
+                stats.depth -= 1
+                stats.started += 1
+                stats.wait_total += wait
+                stats.wait_max = max(stats.wait_max, wait)
+            item.run()
+            del item
+            self._idle_semaphore.release()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        _, _, item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item.future.cancel()
+            for _ in self._threads:
+                self._queue.put((_SENTINEL_PRIORITY, next(self._seq), None))
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self) -> Dict[str, dict]:
+        """Return stats of each priority lane."""
+        with self._lock:
+            return {
+                priority.name: stats.as_dict()
+                for priority, stats in self._stats.items()
+            }
+
+
+class ProviderScheduler:
+    """Dispatch blocking calls to per-provider executors."""
+
+    def __init__(
+        self,
+        max_workers=PROVIDER_MAX_WORKERS,
+        max_queue_size=PROVIDER_MAX_QUEUE_SIZE,
+    ):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executors: Dict[str, PriorityThreadPoolExecutor] = {}
+        self._lock = Lock()
+
+    def get_executor(self, source: str) -> PriorityThreadPoolExecutor:
+        with self._lock:
+            executor = self._executors.get(source)
+            if executor is None:
+                executor = PriorityThreadPoolExecutor(
+                    f"provider-{source}",
+                    max_workers=self.max_workers,
+                    max_queue_size=self.max_queue_size,
+                )
+                self._executors[source] = executor
+            return executor
+
+    def submit(self, source, fn, *args, priority=Priority.normal) -> Future:
+        return self.get_executor(source).submit(fn, *args, priority=priority)
+
+    def stats(self) -> Dict[str, Dict[str, dict]]:
+        """Return stats of each provider, such as queue depth and wait time.
+
+        The result looks like ``{'netease': {'high': {...}, 'normal': {...}}}``.
+        """
+        with self._lock:
+            executors = list(self._executors.items())
+        return {source: executor.stats() for source, executor in executors}
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+#: The scheduler used by :func:`feeluown.utils.aio.run_fn`.
+provider_scheduler = ProviderScheduler()
@@ -6,6 +6,7 @@ import socket
 import time
 import warnings
 from collections import OrderedDict
+from collections.abc import MutableSequence
 from copy import copy, deepcopy
 from functools import wraps
 from itertools import filterfalse
@@ -230,6 +231,308 @@ class DedupList(list):
         super().clear()
 
 
+class _Block:
+    __slots__ = ('items', 'ids', 'pos')
+
+    def __init__(self, items):
+        self.items = items
+        # Ids of the items, to find an item by identity, since comparing
+        # models with __eq__ is much slower than comparing ints.
+        self.ids = [id(item) for item in items]
+        self.pos = 0
+
+
+class IndexedDedupList(MutableSequence):
+    """DedupList which supports fast insert, remove and index
+
+    Items are stored in blocks and a binary indexed tree over the block
+    lengths maps an index to a block and the offset in it, so `insert`,
+    `pop`, `remove` and `index` cost O(log n) plus a bounded block operation,
+    while they cost O(n) in :class:`DedupList`.
+
+    It has same dedup semantics as DedupList: adding an existing item is
+    a no-op, and setting an existing item raises ValueError.
+
+    >>> dlist = IndexedDedupList([3, 2, 3, 1])
+    >>> dlist
+    IndexedDedupList([3, 2, 1])
+    >>> dlist.insert(0, 4)
+    >>> dlist.index(1)
+    3
+
+    .. versionadded:: 5.2
+    """
+    #: A block is split when it has more than ``2 * LOAD`` items.
+    LOAD = 256
+
+    def __init__(self, seq=(), dedup=True):
+        self._blocks = []
+        self._tree = [0]
+        self._where = {}  # item -> (block, id of the stored item)
+        self._len = 0
+        self._build(dict.fromkeys(seq) if dedup else seq)
+
+    def _build(self, seq):
+        load = self.LOAD
+        items = list(seq)
+        self._blocks = [_Block(items[i:i + load]) for i in range(0, len(items), load)]
+        self._where = {}
+        for block in self._blocks:
+            for item, ident in zip(block.items, block.ids):
+                self._where[item] = (block, ident)
+        self._len = len(items)
+        self._rebuild()
+
+    def _rebuild(self):
+        """Rebuild the tree after blocks are added or removed."""
+        blocks = self._blocks
+        tree = [0] * (len(blocks) + 1)
+        for i, block in enumerate(blocks, 1):
+            block.pos = i - 1
+            tree[i] += len(block.items)
+            parent = i + (i & -i)
+            if parent <= len(blocks):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, pos, delta):
+        tree = self._tree
+        i = pos + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, pos):
+        """Return the count of items in blocks before the pos-th block."""
+        tree = self._tree
+        total = 0
+        while pos:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def _locate(self, index):
+        """Return the block containing the index-th item and the offset."""
+        tree = self._tree
+        pos = 0
+        bit = 1 << (len(tree) - 1).bit_length()
+        while bit:
+            nxt = pos + bit
+            if nxt < len(tree) and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            bit >>= 1
+        return self._blocks[pos], index
+
+    def _get_index(self, index):
+        """project idx into range(len)"""
+        if index < 0:
+            index = max(index + self._len, 0)
+        return min(index, self._len)
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('list index out of range')
+        return index
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block.items
+
+    def __reversed__(self):
+        for block in reversed(self._blocks):
+            yield from reversed(block.items)
+
+    def __contains__(self, item):
+        return item in self._where
+
+    def __eq__(self, other):
+        if isinstance(other, (list, IndexedDedupList)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f'{type(self).__name__}({list(self)!r})'
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step == 1:
+                return IndexedDedupList(self._slice(start, stop), dedup=False)
+            return IndexedDedupList(list(self)[index], dedup=False)
+        block, offset = self._locate(self._check_index(index))
+        return block.items[offset]
+
+    def _slice(self, start, stop):
+        result = []
+        if start >= stop:
+            return result
+        block, offset = self._locate(start)
+        for block in self._blocks[block.pos:]:
+            result.extend(block.items[offset:offset + stop - start - len(result)])
+            offset = 0
+            if len(result) >= stop - start:
+                break
+        return result
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            raise TypeError('IndexedDedupList does not support slice assignment')
+        if value in self._where:
+            raise ValueError('item already exists in IndexedDedupList')
+        block, offset = self._locate(self._check_index(index))
+        del self._where[block.items[offset]]
+        block.items[offset] = value
+        block.ids[offset] = id(value)
+        self._where[value] = (block, id(value))
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            raise TypeError('IndexedDedupList does not support slice deletion')
+        self.pop(index)
+
+    def __add__(self, other):
+        if isinstance(other, (list, IndexedDedupList)):
+            result = copy(self)
+            result.extend(other)
+            return result
+        raise TypeError('can only concatenate list to IndexedDedupList')
+
+    def __radd__(self, other):
+        if isinstance(other, list):
+            result = IndexedDedupList(other)
+            result.extend(self)
+            return result
+        raise TypeError('invalid concat')
+
+    def __copy__(self):
+        return IndexedDedupList(self, dedup=False)
+
+    def __deepcopy__(self, memo):
+        result = IndexedDedupList([deepcopy(item, memo) for item in self], dedup=False)
+        memo[id(self)] = result
+        return result
+
+    def copy(self):
+        return copy(self)
+
+    def count(self, item):
+        return int(item in self._where)
+
+    def index(self, item, start: int = None, stop: int = None):
+        if item not in self._where:
+            raise ValueError('not in list')
+        block, ident = self._where[item]
+        idx = self._prefix(block.pos) + block.ids.index(ident)
+        if start is not None or stop is not None:
+            if idx not in range(self._len)[start:stop]:
+                raise ValueError('not in list')
+        return idx
+
+    def insert(self, index: int, item):
+        if item in self._where:
+            return
+        index = self._get_index(index)
+        if not self._blocks:
+            self._blocks.append(_Block([]))
+            self._rebuild()
+        if index == self._len:
+            block = self._blocks[-1]
+            offset = len(block.items)
+        else:
+            block, offset = self._locate(index)
+        block.items.insert(offset, item)
+        block.ids.insert(offset, id(item))
+        self._where[item] = (block, id(item))
+        self._len += 1
+        self._update(block.pos, 1)
+        if len(block.items) > 2 * self.LOAD:
+            self._split(block)
+
+    def _split(self, block):
+        load = self.LOAD
+        new_block = _Block(block.items[load:])
+        del block.items[load:]
+        del block.ids[load:]
+        for item, ident in zip(new_block.items, new_block.ids):
+            self._where[item] = (new_block, ident)
+        self._blocks.insert(block.pos + 1, new_block)
+        self._rebuild()
+
+    def append(self, item):
+        self.insert(self._len, item)
+
+    def extend(self, iterable):
+        items = [item for item in dict.fromkeys(iterable) if item not in self._where]
+        if not items:
+            return
+        load = self.LOAD
+        if self._blocks:
+            # Fill the last block at first.
+            block = self._blocks[-1]
+            count = max(2 * load - len(block.items), 0)
+            head, items = items[:count], items[count:]
+            block.items.extend(head)
+            block.ids.extend(id(item) for item in head)
+            for item in head:
+                self._where[item] = (block, id(item))
+        for i in range(0, len(items), load):
+            block = _Block(items[i:i + load])
+            for item, ident in zip(block.items, block.ids):
+                self._where[item] = (block, ident)
+            self._blocks.append(block)
+        self._len = sum(len(block.items) for block in self._blocks)
+        self._rebuild()
+
+    def pop(self, index: int = -1):
+        if not self._len:
+            raise IndexError('pop from empty list')
+        block, offset = self._locate(self._check_index(index))
+        return self._delete(block, offset)
+
+    def remove(self, item):
+        if item not in self._where:
+            # raise same exception as list
+            raise ValueError('list.remove(x): x not in list')
+        block, ident = self._where[item]
+        self._delete(block, block.ids.index(ident))
+
+    def _delete(self, block, offset):
+        item = block.items.pop(offset)
+        del block.ids[offset]
+        del self._where[item]
+        self._len -= 1
+        if block.items:
+            self._update(block.pos, -1)
+        else:
+            del self._blocks[block.pos]
+            self._rebuild()
+        return item
+
+    def clear(self):
+        self._build([])
+
+    def reverse(self):
+        self._build(list(reversed(self)))
+
+    def sort(self, *args, **kwargs):
+        self._build(sorted(self, *args, **kwargs))
+
+    def swap(self, idx_1, idx_2):
+        block_1, offset_1 = self._locate(self._check_index(idx_1))
+        block_2, offset_2 = self._locate(self._check_index(idx_2))
+        item_1, item_2 = block_1.items[offset_1], block_2.items[offset_2]
+        block_1.items[offset_1], block_2.items[offset_2] = item_2, item_1
+        block_1.ids[offset_1], block_2.ids[offset_2] = id(item_2), id(item_1)
+        self._where[item_1] = (block_2, id(item_1))
+        self._where[item_2] = (block_1, id(item_2))
+
+
 def int_to_human_readable(i: int) -> str:
     warnings.warn(
         "Since FeelUOwn 5.1, it's recommended to use "
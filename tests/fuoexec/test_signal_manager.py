@@ -3,6 +3,7 @@ from unittest import mock
 
 import pytest
 
+from feeluown.utils import profiler
 from feeluown.utils.dispatch import Signal
 from feeluown.fuoexec.signal_manager import SignalManager
 
@@ -80,3 +81,24 @@ async def test_add_and_remove_symbol(app_mock, signal_mgr, signal, mocker):
     assert func.call_count == 1
 
     Signal.teardown_aio_support()
+
+
+def test_profile_hooks(app_mock, signal_mgr, signal, mocker):
+    def hey():
+        pass
+
+    mocker.patch.object(profiler, '_profiler', None)
+    slot_profiler = profiler.start()
+    app_mock.test_signal = signal
+    signal_mgr.initialize(app_mock)
+    mocker.patch('feeluown.fuoexec.signal_manager.fuoexec_F', return_value=hey)
+    signal_mgr.add('app.test_signal', hey, use_symbol=True)
+    signal_mgr.add('app.test_signal', hey, use_symbol=False)
+    signal.emit()
+    profiler.stop()
+
+    stats = slot_profiler.dump()['signals']['app.test_signal']
+    # The hook connected by symbol is called by the delegate.
+    assert stats['calls'] == 2
+    assert stats['receivers']['fuoexec:hey']['calls'] == 2
+    signal_mgr.remove('app.test_signal', hey, use_symbol=False)
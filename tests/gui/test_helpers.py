@@ -6,6 +6,7 @@ from feeluown.library import reverse
 from feeluown.library import ModelNotFound
 from feeluown.gui.helpers import fetch_cover_wrapper
 from feeluown.media import Media, MediaType
+from feeluown.utils.scheduler import ExecutorBusy
 
 
 async def img_mgr_get_return_x():
@@ -87,3 +88,17 @@ async def test_fetch_cover_wrapper(
     coro = fetch_cover_wrapper(app_mock)
     await coro(ekaf_brief_song0, cb)
     cb.assert_called_once_with(None)
+
+
+@pytest.mark.asyncio
+async def test_fetch_cover_wrapper_when_provider_is_busy(
+    app_mock, library, ekaf_brief_song0, ekaf_album0
+):
+    app_mock.library = library
+    app_mock.img_mgr.get_from_cache.return_value = None
+    fetch = fetch_cover_wrapper(app_mock)
+    with mock.patch('feeluown.gui.helpers.run_fn', side_effect=ExecutorBusy):
+        for model in (ekaf_brief_song0, ekaf_album0):
+            cb = mock.MagicMock()
+            await fetch(model, cb)
+            cb.assert_called_once_with(None)
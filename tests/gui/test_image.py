@@ -33,3 +33,16 @@ async def test_img_mgr_get_uses_media_network_options(tmp_path):
             "https": "http://127.0.0.1:7890",
         },
     )
+
+
+@pytest.mark.asyncio
+async def test_img_mgr_get_local_cover_with_size():
+    app_mock = MagicMock()
+    provider = app_mock.library.get.return_value
+    provider.handle_with_path.return_value = b"thumbnail"
+    img_mgr = ImgManager(app_mock)
+
+    content = await img_mgr.get("fuo://local/songs/1/cover/data", "img-uid", size=256)
+
+    assert content == b"thumbnail"
+    provider.handle_with_path.assert_called_once_with("/songs/1/cover/data", size=256)
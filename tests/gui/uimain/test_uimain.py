@@ -2,6 +2,7 @@ import asyncio
 import sys
 from types import SimpleNamespace
 
+import pytest
 from PyQt6.QtCore import QPoint, QPointF, QSize, Qt, QTimer
 from PyQt6.QtGui import QColor, QGuiApplication, QMouseEvent, QPalette
 from PyQt6.QtWidgets import QListWidget, QWidget
@@ -13,6 +14,7 @@ from feeluown.library import BriefSongModel
 from feeluown.media import Media
 from feeluown.player import PlaybackMode, PlaylistMode
 from feeluown.utils.dispatch import Signal
+from feeluown.utils.reader import create_reader
 from feeluown.gui.components.player_playlist import (
     PlayerPlaylistView,
     FMCandidatePlaylistDelegate,
@@ -275,6 +277,24 @@ def test_playlist_overlay(qtbot, app_mock):
     assert not w._ai_radio_btn.isEnabled()
 
 
+@pytest.mark.asyncio
+async def test_playlist_overlay_show_recently_played(qtbot, app_mock, mocker):
+    app_mock.playlist.playback_mode = PlaybackMode.one_loop
+    app_mock.ai = None
+    app_mock.recently_played.create_songs_reader.return_value = create_reader([])
+    mock_run_afn = mocker.patch('feeluown.gui.uimain.playlist_overlay.run_afn')
+    w = PlaylistOverlay(app_mock)
+    qtbot.addWidget(w)
+    w.show()
+    w.show_tab(1)
+    # Songs are read in a thread, instead of on the GUI thread.
+    afn, view = mock_run_afn.call_args.args
+    assert view.model() is None
+    await afn(view)
+    assert view.model() is not None
+    app_mock.recently_played.list_songs.assert_not_called()
+
+
 def test_playlist_overlay_enter_ai_radio(qtbot, app_mock, mocker):
     app_mock.playlist.playback_mode = PlaybackMode.one_loop
     app_mock.playlist.mode = PlaylistMode.normal
@@ -1,3 +1,7 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from feeluown.library import (
@@ -10,8 +14,12 @@ from feeluown.library import (
     SimpleSearchResult,
     Quality,
     SongStandbyOptions,
+    SongModel,
+    ModelNotFound,
+    ModelState,
 )
 from feeluown.media import MediaType
+from feeluown.utils.dispatch import Signal
 
 
 @pytest.mark.asyncio
@@ -327,3 +335,243 @@ async def test_library_a_list_song_standby_v3_falls_back_to_other_providers():
     assert [song.identifier for song in standbys] == ["normal-song"]
     assert standby_provider.search_calls
     assert normal.search_calls
+
+
+class CountingSearchProvider(Provider):
+    def __init__(self, title="Song", fail=False):
+        self._title = title
+        self._fail = fail
+        self.search_count = 0
+
+    @property
+    def identifier(self):
+        return "counting"
+
+    @property
+    def name(self):
+        return "counting"
+
+    def search(self, keyword, **_):
+        self.search_count += 1
+        if self._fail:
+            raise ConnectionError
+        return SimpleSearchResult(
+            q=keyword,
+            songs=[
+                BriefSongModel(
+                    identifier="1",
+                    source=self.identifier,
+                    title=self._title,
+                    artists_name="Artist",
+                )
+            ],
+        )
+
+
+@pytest.mark.asyncio
+async def test_library_a_list_song_standby_v3_uses_standby_cache():
+    song = BriefSongModel(
+        identifier="origin", source="origin", title="Song", artists_name="Artist"
+    )
+    library = Library()
+    provider = CountingSearchProvider()
+    library.register(provider)
+    for _ in range(2):
+        standbys = await library.a_list_song_standby_v3(song)
+        assert [(s.source, s.identifier) for s in standbys] == [("counting", "1")]
+    assert provider.search_count == 1
+
+    # "No standby found" is cached too.
+    library = Library()
+    provider = CountingSearchProvider(title="Other")
+    library.register(provider)
+    for _ in range(2):
+        assert await library.a_list_song_standby_v3(song) == []
+    assert provider.search_count == 1
+
+
+@pytest.mark.asyncio
+async def test_library_a_list_song_standby_v3_does_not_cache_failure():
+    song = BriefSongModel(
+        identifier="origin", source="origin", title="Song", artists_name="Artist"
+    )
+    library = Library()
+    provider = CountingSearchProvider(fail=True)
+    library.register(provider)
+    for _ in range(2):
+        assert await library.a_list_song_standby_v3(song) == []
+    assert provider.search_count == 2
+
+
+@pytest.mark.asyncio
+async def test_library_race_song_prepare_media_prefers_better_standby(library):
+    delays = {"best": 0.05, "good": 0.01, "bad": 0.01}
+    prepared = []
+
+    async def prepare_media(standby, _):
+        prepared.append(standby.identifier)
+        await asyncio.sleep(delays[standby.identifier])
+        if standby.identifier == "bad":
+            return None
+        return Media(f"{standby.identifier}.mp3")
+
+    library.a_song_prepare_media_no_exc = prepare_media
+    standbys = [
+        BriefSongModel(identifier=identifier, source="xxx")
+        for identifier in ("bad", "best", "good")
+    ]
+    song_media_list = await library._a_race_song_prepare_media(standbys, "<<<")
+    # All candidates are prepared at the same time, and the better one wins
+    # even though it is slower.
+    assert prepared == ["bad", "best", "good"]
+    assert [(s.identifier, m.url) for s, m in song_media_list] == [
+        ("best", "best.mp3")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_library_race_song_prepare_media_timeout(library):
+    async def prepare_media(standby, _):
+        if standby.identifier == "slow":
+            await asyncio.sleep(10)
+        return Media(f"{standby.identifier}.mp3")
+
+    library.a_song_prepare_media_no_exc = prepare_media
+    standbys = [
+        BriefSongModel(identifier=identifier, source="xxx")
+        for identifier in ("slow", "fast")
+    ]
+    song_media_list = await library._a_race_song_prepare_media(
+        standbys, "<<<", race_size=1, timeout=0.01
+    )
+    assert [s.identifier for s, _ in song_media_list] == ["fast"]
+
+
+class LatencyProvider(Provider):
+    def __init__(self, identifier, latency):
+        self._identifier = identifier
+        self._latency = latency
+        self.search_calls = 0
+
+    @property
+    def identifier(self):
+        return self._identifier
+
+    @property
+    def name(self):
+        return self._identifier
+
+    def search(self, keyword, **_):
+        self.search_calls += 1
+        time.sleep(self._latency)
+        return SimpleSearchResult(
+            q=keyword,
+            songs=[BriefSongModel(identifier="1", source=self.identifier)],
+        )
+
+
+@pytest.mark.asyncio
+async def test_library_a_search_staggered_starts_fastest_provider_first():
+    library = Library()
+    slow = LatencyProvider("slow", 0.05)
+    fast = LatencyProvider("fast", 0.01)
+    library.register(slow)
+    library.register(fast)
+    library._search_latency = {"slow": 1, "fast": 0.1}
+
+    async for result in library.a_search("xxx", stagger_delay=1):
+        assert result.songs[0].source == "fast"
+        break
+    # The slow provider is not started, since the caller stops iterating.
+    assert slow.search_calls == 0
+    assert fast.search_calls == 1
+    assert library.get_search_latency("fast") < 0.1
+
+
+@pytest.mark.asyncio
+async def test_library_a_search_staggered_yields_all_results():
+    library = Library()
+    library.register(LatencyProvider("a", 0.05))
+    library.register(LatencyProvider("b", 0))
+
+    results = [r async for r in library.a_search("xxx", stagger_delay=0.01)]
+    assert {r.songs[0].source for r in results} == {"a", "b"}
+    assert library.get_search_latency("a") >= 0.05
+
+
+class CountingProvider(Provider):
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.get_calls = 0
+
+    @property
+    def identifier(self):
+        return "counting"
+
+    @property
+    def name(self):
+        return "counting"
+
+    def song_get(self, identifier):
+        self.get_calls += 1
+        time.sleep(self.latency)
+        if identifier == "404":
+            raise ModelNotFound(reason=ModelNotFound.Reason.not_found)
+        return SongModel(
+            identifier=identifier,
+            source=self.identifier,
+            title="",
+            album=None,
+            artists=[],
+            duration=0,
+        )
+
+
+def test_library_model_upgrade_cache():
+    library = Library()
+    provider = CountingProvider()
+    library.register(provider)
+
+    song = BriefSongModel(identifier="1", source=provider.identifier)
+    usong = library.song_upgrade(song)
+    assert library.song_upgrade(song) is usong
+    assert provider.get_calls == 1
+
+    missing = BriefSongModel(identifier="404", source=provider.identifier)
+    for _ in range(2):
+        with pytest.raises(ModelNotFound):
+            library.song_upgrade(missing)
+        assert missing.state is ModelState.not_exists
+    assert provider.get_calls == 2
+
+    stats = library.model_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_library_model_cache_invalidated_by_library_changed():
+    library = Library()
+    provider = CountingProvider()
+    provider.library_changed = Signal()
+    library.register(provider)
+    song = BriefSongModel(identifier="1", source=provider.identifier)
+    other = BriefSongModel(identifier="2", source=provider.identifier)
+    library.song_upgrade(song)
+    library.song_upgrade(other)
+
+    # The removed song is fetched again, and the other is still cached.
+    provider.library_changed.emit([], [library.song_upgrade(song)])
+    library.song_upgrade(song)
+    library.song_upgrade(other)
+    assert provider.get_calls == 3
+
+
+def test_library_model_upgrade_cache_single_flight():
+    library = Library()
+    provider = CountingProvider(latency=0.05)
+    library.register(provider)
+    song = BriefSongModel(identifier="1", source=provider.identifier)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        usongs = list(executor.map(lambda _: library.song_upgrade(song), range(4)))
+    assert all(usong is usongs[0] for usong in usongs)
+    assert provider.get_calls == 1
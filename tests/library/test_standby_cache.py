@@ -0,0 +1,49 @@
+from unittest import mock
+
+from feeluown.library import BriefSongModel
+from feeluown.library.standby_cache import StandbyCache
+
+
+origin = BriefSongModel(
+    source='dummy', identifier='1', title='Hello', artists_name='Adele'
+)
+standby = BriefSongModel(
+    source='xxx', identifier='2', title='Hello', artists_name='Adele',
+    album_name='25', duration_ms='04:55',
+)
+
+
+def test_standby_cache_key_is_normalized():
+    cache = StandbyCache()
+    cache.set(origin, standby, 0.8)
+    song = BriefSongModel(
+        source='dummy', identifier='3', title=' hello ', artists_name='ADELE'
+    )
+    entry = cache.get(song)
+    assert entry.standby.identifier == '2'
+    assert entry.standby.title == 'Hello'
+    assert entry.score == 0.8
+
+
+def test_standby_cache_ttl():
+    cache = StandbyCache(ttl=10, negative_ttl=1)
+    cache.set(origin, standby, 0.8)
+    with mock.patch('time.time', return_value=2**40):
+        assert cache.get(origin) is None
+
+    cache.set_not_found(origin)
+    entry = cache.get(origin)
+    assert entry.standby is None
+    with mock.patch('time.time', return_value=2**40):
+        assert cache.get(origin) is None
+
+
+def test_standby_cache_save_and_load(tmp_path):
+    fpath = str(tmp_path / 'standby.json')
+    cache = StandbyCache(fpath)
+    cache.set(origin, standby, 0.8)
+    cache.save()
+
+    cache = StandbyCache(fpath)
+    entry = cache.get(origin)
+    assert (entry.standby.source, entry.standby.identifier) == ('xxx', '2')
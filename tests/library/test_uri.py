@@ -0,0 +1,27 @@
+from feeluown.library import (
+    BriefSongModel, ModelState, Resolver, resolve_many, reverse, reverse_many,
+)
+
+
+def test_resolve_many(mocker):
+    library = mocker.patch.object(Resolver, 'library')
+    library.get.side_effect = lambda source: None if source == 'yyy' else object()
+    models = resolve_many([
+        'fuo://xxx/songs/1\t# hello - world',
+        'invalid line',
+        'fuo://yyy/songs/2',
+    ])
+    assert [model.identifier for model in models] == ['1', '2']
+    assert models[0].title == 'hello'
+    assert models[1].state is ModelState.not_exists
+    # Providers are looked up once per source.
+    assert library.get.call_count == 2
+
+
+def test_reverse_many_with_changed_model():
+    song = BriefSongModel(source='xxx', identifier='1', title='hello - world')
+    assert reverse_many([song], as_line=True) == \
+        ['fuo://xxx/songs/1\t# "hello - world"']
+    # Cached lines are keyed by the fields too.
+    song.title = 'hello'
+    assert reverse(song, as_line=True) == 'fuo://xxx/songs/1\t# hello'
@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+from feeluown.local.cover_store import CoverStore
+
+
+def test_cover_store_deduplicates_covers(tmp_path):
+    store = CoverStore(str(tmp_path))
+    key = store.put(b'cover')
+    assert store.put(b'cover') == key
+    assert store.put(b'another cover') != key
+    assert store.get(key) == b'cover'
+    # Return the original if there is no scaled copy.
+    assert store.get(key, size=128) == b'cover'
+    assert store.get('0' * 40) is None
+
+
+def test_cover_store_scaled_covers(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    buf = io.BytesIO()
+    Image.new('RGB', (1000, 800)).save(buf, format='PNG')
+    store = CoverStore(str(tmp_path), sizes=(128, 512))
+    key = store.put(buf.getvalue())
+    assert Image.open(io.BytesIO(store.get(key, size=100))).size == (128, 102)
+    assert Image.open(io.BytesIO(store.get(key, size=300))).size == (512, 410)
+    assert store.get(key, size=600) == buf.getvalue()
+
+
+def test_cover_store_prune(tmp_path):
+    store = CoverStore(str(tmp_path))
+    key1 = store.put(b'cover1')
+    key2 = store.put(b'cover2')
+    store.prune([key1])
+    assert store.get(key1) == b'cover1'
+    assert store.get(key2) is None
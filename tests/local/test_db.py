@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from unittest import mock
+
+from feeluown.local import db as dbmod
+from feeluown.local.db import DB, iter_audio_metadata, ScanStats, gen_id
+
+
+def create_files(directory, count):
+    for i in range(count):
+        # Title and artists name are read from the name of a wav file.
+        (directory / f'Song{i} - Artist{i % 3}.wav').touch()
+
+
+def test_iter_audio_metadata_keeps_order(tmp_path):
+    create_files(tmp_path, 10)
+    fpaths = sorted(str(p) for p in tmp_path.iterdir())
+    stats = ScanStats()
+    results = list(iter_audio_metadata(fpaths, 2, stats=stats, threshold=1))
+    assert [fpath for fpath, _ in results] == fpaths
+    assert [data['title'] for _, data in results] == \
+        [fpath.rsplit('/', 1)[-1].split(' - ')[0] for fpath in fpaths]
+    assert stats.files == 10 and stats.workers == 2
+
+
+def test_iter_audio_metadata_reads_few_files_in_process(tmp_path, mocker):
+    mock_pool = mocker.patch.object(dbmod, 'ProcessPoolExecutor')
+    create_files(tmp_path, 10)
+    fpaths = sorted(str(p) for p in tmp_path.iterdir())
+    stats = ScanStats()
+    assert len(list(iter_audio_metadata(fpaths, 4, stats=stats))) == 10
+    mock_pool.assert_not_called()
+    assert stats.workers == 1
+
+
+def test_db_scan_default_workers(tmp_path, mocker):
+    mocker.patch.object(dbmod.os, 'cpu_count', return_value=64)
+    mock_iter = mocker.patch.object(dbmod, 'iter_audio_metadata', return_value=[])
+    create_files(tmp_path, 1)
+    config = create_config()
+    config.SCAN_WORKERS = 0
+    DB('').scan(config, [str(tmp_path)], 2, ['wav'])
+    assert mock_iter.call_args.args[1] == dbmod.SCAN_DEFAULT_MAX_WORKERS
+
+
+def create_config():
+    return mock.MagicMock(
+        SCAN_WORKERS=1,
+        CORE_LANGUAGE='auto',
+        IDENTIFIER_DELIMITER='',
+        EXPAND_ARTIST_SONGS=False,
+        ARTIST_SPLITTER=[',', '&'],
+        ARTIST_SPLITTER_IGNORANCE=None,
+        SPLIT_ALBUM_ARTIST_NAME=False,
+        MUSIC_FORMATS=['wav'],
+    )
+
+
+def test_db_scan(tmp_path):
+    create_files(tmp_path, 10)
+    db = DB('')
+    db.scan(create_config(), [str(tmp_path)], 2, ['wav'])
+    db.after_scan()
+    assert len(db.list_songs()) == 10
+    assert len(db.list_artists()) == 4  # 3 artists and the unknown album artist
+    # Songs whose covers are used by albums and artists.
+    album, = db.list_albums()
+    assert album.cover.startswith(f'fuo://local/songs/{db.list_cover_songs()[0]}/')
+
+
+def test_db_artist_album_indexes(tmp_path):
+    create_files(tmp_path, 6)
+    config = create_config()
+    db = DB('')
+    db.scan(config, [str(tmp_path)], 2, ['wav'])
+    db.after_scan()
+    album, = db.list_albums()
+    assert db.list_albums_by_artist(album.artists[0].identifier) == [album]
+    assert db.list_albums_by_contributor(gen_id('Artist0')) == [album]
+
+    # Remove all songs of Artist0.
+    (tmp_path / 'Song0 - Artist0.wav').unlink()
+    (tmp_path / 'Song3 - Artist0.wav').unlink()
+    db.scan(config, [str(tmp_path)], 2, ['wav'])
+    db.after_scan()
+    assert db.get_artist(gen_id('Artist0')) is None
+    assert db.list_albums_by_contributor(gen_id('Artist0')) == []
+    assert db.list_albums_by_contributor(gen_id('Artist1')) == [album]
+
+
+def test_db_incremental_scan(tmp_path, mocker):
+    music_dir = tmp_path / 'music'
+    music_dir.mkdir()
+    create_files(music_dir, 10)
+    config = create_config()
+    db = DB(str(tmp_path / 'db.pickle'))
+    db.scan(config, [str(music_dir)], 2, ['wav'])
+    db.after_scan()
+    db.flush()
+
+    (music_dir / 'Song0 - Artist0.wav').unlink()
+    (music_dir / 'New - Artist9.wav').touch()
+    spy = mocker.spy(dbmod, 'read_audio_metadata')
+    db = DB(str(tmp_path / 'db.pickle'))
+    assert db.load(config) is True
+    db.scan(config, [str(music_dir)], 2, ['wav'])
+    db.after_scan()
+    # Only the new file is read.
+    assert spy.call_count == 1
+    titles = sorted(song.title for song in db.list_songs())
+    assert titles == sorted(['New'] + [f'Song{i}' for i in range(1, 10)])
+    artist_names = {artist.name for artist in db.list_artists()}
+    assert 'Artist9' in artist_names
+    new_song = next(song for song in db.list_songs() if song.title == 'New')
+    assert db.get_song_fpath(new_song.identifier).endswith('New - Artist9.wav')
+    # Search indexes are rebuilt from the snapshot and updated incrementally.
+    assert db.search_songs('new')[0].title == 'New'
+    assert all(song.title != 'Song0' for song in db.search_songs('song0'))
+    assert [artist.name for artist in db.search_artists('artist9')][0] == 'Artist9'
+
+
+def test_db_snapshot_is_invalid_after_upgrade(tmp_path, mocker):
+    create_files(tmp_path, 1)
+    config = create_config()
+    db = DB(str(tmp_path / 'db.pickle'))
+    db.scan(config, [str(tmp_path)], 2, ['wav'])
+    db.flush()
+    assert DB(str(tmp_path / 'db.pickle')).load(config) is True
+    # Pickled models may be incompatible with the new version.
+    mocker.patch.object(dbmod, 'feeluown_version', '99.0')
+    assert DB(str(tmp_path / 'db.pickle')).load(config) is False
+
+
+def test_db_remove_file_of_duplicate_song(tmp_path):
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+        create_files(tmp_path / name, 1)
+    config = create_config()
+    db = DB(str(tmp_path / 'db.pickle'))
+    db.scan(config, [str(tmp_path)], 2, ['wav'])
+    db.flush()
+    song, = db.list_songs()
+    fpath = db.get_song_fpath(song.identifier)
+    other, = {str(tmp_path / name / 'Song0 - Artist0.wav')
+              for name in ('a', 'b')} - {fpath}
+
+    # The song is kept since another file has the same song.
+    os.remove(fpath)
+    db = DB(str(tmp_path / 'db.pickle'))
+    assert db.load(config) is True
+    db.scan(config, [str(tmp_path)], 2, ['wav'])
+    assert db.list_songs() == [song]
+    assert db.get_song_fpath(song.identifier) == other
+
+    os.remove(other)
+    _, removed = db.sync([other])
+    assert removed == [song] and db.list_songs() == []
+
+
+def test_db_sync(tmp_path):
+    create_files(tmp_path, 3)
+    db = DB('')
+    db.scan(create_config(), [str(tmp_path)], 2, ['wav'])
+    db.after_scan()
+
+    sub_dir = tmp_path / 'sub'
+    sub_dir.mkdir()
+    (sub_dir / 'New - Artist0.wav').touch()
+    (tmp_path / 'Song0 - Artist0.wav').unlink()
+    added, removed = db.sync([str(sub_dir / 'New - Artist0.wav'),
+                              str(tmp_path / 'Song0 - Artist0.wav')])
+    db.after_scan()
+    assert [song.title for song in added] == ['New']
+    assert [song.title for song in removed] == ['Song0']
+
+    # Songs in a removed directory are removed.
+    (sub_dir / 'New - Artist0.wav').unlink()
+    sub_dir.rmdir()
+    added, removed = db.sync([], [str(sub_dir)])
+    assert added == [] and [song.title for song in removed] == ['New']
+    assert len(db.list_songs()) == 2
+
+
+def test_db_publishes_while_scanning(tmp_path, mocker):
+    create_files(tmp_path, 3)
+    mocker.patch.object(dbmod, 'SCAN_PUBLISH_INTERVAL', 0)
+    db = DB('')
+    progress = []
+    db.scan_progress.connect(lambda *args: progress.append(args), weak=False)
+    db.scan(create_config(), [str(tmp_path)], 2, ['wav'])
+    # Songs are published one by one.
+    assert progress == [(1, 1), (2, 2), (3, 3)]
+    assert db.wait_for_generation(3, timeout=0) is False
+    assert db.wait_for_generation(2, timeout=0) is True
+
+
+def test_db_read_while_syncing(tmp_path):
+    create_files(tmp_path, 30)
+    db = DB('')
+    db.scan(create_config(), [str(tmp_path)], 2, ['wav'])
+    db.after_scan()
+    fpaths = [str(p) for p in tmp_path.iterdir()]
+    stopped = threading.Event()
+
+    def sync():
+        for _ in range(20):
+            for fpath in fpaths:
+                os.utime(fpath, ns=(time.time_ns(), time.time_ns()))
+            db.sync(fpaths)
+            db.after_scan()
+        stopped.set()
+
+    thread = threading.Thread(target=sync)
+    thread.start()
+    artist_ids = [gen_id(f'Artist{i}') for i in range(3)]
+    while not stopped.is_set():
+        for artist_id in artist_ids:
+            db.list_albums_by_artist(artist_id)
+            db.list_albums_by_contributor(artist_id)
+        db.search_songs('song')
+        db.list_cover_songs()
+    thread.join(timeout=10)
+    assert len(db.list_songs()) == 30
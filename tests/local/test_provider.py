@@ -0,0 +1,76 @@
+import importlib
+import threading
+
+import pytest
+
+from feeluown.excs import ProviderIOError
+from feeluown.local.cover_store import CoverStore
+from feeluown.local.db import DB
+from feeluown.local.provider import LocalProvider
+
+from .test_db import create_config, create_files
+
+
+def test_covers_are_served_from_store(tmp_path, mocker):
+    music_dir = tmp_path / 'music'
+    music_dir.mkdir()
+    create_files(music_dir, 6)
+    provider = LocalProvider()
+    provider.db = DB('')
+    provider.cover_store = CoverStore(str(tmp_path / 'covers'))
+    provider.scan(create_config(), [str(music_dir)])
+
+    # `feeluown.local.provider` is shadowed by the provider instance.
+    provider_mod = importlib.import_module('feeluown.local.provider')
+    read_cover = mocker.patch.object(provider_mod, 'read_audio_cover',
+                                     return_value=(b'cover', 'jpg'))
+    provider.extract_covers()
+    song_ids = provider.db.list_cover_songs()
+    assert read_cover.call_count == len(song_ids)
+    # Songs share one cover file.
+    assert len(list((tmp_path / 'covers').glob('*/*'))) == 1
+
+    read_cover.reset_mock()
+    assert provider.handle_with_path(f'/songs/{song_ids[0]}/cover/data') == b'cover'
+    assert read_cover.call_count == 0
+    # The cover is extracted on demand if it is not extracted by the scan.
+    other_id = next(song.identifier for song in provider.db.list_songs()
+                    if song.identifier not in song_ids)
+    assert provider.handle_with_path(f'/songs/{other_id}/cover/data') == b'cover'
+    assert read_cover.call_count == 1
+
+
+def test_songs_are_available_while_scanning(tmp_path, mocker):
+    music_dir = tmp_path / 'music'
+    music_dir.mkdir()
+    create_files(music_dir, 3)
+    config = create_config()
+    db = DB(str(tmp_path / 'db.pickle'))
+    db.scan(config, [str(music_dir)], 2, ['wav'])
+    db.after_scan()
+    db.flush()
+    song = db.list_songs()[0]
+
+    provider_mod = importlib.import_module('feeluown.local.provider')
+    mocker.patch.object(provider_mod, 'SCAN_WAIT_TIMEOUT', 0.1)
+    provider = LocalProvider()
+    provider.db = DB(str(tmp_path / 'db.pickle'))
+    scan_started, scan_resumed = threading.Event(), threading.Event()
+
+    def slow_scan(*args, **kwargs):
+        scan_started.set()
+        scan_resumed.wait()
+
+    mocker.patch.object(provider.db, 'scan', side_effect=slow_scan)
+    thread = threading.Thread(target=provider.scan, args=(config, [str(music_dir)]))
+    thread.start()
+    try:
+        assert scan_started.wait(timeout=5)
+        # Songs in the snapshot are available before the scan is finished.
+        assert provider.song_get(song.identifier) == song
+        with pytest.raises(ProviderIOError):
+            provider.song_get('missing')
+    finally:
+        scan_resumed.set()
+        thread.join()
+    assert provider.song_get('missing') is None
@@ -0,0 +1,46 @@
+from feeluown.local.search_index import SearchIndex
+
+
+def create_index():
+    index = SearchIndex()
+    index.add('1', 'Let It Be', 'The Beatles', 'Let It Be')
+    index.add('2', 'Beautiful Day', 'U2', 'All That You Can\'t Leave Behind')
+    index.add('3', 'Be Quiet and Drive', 'Deftones', 'Around the Fur')
+    index.add('4', '晴天', '周杰伦', '叶惠美')
+    index.add('5', '七里香', '周杰伦', '七里香')
+    return index
+
+
+def test_search_index_ranking():
+    index = create_index()
+    # Prefix match goes first, then token match.
+    assert index.search('be') == ['3', '2', '1']
+    assert index.search('beat') == ['1']
+    # Documents matching only some query tokens are fuzzy matched.
+    assert index.search('let be') == ['1', '3']
+
+
+def test_search_index_fuzzy():
+    index = create_index()
+    assert index.search('beatels')[0] == '1'
+    assert index.search('let it bee') == ['1']
+    assert index.search('zzz') == []
+
+
+def test_search_index_cjk():
+    index = create_index()
+    assert index.search('周杰伦') == ['4', '5']
+    assert index.search('里香') == ['5']
+    assert index.search('晴') == ['4']
+    # Fullwidth characters are normalized.
+    assert index.search('ＢＥＡＴＬＥＳ') == ['1']
+
+
+def test_search_index_update():
+    index = create_index()
+    index.remove('5')
+    assert index.search('七里香') == []
+    index.add('4', 'Sunny Day', 'Jay Chou')
+    assert index.search('晴天') == []
+    assert index.search('sunny') == ['4']
+    assert len(index) == 4
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from feeluown.local.watcher import (
+    MusicFolderWatcher, InotifyBackend, PollingBackend, create_backend,
+)
+
+
+def create_watcher(folder, backend):
+    fpaths, dirs = set(), set()
+
+    def callback(fpaths_, dirs_):
+        fpaths.update(fpaths_)
+        dirs.update(dirs_)
+
+    watcher = MusicFolderWatcher([str(folder)], 2, ['wav'], callback,
+                                 debounce=0.1, backend=backend)
+    return watcher, fpaths, dirs
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return predicate()
+
+
+@pytest.fixture(params=['inotify', 'polling'])
+def backend(request):
+    if request.param == 'inotify':
+        backend = create_backend()
+        if not isinstance(backend, InotifyBackend):
+            pytest.skip('inotify is not available')
+        return backend
+    return PollingBackend(interval=0.1)
+
+
+def test_watcher_reports_changes_in_batch(tmp_path, backend):
+    (tmp_path / 'old.wav').touch()
+    watcher, fpaths, dirs = create_watcher(tmp_path, backend)
+    watcher.start()
+    try:
+        sub_dir = tmp_path / 'sub'
+        sub_dir.mkdir()
+        (sub_dir / 'a.wav').touch()
+        (tmp_path / 'b.wav').touch()
+        (tmp_path / 'cover.jpg').touch()
+        (tmp_path / 'old.wav').unlink()
+        assert wait_until(lambda: {str(sub_dir / 'a.wav'),
+                                   str(tmp_path / 'b.wav')} <= fpaths)
+        if isinstance(backend, InotifyBackend):
+            assert wait_until(lambda: str(tmp_path / 'old.wav') in fpaths)
+        else:
+            # The changed directory is reported, so that removed files are synced.
+            assert wait_until(lambda: str(tmp_path) in dirs)
+    finally:
+        watcher.stop()
+    assert str(tmp_path / 'cover.jpg') not in fpaths
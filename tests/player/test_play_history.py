@@ -0,0 +1,44 @@
+import pytest
+
+from feeluown.library import BriefSongModel, Resolver
+from feeluown.player import PlayHistory
+
+
+@pytest.fixture
+def history(tmp_path, mocker):
+    mocker.patch.object(Resolver, 'library')
+    history = PlayHistory(str(tmp_path / 'history.sqlite3'))
+    yield history
+    history.close()
+
+
+def create_song(i, artists_name='Artist'):
+    return BriefSongModel(source='fake', identifier=str(i), title=f'Song{i}',
+                          artists_name=artists_name)
+
+
+def test_play_history_queries(history):
+    song1, song2 = create_song(1, 'A, B'), create_song(2, 'B')
+    history.finish(history.record(song1, played_at=1), 100)
+    history.finish(history.record(song2, played_at=2), 10, skipped=True)
+    history.finish(history.record(song1, played_at=3), 100)
+
+    assert history.count_songs() == 2
+    assert history.list_recently_played(10) == [song1, song2]
+    assert history.list_recently_played(10, offset=1) == [song2]
+    assert history.list_most_played(1) == [(song1, 2)]
+    assert history.get_play_count(song1) == 2
+    assert history.get_play_count(create_song(3)) == 0
+    assert history.get_artist_play_count('B') == 3
+    assert history.get_artist_play_count('A') == 2
+    assert history.get_skip_rate(song2) == 1
+    assert history.get_skip_rate() == pytest.approx(1 / 3)
+    assert history.create_recently_played_reader().readall() == [song1, song2]
+
+
+def test_play_history_is_persistent(history):
+    history.import_songs([create_song(1), create_song(2)])
+    history.close()
+    history = PlayHistory(history.fpath)
+    assert history.list_recently_played(10) == [create_song(1), create_song(2)]
+    history.close()
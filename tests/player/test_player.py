@@ -134,6 +134,120 @@ class TestPlayer(TestCase):
         )
         self.player.stop()
 
+    @mock.patch('feeluown.player.mpvplayer._mpv_set_option_string')
+    def test_preload_requires_gapless_mode(self, _):
+        self.player.play(Media('http://xxx'))
+        assert self.player.preload(Media('http://yyy')) is False
+        self.player.stop()
+
+    @mock.patch('feeluown.player.mpvplayer._mpv_set_option_string')
+    def test_play_preloaded_media(self, _):
+        player = MpvPlayer(Playlist(app_mock), gapless=True)
+        mpv = player._mpv
+        player.play(Media('http://xxx'))
+        player._mpv = mock.MagicMock(playlist_pos=0)
+        try:
+            # Media with different network options can't be preloaded.
+            media = Media('http://yyy', http_headers={'referer': 'http://yyy'})
+            assert player.preload(media) is False
+
+            media = Media('http://yyy')
+            assert player.preload(media) is True
+            player._mpv.playlist_append.assert_called_once_with('http://yyy')
+            player.play(media)
+            player._mpv.playlist_next.assert_called_once_with('force')
+            player._mpv.play.assert_not_called()
+            assert player.current_media is media
+        finally:
+            player._mpv = mpv
+            player.stop()
+            player.shutdown()
+
+    @mock.patch('feeluown.player.mpvplayer.Timer')
+    @mock.patch('feeluown.player.mpvplayer._mpv_set_property_string')
+    def test_pause_with_fade(self, mock_set_property_string, mock_timer):
+        player = MpvPlayer(Playlist(app_mock), fade=True, fade_time_ms=1000)
+        mpv = player._mpv
+        player._mpv = mock.MagicMock(pause=False)
+        player._position = 10
+        try:
+            player.pause()
+            mock_set_property_string.assert_called_with(
+                player._mpv.handle,
+                b'file-local-options/af',
+                b'@fuo-fade:lavfi=[afade=t=out:st=10.200:d=1.000:curve=hsin]',
+            )
+            # The player is paused when the fade-out is finished.
+            assert player.pausing is True
+            mock_timer.return_value.start.assert_called_once_with()
+            player._on_fade_out_finished()
+            assert player._mpv.pause is True
+            assert player.pausing is False
+        finally:
+            player._mpv = mpv
+            player.shutdown()
+
+    @mock.patch('feeluown.player.mpvplayer.Timer')
+    @mock.patch('feeluown.player.mpvplayer._mpv_set_property_string')
+    def test_preload_with_overlap(self, _, mock_timer):
+        player = MpvPlayer(Playlist(app_mock), fade=True, gapless=True)
+        mpv = player._mpv
+        player._mpv = mock.MagicMock(pause=False, playlist_pos=0)
+        player._current_media = Media('http://xxx')
+        player._overlap_mpv = helper = mock.MagicMock()
+        player.duration = 100
+        player._position = 10
+        try:
+            assert player.preload(Media('http://yyy')) is True
+            # The head of the media is played by the helper during the overlap.
+            player._mpv.playlist_append.assert_called_once_with(
+                'http://yyy', start='0.500'
+            )
+            helper.loadfile.assert_called_once()
+            mock_timer.assert_called_once_with(89.5, player._start_overlap)
+
+            # Seeking to the tail cancels the overlap.
+            player._mpv.playlist_append.reset_mock()
+            player.position = 99.8
+            helper.stop.assert_called_once_with()
+            player._mpv.playlist_append.assert_called_once_with('http://yyy')
+        finally:
+            player._mpv = mpv
+            player.shutdown()
+
+    @mock.patch('feeluown.player.mpvplayer.Timer')
+    @mock.patch('feeluown.player.mpvplayer._mpv_set_property_string')
+    def test_pause_during_overlap(self, _, mock_timer):
+        player = MpvPlayer(Playlist(app_mock), fade=True, gapless=True)
+        mpv = player._mpv
+        player._mpv = mock.MagicMock(pause=False, playlist_pos=0)
+        player._current_media = Media('http://xxx')
+        player._overlap_mpv = helper = mock.MagicMock(pause=True)
+        player.duration = 100
+        player._position = 10
+        try:
+            player.preload(Media('http://yyy'))
+            player._position = 99.6
+            player._start_overlap()
+            assert helper.pause is False
+
+            # The helper is paused along with current media.
+            player.pause()
+            assert helper.pause is True
+            player._on_fade_out_finished()
+            assert helper.pause is True
+
+            # The overlap is kept, so the head of the media is not played twice.
+            player._mpv.playlist_append.reset_mock()
+            player.resume()
+            assert helper.pause is False
+            helper.stop.assert_not_called()
+            player._mpv.playlist_append.assert_not_called()
+            assert player._overlap_start == 99.5
+        finally:
+            player._mpv = mpv
+            player.shutdown()
+
 
 class TestPlaylist(TestCase):
     def setUp(self):
@@ -5,11 +5,15 @@ import pytest
 import pytest_asyncio
 
 from feeluown.library.excs import MediaNotFound
+from feeluown.library.standby_cache import StandbyCache
+from feeluown.media import Media
 from feeluown.player import (
     Playlist, PlaylistMode, Player, PlaybackMode,
     PlaylistRepeatMode, PlaylistShuffleMode, MetadataAssembler
 )
+from feeluown.player.prefetcher import PrefetchedBundle
 from feeluown.utils.dispatch import Signal
+from feeluown.utils.scheduler import ExecutorBusy
 
 SONG2_URL = 'http://x.mp3'
 
@@ -20,6 +24,7 @@ def pl(app_mock, song, song1):
     pl: [song, song1], current_song: song
     """
     app_mock.config.ENABLE_MV_AS_STANDBY = 0
+    app_mock.library.standby_cache = StandbyCache()
     playlist = Playlist(app_mock)
     playlist.add(song)
     playlist.add(song1)
@@ -191,6 +196,27 @@ async def test_set_an_existing_bad_song_as_current_song(
     assert pl.list().index(song2) == 2
 
 
+@pytest.mark.asyncio
+async def test_find_and_use_standby_with_cache(pl, song2, song3):
+    library = pl._app.library
+    # The second time, the standby is found in the standby cache.
+    library.a_list_song_standby_v2 = mock.AsyncMock(
+        return_value=[(song3, SONG2_URL)]
+    )
+    library.a_song_prepare_media_no_exc = mock.AsyncMock(return_value=SONG2_URL)
+    assert await pl.find_and_use_standby(song2) == (song3, SONG2_URL)
+    standby, media = await pl.find_and_use_standby(song2)
+    assert library.a_list_song_standby_v2.call_count == 1
+    assert standby.identifier == song3.identifier and media == SONG2_URL
+
+    # No standby is found, and the negative result is cached too.
+    library.a_list_song_standby_v2.return_value = []
+    library.standby_cache.invalidate(song2)
+    assert await pl.find_and_use_standby(song2) == (song2, None)
+    assert await pl.find_and_use_standby(song2) == (song2, None)
+    assert library.a_list_song_standby_v2.call_count == 2
+
+
 @pytest.fixture
 def mock_a_set_cursong(mocker):
     mocker.patch.object(Playlist, 'a_set_current_song', new=mock.MagicMock)
@@ -239,10 +265,8 @@ def test_playlist_random_mode_reorder_and_restore(
     )
     original = list(playlist.list())
 
-    def fake_shuffle(seq):
-        seq.reverse()
-
-    mocker.patch('feeluown.player.playlist.random.shuffle', side_effect=fake_shuffle)
+    # Always draw the last song in the pool.
+    mocker.patch('feeluown.player.shuffle.random.randrange', side_effect=lambda n: n - 1)
 
     playlist.playback_mode = PlaybackMode.random
     assert list(playlist.list()) == original[::-1]
@@ -260,11 +284,9 @@ def test_playlist_random_mode_iteration_without_replacement(
         playback_mode=PlaybackMode.loop,
     )
     order = [song2, song3, song1, song]
-
-    def fake_shuffle(seq):
-        seq[:] = order
-
-    mocker.patch('feeluown.player.playlist.random.shuffle', side_effect=fake_shuffle)
+    # The pool is [song, song1, song2, song3], and the drawn song is
+    # replaced by the last song in the pool.
+    mocker.patch('feeluown.player.shuffle.random.randrange', side_effect=[2, 2, 1, 0])
 
     playlist.playback_mode = PlaybackMode.random
     assert list(playlist.list()) == order
@@ -483,3 +505,49 @@ def test_switch_from_one_loop(pl):
     pl.playback_mode = PlaybackMode.one_loop
     pl.playback_mode = PlaybackMode.loop
     pl._app.player.set_infinite_loop.assert_called_with(False)
+
+
+def test_playlist_list_upcoming_songs(pl, song, song1, song2):
+    pl.add(song2)
+    with pl._queue_lock:
+        assert pl._list_upcoming_songs_no_lock(2) == [song1, song2]
+        # The playlist loops, but the current song should not be included.
+        assert pl._list_upcoming_songs_no_lock(5) == [song1, song2]
+    pl.playback_mode = PlaybackMode.sequential
+    pl._current_song = song1
+    with pl._queue_lock:
+        assert pl._list_upcoming_songs_no_lock(2) == [song2]
+
+
+@pytest.mark.asyncio
+async def test_playlist_prefetch_and_use_bundle(pl, song1, mocker):
+    media, metadata = Media('http://x.mp3'), object()
+    pl._app.library.song_prepare_media.return_value = media
+    pl._app.library.song_get_lyric.return_value = None
+    mocker.patch.object(pl._metadata_mgr, 'prepare_for_song', return_value=metadata)
+    await pl._prefetcher.a_prefetch([song1], pl.audio_select_policy)
+
+    mock_prepare_media = mocker.patch.object(Playlist, '_prepare_media')
+    mock_set_current_song_with_media = mocker.patch.object(
+        Playlist, 'set_current_song_with_media')
+    await pl.a_set_current_song(song1)
+    mock_prepare_media.assert_not_called()
+    mock_set_current_song_with_media.assert_called_once_with(song1, media, metadata)
+    # The bundle can only be used once.
+    assert pl._prefetcher.pop(song1) is None
+
+
+def test_playlist_prefetch_bundle_expired(pl, song1):
+    bundle = PrefetchedBundle(song1, Media('http://x.mp3'), None, prepared_at=0)
+    pl._prefetcher._bundles[song1] = bundle
+    assert pl._prefetcher.pop(song1) is None
+
+
+@pytest.mark.asyncio
+async def test_playlist_fetch_song_mv_when_provider_is_busy(pl, song1, mocker):
+    mocker.patch('feeluown.player.playlist.run_fn', side_effect=ExecutorBusy)
+    mock_emit = mocker.patch.object(pl.song_mv_changed, 'emit')
+    pl._current_song_mv = object()
+    await pl._fetch_current_song_mv(song1)
+    assert pl._current_song_mv is None
+    mock_emit.assert_called_once_with(song1, None)
@@ -1,6 +1,7 @@
 import pytest
 
-from feeluown.player import RecentlyPlayed, Playlist
+from feeluown.library import Resolver
+from feeluown.player import RecentlyPlayed, Playlist, PlayHistory
 
 
 @pytest.fixture()
@@ -16,3 +17,53 @@ def test_list_songs(playlist, song1, song2):
     songs = recently_played.list_songs()
     assert len(songs) == 2
     assert songs[0] == song2
+
+
+def test_list_songs_from_history(app_mock, playlist, song1, song2, mocker):
+    mocker.patch.object(Resolver, 'library')
+    history = PlayHistory(':memory:')
+    recently_played = RecentlyPlayed(playlist, history=history, player=app_mock.player)
+    recently_played.init_from_models([song1])
+    assert recently_played.list_songs() == [song1]
+
+    app_mock.player.position = 10
+    playlist.song_changed_v2.emit(song2, object())
+    playlist.song_changed_v2.emit(song1, object())
+    assert recently_played.list_songs() == [song1, song2]
+    # Song2 is skipped after played for 10 seconds.
+    assert history.get_skip_rate(song2) == 1
+
+    app_mock.player.duration = 100
+    recently_played._on_media_finished()
+    playlist.song_changed_v2.emit(None, object())
+    assert history.get_play_count(song1) == 2
+    assert history.get_skip_rate(song1) == 0
+    assert recently_played.create_songs_reader().readall() == [song1, song2]
+
+
+def test_unplayable_song_is_not_recorded(app_mock, playlist, song1, song2, mocker):
+    mocker.patch.object(Resolver, 'library')
+    history = PlayHistory(':memory:')
+    recently_played = RecentlyPlayed(playlist, history=history, player=app_mock.player)
+    app_mock.player.position = 10
+    playlist.song_changed_v2.emit(song1, object())
+    # The playlist emits the signal with media=None when the song can't be played.
+    playlist.song_changed_v2.emit(song2, None)
+    assert history.get_play_count(song2) == 0
+    assert recently_played.list_songs() == [song1]
+
+
+def test_stop_and_close_are_not_skips(app_mock, playlist, song1, song2, mocker):
+    mocker.patch.object(Resolver, 'library')
+    history = PlayHistory(':memory:')
+    recently_played = RecentlyPlayed(playlist, history=history, player=app_mock.player)
+    app_mock.player.position = 10
+    playlist.song_changed_v2.emit(song1, object())
+    # Stop.
+    playlist.song_changed_v2.emit(None, None)
+    assert history.get_play_count(song1) == 1
+    assert history.get_skip_rate(song1) == 0
+
+    playlist.song_changed_v2.emit(song2, object())
+    recently_played.close()
+    assert history.get_skip_rate(song2) == 0
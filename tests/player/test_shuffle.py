@@ -0,0 +1,35 @@
+from feeluown.player.shuffle import ShuffledSongs
+from feeluown.utils.utils import IndexedDedupList
+
+
+def test_shuffled_songs_are_drawn_lazily():
+    songs = IndexedDedupList(range(100))
+    shuffled = ShuffledSongs(songs)
+    assert len(shuffled) == 100 and 99 in shuffled
+    head = shuffled[:3]
+    assert len(shuffled._drawn) == 3
+    # The song becomes the next drawn song when it is not drawn yet.
+    song = next(song for song in range(100) if song not in head)
+    assert shuffled.index(song) == 3
+    assert shuffled[:4] == head + [song]
+    assert sorted(shuffled) == list(range(100))
+
+
+def test_shuffled_songs_keep_order_when_changed():
+    songs = IndexedDedupList(range(10))
+    shuffled = ShuffledSongs(songs)
+    head = list(shuffled[:5])
+
+    shuffled.remove(head[1])
+    shuffled.insert(1, 'new')
+    shuffled.append('tail')
+    shuffled.extend(['a', 'b', 'a', 'tail'])
+    assert shuffled[:5] == [head[0], 'new'] + head[2:5]
+    assert songs[:10] == [song for song in range(10) if song != head[1]] + ['new']
+    assert len(shuffled) == len(songs) == 13
+    assert sorted(map(str, shuffled)) == sorted(map(str, songs))
+
+    assert shuffled.pop(0) == head[0]
+    assert head[0] not in songs
+    shuffled.clear()
+    assert len(shuffled) == 0 and len(songs) == 0
@@ -3,6 +3,7 @@ from feeluown.player import Player, Playlist
 from feeluown.serializers import serialize
 from feeluown.library import SongModel, SimpleSearchResult, AlbumModel
 from feeluown.player import Metadata
+from feeluown.utils.scheduler import ProviderScheduler, Priority
 
 
 def test_serialize_app(mocker):
@@ -19,6 +20,25 @@ def test_serialize_app(mocker):
     player.shutdown()
 
 
+def test_serialize_app_with_scheduler_stats(mocker):
+    scheduler = ProviderScheduler()
+    mocker.patch('feeluown.serializers.objs.provider_scheduler', scheduler)
+    scheduler.submit('xxx', sum, [1, 2], priority=Priority.low).result()
+    app = mocker.Mock(spec=App)
+    app.live_lyric = mocker.Mock()
+    app.player = player = Player()
+    app.playlist = Playlist(app)
+    try:
+        text = serialize('plain', app)
+        assert 'scheduler-xxx-low' in text
+        assert 'depth=0 rejected=0' in text
+        # Lanes without submissions are not shown.
+        assert 'scheduler-xxx-high' not in text
+    finally:
+        player.shutdown()
+        scheduler.shutdown()
+
+
 def test_serialize_metadata():
     metadata = Metadata({'title': 'hello world'})
     js = serialize('python', metadata)
@@ -0,0 +1,38 @@
+import json
+
+from feeluown.library import CollectionType, reverse
+from feeluown.collection import Collection, CollectionManager
+from feeluown.server.handlers import jsonrpc_
+from feeluown.server.handlers.cmd import Cmd
+from feeluown.server.handlers.collection import CollectionHandler
+
+
+def test_handle_coll(app_mock, song, song3, tmp_path, mocker):
+    mocker.patch('feeluown.collection.resolve',
+                 side_effect=lambda uri: {reverse(song): song,
+                                          reverse(song3): song3}[uri])
+    f = tmp_path / 'library.fuo'
+    f.touch()
+    coll = Collection(str(f))
+    coll.load()
+    coll_mgr = CollectionManager(app_mock)
+    coll_mgr._sys_colls[CollectionType.sys_library] = coll
+    app_mock.coll_mgr = coll_mgr
+
+    handler = CollectionHandler(app_mock)
+    uris = [reverse(song), reverse(song3)]
+    assert handler.handle(Cmd('coll', 'add', 'library', uris)) == [song3, song]
+    assert handler.handle(Cmd('coll', 'remove', 'library', uris[:1])) == [song]
+    assert coll.models == [song3]
+
+
+def test_jsonrpc_coll_mgr_add_many(app_mock, mocker):
+    mocker.patch.object(jsonrpc_, 'fuoexec_get_globals',
+                        return_value={'app': app_mock})
+    app_mock.coll_mgr.add_many.return_value = []
+    payload = json.dumps({
+        'jsonrpc': '2.0', 'id': 1, 'method': 'app.coll_mgr.add_many',
+        'params': [123, ['fuo://fake/songs/0']],
+    })
+    assert jsonrpc_.handle(payload)['result'] == []
+    app_mock.coll_mgr.add_many.assert_called_once_with(123, ['fuo://fake/songs/0'])
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from feeluown.server.handlers.cmd import Cmd
+from feeluown.server.handlers.excs import HandlerException
+from feeluown.server.handlers.profile import ProfileHandler
+from feeluown.utils import profiler
+from feeluown.utils.dispatch import Signal
+
+
+def receiver():
+    pass
+
+
+def test_handle_profile(app_mock, tmp_path, mocker):
+    mocker.patch.object(profiler, '_profiler', None)
+    handler = ProfileHandler(app_mock)
+    with pytest.raises(HandlerException):
+        handler.handle(Cmd('profile', 'dump'))
+
+    app_mock.test_signal = Signal()
+    app_mock.test_signal.connect(receiver)
+    handler.handle(Cmd('profile', 'start', options={'threshold': 20}))
+    app_mock.test_signal.emit()
+    handler.handle(Cmd('profile', 'stop'))
+    assert profiler.get_profiler().threshold == 0.02
+
+    label = 'tests.server.handlers.test_profile.receiver'
+    assert label in handler.handle(Cmd('profile', 'show'))
+    dumped = json.loads(handler.handle(Cmd('profile', 'dump')))
+    assert dumped['signals']['app.test_signal']['receivers'][label]['calls'] == 1
+    output = tmp_path / 'profile.json'
+    handler.handle(Cmd('profile', 'dump', options={'output': str(output)}))
+    assert json.loads(output.read_text()) == dumped
+    handler.handle(Cmd('profile', 'reset'))
+    assert json.loads(handler.handle(Cmd('profile', 'dump')))['signals'] == {}
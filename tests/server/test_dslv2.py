@@ -64,3 +64,17 @@ def test_unparse():
     req = parse("search 'zjl()'")
     text = unparse(req)
     assert text == "search 'zjl()'"
+
+
+def test_parse_and_unparse_coll():
+    req = parse('coll add library fuo://fake/songs/1 fuo://fake/songs/2')
+    assert req.cmd_args == ['add', 'library',
+                            ['fuo://fake/songs/1', 'fuo://fake/songs/2']]
+    assert unparse(req) == 'coll add library fuo://fake/songs/1 fuo://fake/songs/2'
+
+
+def test_parse_and_unparse_profile():
+    req = parse('profile start --threshold=20')
+    assert req.cmd_args == ['start']
+    assert req.cmd_options == {'threshold': 20, 'output': None}
+    assert unparse(req) == 'profile start --threshold=20'
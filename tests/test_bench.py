@@ -1,5 +1,10 @@
-from feeluown.library import BriefSongModel
-from feeluown.utils.utils import DedupList
+import pytest
+
+from feeluown.library import BriefSongModel, Resolver, resolve_many, reverse_many
+from feeluown.library.uri import _split
+from feeluown.player import Playlist, PlaybackMode
+from feeluown.utils.dispatch import Signal
+from feeluown.utils.utils import IndexedDedupList
 
 
 def test_hash_model(benchmark, song):
@@ -11,13 +16,73 @@ def test_richcompare_model(benchmark, song):
 
 
 def test_deduplist_addremove(benchmark):
+    songs = [BriefSongModel(source='xxxx', identifier=str(i)) for i in range(100_000)]
+
     def addremove():
-        song_list = DedupList()
-        num = 1000
-        for i in range(0, num):
-            song = BriefSongModel(source='xxxx', identifier=str(i))
+        song_list = IndexedDedupList()
+        for song in songs:
             if song not in song_list:
                 song_list.append(song)
-        for i in range(num // 10):
-            song_list.pop(0)
-    benchmark(addremove)
+        for song in songs[::1000]:
+            song_list.index(song)
+        for i in range(len(songs) // 10):
+            song_list.insert(i * 2, song_list.pop(0))
+        for song in songs[::10]:
+            song_list.remove(song)
+    benchmark.pedantic(addremove, rounds=3)
+
+
+def test_playlist_shuffle_50k(benchmark, app_mock):
+    songs = [BriefSongModel(source='xxxx', identifier=str(i)) for i in range(50_000)]
+    playlist = Playlist(app_mock, songs, playback_mode=PlaybackMode.loop)
+
+    def shuffle_and_next():
+        playlist.playback_mode = PlaybackMode.random
+        song = None
+        for _ in range(100):
+            song = playlist._get_next_song_of_no_lock(song)
+        playlist.playback_mode = PlaybackMode.loop
+    benchmark(shuffle_and_next)
+
+
+def _create_lines(num):
+    return [f'fuo://xxxx/songs/{i}\t# title{i} - artist{i % 100} - album - 03:20'
+            for i in range(num)]
+
+
+def test_uri_split(benchmark):
+    benchmark(_split, 'title - artist - album - 03:20', 4)
+
+
+def test_resolve_many_100k(benchmark, mocker):
+    mocker.patch.object(Resolver, 'library')
+    lines = _create_lines(100_000)
+    benchmark.pedantic(resolve_many, args=(lines, ), rounds=3)
+
+
+def test_reverse_many_100k(benchmark, mocker):
+    mocker.patch.object(Resolver, 'library')
+    songs = resolve_many(_create_lines(100_000))
+    benchmark.pedantic(reverse_many, args=(songs, ), kwargs={'as_line': True}, rounds=3)
+
+
+class _Receiver:
+    def on_emitted(self, *args):
+        pass
+
+
+@pytest.mark.parametrize('count', [1, 10, 100])
+def test_signal_emit(benchmark, count):
+    signal = Signal()
+    receivers = [_Receiver() for _ in range(count)]
+    for receiver in receivers:
+        signal.connect(receiver.on_emitted)
+    benchmark(signal.emit, 1, 'hello')
+
+
+def test_signal_emit_batch(benchmark):
+    signal = Signal()
+    receivers = [_Receiver() for _ in range(10)]
+    for receiver in receivers:
+        signal.connect(receiver.on_emitted)
+    benchmark(signal.emit_batch, [(i, 'hello') for i in range(100)])
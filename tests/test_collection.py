@@ -1,4 +1,5 @@
 from feeluown.library import ResolveFailed, ResolverNotFound, reverse
+from feeluown import collection as collmod
 from feeluown.collection import Collection, CollectionManager, LIBRARY_FILENAME, \
     POOL_FILENAME
 
@@ -12,8 +13,65 @@ def test_collection_load(tmp_path, song, mocker):
     path.write_text(text)
     coll = Collection(str(path))
     coll.load()
-    mock_resolve.assert_called_once_with(text)
+    # Models are parsed on first access.
+    assert mock_resolve.call_count == 0
     assert coll.models[0] is song
+    mock_resolve.assert_called_once_with(text)
+
+
+def test_collection_load_from_snapshot(song, song3, tmp_path, mocker):
+    def resolve(line):
+        return {reverse(song): song, reverse(song3): song3}[line.split()[0]]
+
+    mock_resolve = mocker.patch('feeluown.collection.resolve', side_effect=resolve)
+    path = tmp_path / 'test.fuo'
+    path.write_text(f'+++\ntitle = "hello"\n+++\n{reverse(song)}\n')
+    snapshot_dir = str(tmp_path / 'snapshots')
+    coll = Collection(str(path), snapshot_dir)
+    coll.load()
+    assert coll.name == 'hello'
+    assert coll.models == [song]
+
+    # The unchanged file is restored from the snapshot.
+    mock_resolve.reset_mock()
+    coll = Collection(str(path), snapshot_dir)
+    coll.load()
+    assert coll.models == [song]
+    assert mock_resolve.call_count == 0
+
+    # The snapshot is saved when the journal is compacted.
+    coll.add(song3)
+    coll.compact()
+    coll = Collection(str(path), snapshot_dir)
+    coll.load()
+    assert coll.models == [song3, song]
+    assert mock_resolve.call_count == 0
+
+    # The journal is compacted when the collection is loaded, so the file
+    # is parsed again, and the snapshot is updated.
+    coll.remove(song)
+    coll = Collection(str(path), snapshot_dir)
+    coll.load()
+    assert coll.models == [song3]
+    assert mock_resolve.call_count == 1
+    coll = Collection(str(path), snapshot_dir)
+    coll.load()
+    assert coll.models == [song3]
+    assert mock_resolve.call_count == 1
+
+    # The snapshot is outdated once the file is changed.
+    path.write_text(f'{reverse(song)}\n')
+    coll = Collection(str(path), snapshot_dir)
+    coll.load()
+    assert coll.models == [song]
+    assert mock_resolve.call_count == 2
+
+    # Or the app is upgraded.
+    mocker.patch.object(collmod, 'feeluown_version', '0.0.0')
+    coll = Collection(str(path), snapshot_dir)
+    coll.load()
+    assert coll.models == [song]
+    assert mock_resolve.call_count == 3
 
 
 def test_collection_load_invalid_file(tmp_path, mocker):
@@ -41,18 +99,21 @@ def test_collection_add_and_remove(album, artist, song, tmp_path):
 
     # test add album
     coll.add(album)
+    coll.compact()
     expected = 'fuo://fake/albums/0\t# blue and green\n'
     text = f.read_text()
     assert text == expected
 
     # test add artist
     coll.add(artist)
+    coll.compact()
     expected = 'fuo://fake/artists/0\t# mary\n' + expected
     text = f.read_text()
     assert text == expected
 
     # test add song
     coll.add(song)
+    coll.compact()
     text = f.read_text()
     expected = ('fuo://fake/songs/0\t# hello world'
                 ' - mary - blue and green - 10:00\n') + expected
@@ -60,6 +121,7 @@ def test_collection_add_and_remove(album, artist, song, tmp_path):
 
     # test remove song
     coll.remove(song)
+    coll.compact()
     assert reverse(song) not in f.read_text()
     assert song not in coll.models
 
@@ -84,10 +146,12 @@ fuo://fake/songs/0
 
     # field `updated` should be written into file
     coll.remove(song)
+    coll.compact()
     line = f.read_text().split('\n')[3]
     assert line.startswith('updated')
 
     coll.add(song)
+    coll.compact()
     text = f.read_text().strip()
     lines = text.split('\n')
     assert len(lines) == 6
@@ -108,16 +172,118 @@ def test_load_and_write_file_with_no_metadata(song, song3, tmp_path, mocker):
     assert coll.name == 'test'  # name should be filename
 
     coll.remove(song)
+    coll.compact()
     # 1. the first line should be removed
     # 2. no metadata should be written
     assert f.read_text() == remain_lines
 
     coll.add(song3)
+    coll.compact()
     lines = f.read_text().split('\n')
     assert len(lines) == 4  # three plus two empty
     assert lines[0].startswith('fuo://fake/songs/3')
 
 
+def test_collection_journal(song, song3, tmp_path, mocker):
+    def resolve(line):
+        if line.startswith('fuo://unknown'):
+            raise ResolverNotFound
+        return {reverse(song): song, reverse(song3): song3}[line.split('\t')[0]]
+
+    mocker.patch('feeluown.collection.resolve', side_effect=resolve)
+    f = tmp_path / 'test.fuo'
+    # The line can not be resolved, it should be kept after compaction.
+    f.write_text('fuo://unknown/songs/1\n')
+    coll = Collection(str(f))
+    coll.load()
+    coll.add(song)
+    coll.add(song3)
+    coll.remove(song)
+    # Changes are only appended to the journal.
+    assert f.read_text() == 'fuo://unknown/songs/1\n'
+    assert coll.models == [song3]
+
+    # Records are replayed and compacted when the collection is loaded.
+    coll = Collection(str(f))
+    coll.load()
+    assert coll.models == [song3]
+    assert not (tmp_path / 'test.fuo.journal').exists()
+    lines = f.read_text().splitlines()
+    assert lines[0].startswith('fuo://fake/songs/3')
+    assert lines[1] == 'fuo://unknown/songs/1'
+
+
+def test_collection_compact_in_background(song, song3, tmp_path, mocker):
+    mocker.patch.object(collmod, 'JOURNAL_COMPACT_THRESHOLD', 2)
+    f = tmp_path / 'test.fuo'
+    f.touch()
+    coll = Collection(str(f))
+    coll.add(song)
+    assert coll._compact_thread is None
+    coll.add(song3)
+    thread = coll._compact_thread
+    if thread is not None:
+        thread.join()
+    assert f.read_text().startswith('fuo://fake/songs/3')
+    assert not (tmp_path / 'test.fuo.journal').exists()
+
+
+def test_collection_compact_journal_on_load(song, tmp_path, mocker):
+    mock_resolve = mocker.patch('feeluown.collection.resolve', return_value=song)
+    f = tmp_path / 'test.fuo'
+    f.touch()
+    coll = Collection(str(f))
+    coll.add(song)
+
+    # The journal is compacted even if models are never read.
+    coll = Collection(str(f))
+    coll.load()
+    assert not (tmp_path / 'test.fuo.journal').exists()
+    assert f.read_text().startswith('fuo://fake/songs/')
+    assert mock_resolve.call_count == 0
+
+
+def test_coll_mgr_compact_on_shutdown(song, song3, tmp_path, app_mock, mocker):
+    coll_mgr = CollectionManager(app_mock)
+    paths = [tmp_path / LIBRARY_FILENAME, tmp_path / '1.fuo']
+    colls = []
+    for path in paths:
+        path.touch()
+        coll = Collection(str(path))
+        coll.load()
+        colls.append(coll)
+    mocker.patch.object(CollectionManager, '_scan', return_value=colls)
+    colls[0].add(song)
+    colls[1].add(song3)
+    coll_mgr.scan()
+    coll_mgr.compact()
+    for path in paths:
+        assert path.read_text().startswith('fuo://fake/songs/')
+        assert not (tmp_path / f'{path.name}.journal').exists()
+
+
+def test_collection_add_many_and_remove_many(album, song, song3, tmp_path):
+    f = tmp_path / 'test.fuo'
+    f.touch()
+    coll = Collection(str(f))
+    coll.add(album)
+    changes = []
+    coll.models_changed.connect(lambda *args: changes.append(args), weak=False)
+
+    # Existing and duplicated models are ignored.
+    assert coll.add_many([song, album, song3, song]) == [song3, song]
+    assert coll.models == [song3, song, album]
+    assert changes == [([song3, song], [])]
+
+    assert coll.remove_many([song, album, song]) == [song, album]
+    assert coll.models == [song3]
+    assert changes[-1] == ([], [song, album])
+
+    coll.compact()
+    assert f.read_text().startswith('fuo://fake/songs/3')
+    assert len(f.read_text().splitlines()) == 1
+
+
 def test_coll_mgr_generate_library_coll(app_mock, tmp_path):
     coll_mgr = CollectionManager(app_mock)
     directory = tmp_path / 'sub'
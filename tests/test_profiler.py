@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+
+from feeluown.utils import profiler
+from feeluown.utils.dispatch import Signal
+from feeluown.utils.profiler import SlotProfiler, get_label, name_signals
+
+
+class A:
+    def __init__(self):
+        self.changed = Signal()
+
+    def on_changed(self, *args):
+        pass
+
+
+def slow(*_):
+    time.sleep(0.02)
+
+
+@pytest.fixture
+def slot_profiler(mocker):
+    mocker.patch.object(profiler, '_profiler', None)
+    yield profiler.start()
+    profiler.stop()
+
+
+def test_profile_emit(slot_profiler, caplog):
+    a = A()
+    s = Signal('s')
+    s.connect(a.on_changed)
+    s.connect(slow)
+    slot_profiler.threshold = 0.01
+    with caplog.at_level(logging.WARNING, logger='feeluown.utils.profiler'):
+        s.emit(1)
+        s.emit_batch([(2, ), (3, )])
+    assert 'slow slot: tests.test_profiler.slow of s' in caplog.text
+
+    stats = slot_profiler.dump()['signals']['s']
+    assert stats['calls'] == 6
+    receivers = stats['receivers']
+    assert receivers['tests.test_profiler.A.on_changed']['calls'] == 3
+    slow_stats = receivers['tests.test_profiler.slow']
+    assert slow_stats['calls'] == 3
+    # The batched calls are recorded as one record.
+    assert slow_stats['slow'] == 2
+    assert slow_stats['max'] >= 0.04
+    assert stats['total'] >= slow_stats['total']
+
+
+def test_profile_stopped(slot_profiler):
+    s = Signal('s')
+    s.connect(slow)
+    profiler.stop()
+    s.emit()
+    assert slot_profiler.dump()['signals'] == {}
+    # Stats are kept after restarting.
+    profiler.start()
+    s.emit()
+    slot_profiler.reset()
+    assert slot_profiler.dump()['signals'] == {}
+
+
+@pytest.mark.asyncio
+async def test_profile_aioqueued_receiver(slot_profiler):
+    Signal.setup_aio_support()
+    s = Signal('s')
+    a = A()
+    s.connect(slow, aioqueue=True)
+    s.connect(a.on_changed, aioqueue=True, coalesce=True)
+    s.emit_batch([(1, ), (2, )])
+    await asyncio.sleep(0.1)
+    Signal.teardown_aio_support()
+    stats = slot_profiler.dump()['signals']['s']
+    assert stats['receivers']['tests.test_profiler.slow']['calls'] == 2
+    assert stats['receivers']['tests.test_profiler.A.on_changed']['calls'] == 1
+
+
+def test_nested_record():
+    slot_profiler = SlotProfiler()
+    s = Signal('s')
+    slot_profiler.record(s, 'delegate', 0.3)
+    slot_profiler.record(s, 'fuoexec:hey', 0.2, nested=True)
+    stats = slot_profiler.dump()['signals']['s']
+    assert stats['calls'] == 1
+    assert stats['total'] == 0.3
+    assert stats['receivers']['fuoexec:hey']['total'] == 0.2
+
+
+def test_dumps_is_stable():
+    slot_profiler = SlotProfiler()
+    for name in ('b', 'a'):
+        for label in ('y', 'x'):
+            slot_profiler.record(Signal(name), label, 0.1)
+    dumped = slot_profiler.dumps()
+    assert list(json.loads(dumped)['signals']) == ['a', 'b']
+    assert list(json.loads(dumped)['signals']['a']['receivers']) == ['x', 'y']
+    assert 'x  <-  a' in slot_profiler.format_table()
+
+
+def test_name_signals():
+    a = A()
+    a.player = A()
+    a.player.changed.name = 'named'
+    name_signals(a, 'app')
+    assert a.changed.name == 'app.changed'
+    assert a.player.changed.name == 'named'
+    assert get_label(a.on_changed) == 'tests.test_profiler.A.on_changed'
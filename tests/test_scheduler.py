@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from feeluown.utils.aio import run_fn
+from feeluown.utils.scheduler import (
+    ExecutorBusy,
+    Priority,
+    PriorityThreadPoolExecutor,
+    ProviderScheduler,
+)
+
+
+def test_priority_executor_serves_high_priority_first():
+    executor = PriorityThreadPoolExecutor("test", max_workers=1)
+    blocker = threading.Event()
+    executor.submit(blocker.wait)  # Occupy the only worker.
+
+    order = []
+    futures = [
+        executor.submit(order.append, "low", priority=Priority.low),
+        executor.submit(order.append, "normal"),
+        executor.submit(order.append, "high", priority=Priority.high),
+    ]
+    assert executor.stats()["low"]["depth"] == 1
+    blocker.set()
+    for future in futures:
+        future.result()
+    assert order == ["high", "normal", "low"]
+    assert executor.stats()["low"]["depth"] == 0
+    executor.shutdown()
+
+
+def test_priority_executor_rejects_when_queue_is_full():
+    executor = PriorityThreadPoolExecutor("test", max_workers=1, max_queue_size=1)
+    started, blocker = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        blocker.wait()
+
+    executor.submit(block)
+    # Wait until the worker takes the blocker, so that the queue is empty.
+    assert started.wait(timeout=1)
+
+    queued = executor.submit(int, "1")
+    rejected = executor.submit(int, "2", priority=Priority.low)
+    # High priority work is never rejected.
+    high = executor.submit(int, "3", priority=Priority.high)
+    with pytest.raises(ExecutorBusy):
+        rejected.result()
+    blocker.set()
+    assert queued.result() == 1
+    assert high.result() == 3
+    assert executor.stats()["low"]["rejected"] == 1
+    executor.shutdown()
+
+
+def test_provider_scheduler_isolates_providers():
+    scheduler = ProviderScheduler(max_workers=1)
+    blocker = threading.Event()
+    scheduler.submit("hanging", blocker.wait)
+    # Another provider is not blocked by the hanging one.
+    assert scheduler.submit("good", int, "1").result(timeout=1) == 1
+    assert set(scheduler.stats()) == {"hanging", "good"}
+    blocker.set()
+    scheduler.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_run_fn_with_source():
+    assert await run_fn(int, "1", source="test", priority=Priority.high) == 1
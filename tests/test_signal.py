@@ -1,5 +1,8 @@
+import asyncio
 from unittest import TestCase, mock
 
+import pytest
+
 from feeluown.utils.dispatch import Signal
 from feeluown.utils.dispatch import receiver
 
@@ -47,6 +50,50 @@ class SignalTest(TestCase):
         s.disconnect(f)
         s.emit(1, 'hello')
 
+    def test_dispatch_is_reset_when_receivers_change(self):
+        s = Signal()
+        a = A()
+        calls = []
+        s.connect(calls.append, weak=False)
+        s.emit(1)
+        s.connect(a.f)
+        s.emit(2)
+        self.assertEqual(len(s._dispatch), 2)
+        del a
+        self.assertEqual(len(s._dispatch or ()), 0)
+        s.disconnect(calls.append)
+        s.emit(3)
+        self.assertEqual(calls, [1, 2])
+
+    def test_emit_batch(self):
+        s = Signal()
+        calls = []
+        s.connect(calls.append, weak=False)
+        s.emit_batch([(1, ), (2, )])
+        self.assertEqual(calls, [1, 2])
+
+        with mock.patch.object(Signal, 'has_aio_support', True), \
+                mock.patch.object(Signal, 'aioqueue') as mock_queue:
+            s.connect(f, aioqueue=True)
+            s.emit_batch([(3, ), (4, )])
+            # The aioqueued receiver is queued once.
+            mock_queue.sync_q.put_nowait.assert_called_once()
+
+    def test_batch(self):
+        s = Signal()
+        calls = []
+        s.connect(calls.append, weak=False)
+        with s.batch():
+            s.emit(1)
+            with s.batch():
+                s.emit(2)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1, 2])
+        with s.batch(coalesce=True):
+            s.emit(3)
+            s.emit(4)
+        self.assertEqual(calls, [1, 2, 4])
+
     @mock.patch.object(Signal, 'connect')
     def test_receiver(self, mock_connect):
         s = Signal()
@@ -55,3 +102,39 @@ class SignalTest(TestCase):
         def f():
             pass
         self.assertTrue(mock_connect.called)
+
+
+@pytest.mark.asyncio
+async def test_coalescing_receiver():
+    Signal.setup_aio_support()
+    s = Signal()
+    calls = []
+    s.connect(calls.append, weak=False, aioqueue=True, coalesce=True)
+    for i in range(5):
+        s.emit(i)
+    [(_, stats)] = s.receiver_stats()
+    assert stats == {'depth': 1, 'dropped': 4, 'delivered': 0}
+    assert Signal.queue_stats()['depth'] == 1
+    await asyncio.sleep(0.01)
+    # Only the latest value is delivered.
+    assert calls == [4]
+    assert s.receiver_stats()[0][1]['delivered'] == 1
+    Signal.teardown_aio_support()
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_receiver():
+    Signal.setup_aio_support()
+    s = Signal()
+    calls = []
+    s.connect(calls.append, weak=False, aioqueue=True, max_rate=20)
+    s.emit(0)
+    await asyncio.sleep(0.01)
+    s.emit(1)
+    await asyncio.sleep(0.01)
+    s.emit(2)
+    # The receiver is called at most once in 50ms.
+    assert calls == [0]
+    await asyncio.sleep(0.06)
+    assert calls == [0, 2]
+    Signal.teardown_aio_support()
@@ -1,6 +1,6 @@
 import pytest
 from copy import copy, deepcopy
-from feeluown.utils.utils import DedupList
+from feeluown.utils.utils import DedupList, IndexedDedupList
 
 
 class Obj:
@@ -120,3 +120,51 @@ def test_dedup_list():
     # clear
     dlist.clear()
     assert dlist == []
+
+
+def test_indexed_dedup_list(mocker):
+    # Use small blocks, so that blocks are split and removed.
+    mocker.patch.object(IndexedDedupList, 'LOAD', 2)
+    dlist = IndexedDedupList([3, 2, 3, 4, 2, 3, 1])
+    assert dlist == [3, 2, 4, 1]
+
+    dlist.extend([5, 1, 6, 7, 8, 9])
+    dlist.append(5)
+    dlist.insert(0, 10)
+    dlist.insert(-2, 11)
+    dlist.insert(99, 12)
+    dlist.insert(0, 4)
+    expected = [10, 3, 2, 4, 1, 5, 6, 7, 11, 8, 9, 12]
+    assert dlist == expected
+    assert [dlist.index(item) for item in expected] == list(range(len(expected)))
+    assert [dlist[i] for i in range(-len(expected), 0)] == expected
+    assert dlist[2:9] == expected[2:9]
+    assert isinstance(dlist[2:9], IndexedDedupList)
+    assert dlist[9::-1] + dlist[:9:-1] == expected[9::-1] + expected[:9:-1]
+    with pytest.raises(ValueError):
+        dlist.index(8, 1, 3)
+    with pytest.raises(ValueError):
+        dlist[0] = 3
+
+    assert dlist.pop(0) == 10
+    assert dlist.pop() == 12
+    assert dlist.pop(-3) == 11
+    dlist.remove(3)
+    with pytest.raises(ValueError):
+        dlist.remove(3)
+    with pytest.raises(IndexError):
+        dlist.pop(20)
+    expected = [2, 4, 1, 5, 6, 7, 8, 9]
+    assert dlist == expected
+    assert [dlist.index(item) for item in expected] == list(range(len(expected)))
+
+    dlist[0] = 13
+    dlist.swap(0, 7)
+    assert dlist == [9, 4, 1, 5, 6, 7, 8, 13]
+    assert 2 not in dlist and 13 in dlist
+    assert copy(dlist) == dlist and copy(dlist) is not dlist
+    dlist.sort()
+    assert dlist == [1, 4, 5, 6, 7, 8, 9, 13]
+    assert dlist.index(13) == 7
+    dlist.clear()
+    assert dlist == [] and len(dlist) == 0